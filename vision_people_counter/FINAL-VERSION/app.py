@@ -1,9 +1,6 @@
 # Python In-built packages
 from pathlib import Path
 import PIL
-from datetime import datetime
-import os
-import csv
 
 # External packages
 import streamlit as st
@@ -11,6 +8,10 @@ import streamlit as st
 # Local Modules
 import settings
 import helper
+import count_logger
+from config import get_config, sync_zones
+from metrics import start_exporters
+from postprocess import count_persons
 
 # Setting page layout
 st.set_page_config(
@@ -46,13 +47,25 @@ except Exception as ex:
     st.error(f"Unable to load model. Check the specified path: {model_path}")
     st.error(ex)
 
+helper.display_model_stats()
+helper.display_metrics_panel()
+start_exporters()
+
 st.sidebar.header("Image/Video Config")
 
-# 👤 Seuil maximal défini par l'utilisateur
+# 👤 Seuil maximal défini par l'utilisateur (valeur par défaut : settings.ROOMS_CONFIG)
+try:
+    rooms_config = get_config()
+except ValueError as e:
+    st.sidebar.error(f"Configuration des salles invalide : {e}")
+    rooms_config = None
+# Zones et lignes des salles de la configuration (prioritaires sur rooms/<salle>.json)
+sync_zones(rooms_config)
+default_max_people = (rooms_config.defaults.get("max_people") if rooms_config is not None else None) or 10
 max_people_allowed = st.sidebar.number_input(
     "Fixer un nombre maximal de personnes",
     min_value=1,
-    value=10,
+    value=default_max_people,
     step=1
 )
 
@@ -63,6 +76,28 @@ pet_friendly = st.sidebar.radio(
     index=0
 )
 
+# 🏃 Inférence seulement quand l'image change (caméras souvent vides)
+st.sidebar.checkbox(
+    "Inférence sur mouvement uniquement",
+    value=settings.MOTION_GATE_ENABLED,
+    key="motion_gate"
+)
+
+# 🔍 Petites personnes lointaines (caméras 4K) : inférence sur des tuiles en pleine résolution
+st.sidebar.selectbox(
+    "Inférence par tuiles",
+    options=[False, True, "zones"],
+    format_func={False: "Non", True: "Image entière", "zones": "Zones seulement"}.get,
+    key="tiling"
+)
+
+# 🖼️ Sans affichage, seuls les comptages, logs et alertes sont calculés
+st.sidebar.checkbox(
+    "Afficher la vidéo annotée",
+    value=True,
+    key="show_video"
+)
+
 source_radio = st.sidebar.radio(
     "Select Source", settings.SOURCES_LIST)
 
@@ -103,11 +138,7 @@ if source_radio == settings.IMAGE:
                 res_plotted = res[0].plot()[:, :, ::-1]
 
                 # Compter les personnes détectées (classe 0)
-                person_count = 0
-                for box in boxes:
-                    cls = int(box.cls[0])
-                    if cls == 0:
-                        person_count += 1
+                person_count = count_persons(boxes)
 
                 # Afficher image + infos
                 st.image(res_plotted, caption='Detected Image', use_column_width=True)
@@ -118,14 +149,8 @@ if source_radio == settings.IMAGE:
                 else:
                     st.success(f"✅ Nombre de personnes dans la limite ({max_people_allowed})")
 
-                # Log dans logs/image_log.csv
-                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                log_path = os.path.join("logs", "image_log.csv")
-                if not os.path.exists("logs"):
-                    os.makedirs("logs")
-                with open(log_path, "a", newline="") as f:
-                    writer = csv.writer(f)
-                    writer.writerow([now, person_count])
+                # Log sous la source "image" (logs/detections.db, ou logs/image_log.csv en CSV)
+                count_logger.log_people_count(person_count, "image")
 
                 try:
                     with st.expander("Detection Results"):
@@ -152,28 +177,18 @@ elif source_radio == settings.RTSP:
 elif source_radio == settings.YOUTUBE:
     helper.play_youtube_video(confidence, model, max_people_allowed)
 
-elif source_radio == "Double Video":
-    col1, col2 = st.columns(2)
-
-    with col1:
-        st.markdown("### 🎥 Vidéo 1")
-        helper.play_stored_video(
-            confidence,
-            model,
-            max_people_allowed,
-            instance_name="video1",  # 🔑 nom unique
-            auto_start=True
-        )
+elif source_radio == settings.SERVICE:
+    helper.play_service(max_people_allowed)
 
-    with col2:
-        st.markdown("### 🎥 Vidéo 2")
-        helper.play_stored_video(
-            confidence,
-            model,
-            max_people_allowed,
-            instance_name="video2",  # 🔑 nom unique
-            auto_start=True
-        )
+elif source_radio == "Double Video":
+    # Les deux vidéos tournent en même temps : le moteur d'inférence partagé regroupe leurs images en batchs
+    helper.play_stored_videos(
+        confidence,
+        model,
+        max_people_allowed,
+        instance_names=("video1", "video2"),  # 🔑 noms uniques
+        auto_start=True
+    )
 
 else:
     st.error("Please select a valid source type!")
@@ -1,69 +1,85 @@
-
 import streamlit as st
-import cv2
-from ultralytics import YOLO
-from datetime import datetime
-import os
-import csv
-import tempfile
-
-# === CONFIG ===
-SOURCES = {
-    "Webcam": 0,
-    "Vidéo 1": "videos/video1.mp4",
-    "Vidéo 2": "videos/video2.mp4"
-}
-MODEL_PATH = "weights/yolov8n.pt"
-LOG_DIR = "logs"
-CONFIDENCE = 0.3
-
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
-
-model = YOLO(MODEL_PATH)
-_last_logged_count = {}
-
-def log_people_count_if_changed(count, source_name):
-    global _last_logged_count
-    log_path = os.path.join(LOG_DIR, f"{source_name}_log.csv")
-
-    if _last_logged_count.get(source_name) == count:
-        return
-    _last_logged_count[source_name] = count
+import time
 
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(log_path, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow([now, count])
+import settings
+from config import get_config
+from metrics import start_exporters
+from preview import feed_url
+from service import get_client, start_background_service
 
-def detect_and_display(source_label, source):
-    st.subheader(f"🎥 Flux : {source_label}")
-    frame_holder = st.empty()
-    cap = cv2.VideoCapture(source)
-
-    while cap.isOpened():
-        success, frame = cap.read()
-        if not success:
-            break
-
-        results = model.predict(frame, conf=CONFIDENCE)
-        boxes = results[0].boxes
-        count = sum(1 for box in boxes if int(box.cls[0]) == 0)
-
-        log_people_count_if_changed(count, source_label)
-
-        annotated = results[0].plot()
-        frame_holder.image(annotated, channels="BGR", caption=f"{count} personne(s) détectée(s)")
-
-        if st.button(f"⛔ Arrêter {source_label}", key=source_label):
-            break
+# === CONFIG ===
+# Salles, sources, modèles et seuils : settings.ROOMS_CONFIG (relu à chaud par le service)
+# Les flux tournent dans le service de comptage (lancé ici s'il ne tourne pas déjà) :
+# la page n'affiche que ses flux MJPEG et ses comptages, sans jamais bloquer ni relancer un flux.
+COLUMNS = 2
+
+
+def _toggle(key):
+    st.session_state[key] = not st.session_state[key]
+
+
+def display_room(room, column):
+    """Feed and stop/resume button of one room; the <img> is refreshed by the browser, not by reruns."""
+    run_key = f"show_{room.name}"
+    if run_key not in st.session_state:
+        st.session_state[run_key] = True
+
+    column.subheader(f"🎥 Flux : {room.name}")
+    label = "⛔ Arrêter l'aperçu" if st.session_state[run_key] else "▶️ Reprendre l'aperçu"
+    # Created once per run (not per frame); the callback runs before the next rerun
+    column.button(label, key=f"toggle_{room.name}", on_click=_toggle, args=(run_key,))
+    if st.session_state[run_key]:
+        # Without viewers the service neither renders nor encodes this stream
+        column.markdown(
+            f'<img src="{feed_url(room.name)}" style="width:100%" alt="{room.name}">',
+            unsafe_allow_html=True,
+        )
+    else:
+        column.caption("Aperçu arrêté (le comptage continue).")
+    return column.empty()
+
+
+def display_counts(rooms, placeholders, client):
+    """Refresh the count of every room from the service messages, without rerunning the script."""
+    st_status = st.empty()
+    while True:
+        if not client.connected:
+            st_status.warning(f"Service injoignable sur {client.host}:{client.port}…")
+        else:
+            st_status.caption(f"📡 Service {client.host}:{client.port} — aperçu {settings.PREVIEW_URL}")
+        for name, placeholder in placeholders.items():
+            message = client.latest.get(name)
+            if message is None:
+                placeholder.caption("⏳ En attente du flux…")
+                continue
+            caption = f"{message['count']} personne(s) détectée(s)"
+            if message.get("over_limit"):
+                caption += f" — ⚠️ limite de {rooms[name].max_people} dépassée"
+            placeholder.caption(caption)
+        time.sleep(settings.SERVICE_REFRESH_SECONDS)
 
-    cap.release()
 
 st.set_page_config(layout="wide")
 st.title("🎯 Surveillance Multi-Flux avec Logs Séparés")
-
-tab_objects = st.tabs(list(SOURCES.keys()))
-for tab, (label, src) in zip(tab_objects, SOURCES.items()):
-    with tab:
-        detect_and_display(label, src)
+start_exporters()
+
+try:
+    config = get_config()
+except ValueError as e:
+    st.error(f"Configuration invalide ({settings.ROOMS_CONFIG}) : {e}")
+    st.stop()
+if config is None:
+    st.error(f"Fichier de configuration introuvable : {settings.ROOMS_CONFIG}")
+    st.stop()
+rooms = config.enabled_rooms()
+
+start_background_service()
+client = get_client(settings.SERVICE_HOST, settings.SERVICE_PORT)
+
+# Toutes les caméras s'affichent en même temps, en grille
+placeholders = {}
+columns = st.columns(COLUMNS)
+for i, room in enumerate(rooms.values()):
+    placeholders[room.name] = display_room(room, columns[i % COLUMNS])
+
+display_counts(rooms, placeholders, client)
@@ -0,0 +1,301 @@
+"""
+Offline batch analysis of recorded videos, as fast as the machine allows.
+
+Every file is processed by a worker process (pool pinned to the cores like
+multi_stream_yolo_logger). Inside a worker, a decode thread feeds batches of
+frames to `detect_batch`, so decoding and inference overlap. Counts are
+aggregated per second of video (maximum over the sampled frames of that
+second) and written to the detection store, one source per file.
+
+Each file has a checkpoint in <log-dir>/checkpoints/: an interrupted run
+resumes where it stopped, and finished files are skipped (unless --force).
+
+Usage:
+    python batch_analyze.py archives/                       # every video of a directory
+    python batch_analyze.py "archives/2024-*/*.mp4" --every 1 --batch 16
+    python batch_analyze.py archives/ --backend onnxruntime --capture pyav --keyframes
+"""
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import re
+import threading
+import time
+
+import settings
+from multi_stream_yolo_logger import _core_groups, _pin_worker
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".m4v", ".ts", ".webm")
+
+# Set once per worker process by _init_worker
+_detector = None
+
+
+def find_videos(patterns):
+    """Expand directories (recursively) and globs into a sorted list of video files."""
+    files = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                files.update(os.path.join(root, n) for n in names if n.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            files.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    return sorted(files)
+
+
+def _file_source(path, root, prefix):
+    """Store source name of a file: prefix + sanitised path (relative to `root`) without extension."""
+    stem = os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0]
+    return prefix + re.sub(r"[^A-Za-z0-9_.-]+", "_", stem).strip("_")[-64:]
+
+
+class Checkpoint:
+    """
+    JSON progress file of one video, keyed by its path, size and mtime (a
+    modified file starts over).
+    """
+
+    def __init__(self, directory, path):
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime}"
+        self.path = os.path.join(directory, hashlib.sha1(key.encode()).hexdigest()[:16] + ".json")
+        self.state = {"video": os.path.abspath(path), "resume_at": 0.0, "done": False}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.state.update(json.load(f))
+
+    def save(self, **changes):
+        self.state.update(changes)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+def _init_worker(backend, model_path, threads, cores):
+    """Pool initializer: pin the process, cap its threads, load the detector once."""
+    global _detector
+
+    _pin_worker(cores)
+
+    import cv2
+    from detectors import create_detector
+
+    cv2.setNumThreads(threads)
+    if backend == "pytorch":
+        import torch
+        torch.set_num_threads(threads)
+    kwargs = {"threads": threads} if backend == "onnxruntime" else {}
+    _detector = create_detector(backend, model_path, **kwargs)
+
+
+def _decode(cap, frames, stop):
+    """Decode thread: push (timestamp, frame) items, then None at the end."""
+    try:
+        while not stop.is_set():
+            success, frame = cap.read()
+            if not success:
+                break
+            frames.put((cap.timestamp, frame))
+    finally:
+        frames.put(None)
+
+
+def _analyze_file(job):
+    """
+    Pool task: `_analyze` one video file. Never raises, so a corrupt or
+    unreadable file is reported as an "error" summary and the run goes on.
+    """
+    path, options = job
+    try:
+        return _analyze(path, options)
+    except Exception as e:
+        source = _file_source(path, options["root"], options["prefix"])
+        return {"file": path, "source": source, "error": f"{type(e).__name__}: {e}"}
+
+
+def _analyze(path, options):
+    """Count persons in one video file and write its per-second counts to the store."""
+    from capture import open_capture
+    from detection_store import get_store
+    from postprocess import count_persons
+
+    source = _file_source(path, options["root"], options["prefix"])
+    checkpoint = Checkpoint(options["checkpoint_dir"], path)
+    if checkpoint.state["done"] and not options["force"]:
+        return {"file": path, "source": source, "skipped": True}
+    resume_at = 0.0 if options["force"] else checkpoint.state["resume_at"]
+
+    cap = open_capture(path, backend=options["capture"], name=source, width=options["width"],
+                       stride=1, keyframes_only=options["keyframes"])
+    if not cap.isOpened():
+        return {"file": path, "source": source, "error": "unable to open file"}
+    fps = cap.fps or 25.0
+    # Decoded keyframes are already sparse (PyAV): a stride would keep one keyframe out of N
+    keyframes = options["keyframes"] and options["capture"] == "pyav"
+    if options["every"] and not keyframes:
+        cap.stride = max(1, int(round(fps * options["every"])))
+    if resume_at:
+        cap.seek(resume_at)
+
+    # Timestamps are recording time: the file is assumed to end at its mtime
+    store = get_store(options["db"])
+    duration = _duration(path, fps)
+    start_epoch = os.stat(path).st_mtime - duration
+    last_ts = store.last_timestamp(source)
+
+    frames = queue.Queue(maxsize=options["batch"] * 2)
+    stop = threading.Event()
+    decoder = threading.Thread(target=_decode, args=(cap, frames, stop), name=f"decode-{source}", daemon=True)
+    wall_start = time.perf_counter()
+    decoder.start()
+
+    per_second = {}  # second of video -> max count
+    processed = 0
+    batches = 0
+    finished = False
+    try:
+        while not finished:
+            batch = []
+            while len(batch) < options["batch"]:
+                item = frames.get()
+                if item is None:
+                    finished = True
+                    break
+                batch.append(item)
+            if batch:
+                detections = _detector.detect_batch([frame for _, frame in batch], options["conf"])
+                for (timestamp, _), dets in zip(batch, detections):
+                    second = int(timestamp)
+                    per_second[second] = max(per_second.get(second, 0), count_persons(dets))
+                processed += len(batch)
+                batches += 1
+
+            # Write every completed second; the last one may still get frames
+            if finished or batches % options["checkpoint_every"] == 0:
+                pending = max(per_second) if per_second and not finished else None
+                rows = [
+                    (source, start_epoch + second, count)
+                    for second, count in sorted(per_second.items())
+                    if second != pending and (last_ts is None or start_epoch + second > last_ts)
+                ]
+                store.append_many(rows)
+                per_second = {pending: per_second[pending]} if pending is not None else {}
+                checkpoint.save(resume_at=float(pending if pending is not None else 0.0), done=finished)
+    finally:
+        stop.set()
+        while decoder.is_alive():
+            try:
+                frames.get_nowait()
+            except queue.Empty:
+                decoder.join(timeout=0.1)
+        cap.release()
+
+    wall = time.perf_counter() - wall_start
+    analyzed = max(duration - resume_at, 0.0)
+    return {
+        "file": path,
+        "source": source,
+        "frames": processed,
+        "video_seconds": round(analyzed, 1),
+        "seconds": round(wall, 2),
+        "realtime_factor": round(analyzed / wall, 1) if wall else 0.0,
+        "decode": cap.stats(),
+        "pid": os.getpid(),
+    }
+
+
+def _duration(path, fps):
+    """Length of the video in seconds (0.0 if unknown)."""
+    import cv2
+
+    probe = cv2.VideoCapture(path)
+    n_frames = probe.get(cv2.CAP_PROP_FRAME_COUNT)
+    fps = probe.get(cv2.CAP_PROP_FPS) or fps
+    probe.release()
+    return n_frames / fps if n_frames > 0 and fps else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline people counting on recorded videos")
+    parser.add_argument("inputs", nargs="+", help="Video files, directories or glob patterns")
+    parser.add_argument("--backend", choices=["pytorch", "onnxruntime", "opencv", "stub"],
+                        default=settings.DETECTOR_BACKEND)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--every", type=float, default=1.0,
+                        help="Analyse one frame every N seconds of video (0 = every frame)")
+    parser.add_argument("--batch", type=int, default=8, help="Frames per detect_batch call")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Parallel files (default: cores / threads-per-worker)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--pin", action="store_true", help="Pin each worker to its own core(s)")
+    parser.add_argument("--capture", choices=["opencv", "pyav"], default=settings.CAPTURE_BACKEND)
+    parser.add_argument("--decode-width", type=int, default=None)
+    parser.add_argument("--keyframes", action="store_true",
+                        help="Decode keyframes only (pyav); every keyframe is analysed and --every is ignored")
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--prefix", default="archive_", help="Prefix of the store source names")
+    parser.add_argument("--checkpoint-every", type=int, default=20, help="Save progress every N batches")
+    parser.add_argument("--force", action="store_true", help="Re-analyse files already done")
+    args = parser.parse_args()
+
+    files = find_videos(args.inputs)
+    if not files:
+        parser.error("no video found")
+
+    checkpoint_dir = os.path.join(args.log_dir, "checkpoints")
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    options = {
+        "conf": args.conf,
+        "every": args.every,
+        "batch": max(1, args.batch),
+        "capture": args.capture,
+        "width": args.decode_width,
+        "keyframes": args.keyframes,
+        "prefix": args.prefix,
+        "root": os.path.dirname(os.path.commonpath([os.path.abspath(f) for f in files])),
+        "db": os.path.join(args.log_dir, settings.DETECTION_DB_NAME),
+        "checkpoint_dir": checkpoint_dir,
+        "checkpoint_every": max(1, args.checkpoint_every),
+        "force": args.force,
+    }
+    n_workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_worker)
+    n_workers = min(n_workers, len(files))
+
+    # spawn: torch and OpenCV thread pools don't survive fork() reliably
+    ctx = mp.get_context("spawn")
+    cores = None
+    if args.pin:
+        cores = ctx.Queue()
+        for group in _core_groups(n_workers, args.threads_per_worker):
+            cores.put(group)
+
+    print(f"▶️ {len(files)} fichier(s), {n_workers} worker(s), backend {args.backend}")
+    start = time.perf_counter()
+    video_seconds = frames = 0
+    with ctx.Pool(n_workers, initializer=_init_worker,
+                  initargs=(args.backend, args.model, args.threads_per_worker, cores)) as pool:
+        for summary in pool.imap_unordered(_analyze_file, [(f, options) for f in files]):
+            if "error" in summary:
+                print(f"❌ {summary['file']}: {summary['error']}")
+            elif summary.get("skipped"):
+                print(f"⏭️ {summary['file']}: déjà analysé")
+            else:
+                video_seconds += summary["video_seconds"]
+                frames += summary["frames"]
+                print(f"✅ {summary['file']} → {summary['source']}: {summary['video_seconds']} s de vidéo en "
+                      f"{summary['seconds']} s (x{summary['realtime_factor']}, {summary['frames']} images, "
+                      f"décodage {summary['decode']['decode_fps']} img/s)")
+
+    elapsed = time.perf_counter() - start
+    factor = video_seconds / elapsed if elapsed else 0.0
+    print(f"📊 Total : {video_seconds:.0f} s de vidéo, {frames} images en {elapsed:.1f} s (x{factor:.1f} temps réel)")
+
+
+if __name__ == "__main__":
+    main()
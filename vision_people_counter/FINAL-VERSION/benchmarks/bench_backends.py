@@ -0,0 +1,94 @@
+"""
+Compare the detector backends (detectors.py) on the bundled videos.
+
+For each available backend: frames per second, mean person count and how
+often the count matches the PyTorch reference. Prints the backend to use as
+settings.DETECTOR_BACKEND (fastest one whose counts agree often enough).
+
+Usage (from FINAL-VERSION/, after `python export_model.py --format onnx --dynamic`):
+    python benchmarks/bench_backends.py --frames 200
+    python benchmarks/bench_backends.py --backends pytorch opencv --onnx weights/yolov8n.int8.onnx
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import settings  # noqa: E402
+from detectors import BACKENDS, create_detector  # noqa: E402
+from postprocess import count_persons  # noqa: E402
+
+
+def load_frames(n_frames, stride):
+    """Read up to `n_frames` frames (one every `stride`) spread over the bundled videos."""
+    frames = []
+    per_video = max(1, n_frames // max(1, len(settings.VIDEOS_DICT)))
+    for path in settings.VIDEOS_DICT.values():
+        cap = cv2.VideoCapture(str(path))
+        index = 0
+        while cap.isOpened() and len(frames) < n_frames and index < per_video * stride:
+            success, frame = cap.read()
+            if not success:
+                break
+            if index % stride == 0:
+                frames.append(frame)
+            index += 1
+        cap.release()
+    return frames
+
+
+def run_backend(detector, frames, conf, batch):
+    counts = []
+    detector.detect_batch(frames[:batch], conf)  # warm-up
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        counts.extend(count_persons(d) for d in detector.detect_batch(frames[i:i + batch], conf))
+    return len(frames) / (time.perf_counter() - start), counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=[b for b in BACKENDS if b != "stub"])
+    parser.add_argument("--onnx", default=str(settings.ONNX_MODEL))
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--stride", type=int, default=5)
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    frames = load_frames(args.frames, args.stride)
+    if not frames:
+        sys.exit("❌ Aucune image lue : vérifier settings.VIDEOS_DICT")
+
+    results = {}
+    for backend in args.backends:
+        model_path = None if backend == "pytorch" else args.onnx
+        try:
+            detector = create_detector(backend, model_path)
+        except Exception as e:  # backend not installed / model not exported
+            print(f"⚠️ {backend}: indisponible ({e})")
+            continue
+        results[backend] = run_backend(detector, frames, args.conf, args.batch)
+
+    reference = results.get("pytorch", (None, None))[1]
+    print(f"{len(frames)} images, batch {args.batch}")
+    print(f"{'backend':<12} {'img/s':>8} {'moy. pers.':>11} {'accord':>8}")
+    candidates = []
+    for backend, (fps, counts) in results.items():
+        agreement = 1.0
+        if reference is not None:
+            agreement = sum(a == b for a, b in zip(counts, reference)) / len(counts)
+        print(f"{backend:<12} {fps:>8.1f} {sum(counts) / len(counts):>11.2f} {agreement:>7.0%}")
+        if agreement >= args.min_agreement:
+            candidates.append((fps, backend))
+
+    if candidates:
+        print(f"👉 DETECTOR_BACKEND = \"{max(candidates)[1]}\"")
+
+
+if __name__ == "__main__":
+    main()
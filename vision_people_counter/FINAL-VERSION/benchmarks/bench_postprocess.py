@@ -0,0 +1,102 @@
+"""
+Micro-benchmark: per-frame post-processing cost versus number of boxes.
+
+Compares the old per-box loop (`int(box.cls[0])`, `float(box.conf[0])`, ...)
+with the vectorised `postprocess.summarize_persons`. Uses torch tensors when
+torch is installed (closest to real Ultralytics `Boxes`), numpy otherwise.
+
+Usage (from FINAL-VERSION/):
+    python benchmarks/bench_postprocess.py --boxes 0 10 50 100 200 500
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from postprocess import summarize_persons  # noqa: E402
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+ROI = (100, 50, 600, 500)
+
+
+class FakeBoxes:
+    """Mimics the parts of ultralytics.engine.results.Boxes used by the app."""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy, self.conf, self.cls = xyxy, conf, cls
+        self.id = None
+
+    def __len__(self):
+        return len(self.cls)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield FakeBoxes(self.xyxy[i:i + 1], self.conf[i:i + 1], self.cls[i:i + 1])
+
+
+def make_boxes(n, rng):
+    xy = rng.uniform(0, 1200, size=(n, 2)).astype(np.float32)
+    wh = rng.uniform(20, 200, size=(n, 2)).astype(np.float32)
+    xyxy = np.concatenate([xy, xy + wh], axis=1)
+    conf = rng.uniform(0.25, 1.0, size=n).astype(np.float32)
+    cls = rng.choice([0, 0, 0, 2, 56], size=n).astype(np.float32)
+    if torch is not None:
+        xyxy, conf, cls = torch.from_numpy(xyxy), torch.from_numpy(conf), torch.from_numpy(cls)
+    return FakeBoxes(xyxy, conf, cls)
+
+
+def loop_postprocess(boxes):
+    """The per-box loop the entry points used before postprocess.py."""
+    count = count_in_roi = 0
+    roi_x, roi_y, roi_w, roi_h = ROI
+    for box in boxes:
+        cls_id = int(box.cls[0])
+        conf = float(box.conf[0])
+        if cls_id == 0 and conf > 0.5:
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
+            count += 1
+            if roi_x <= cx <= roi_x + roi_w and roi_y <= cy <= roi_y + roi_h:
+                count_in_roi += 1
+    return count, count_in_roi
+
+
+def vectorised_postprocess(boxes):
+    summary = summarize_persons(boxes, min_conf=0.5, roi=ROI)
+    return summary.count, summary.roi_count
+
+
+def time_per_call(fn, boxes, repeat):
+    fn(boxes)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(boxes)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boxes", type=int, nargs="+", default=[0, 10, 50, 100, 200, 500])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"backend: {'torch' if torch is not None else 'numpy'}")
+    print(f"{'boxes':>6} {'loop (µs)':>12} {'vectorised (µs)':>16} {'speed-up':>9}")
+    for n in args.boxes:
+        boxes = make_boxes(n, rng)
+        assert loop_postprocess(boxes) == vectorised_postprocess(boxes)
+        t_loop = time_per_call(loop_postprocess, boxes, args.repeat)
+        t_vec = time_per_call(vectorised_postprocess, boxes, args.repeat)
+        print(f"{n:>6} {t_loop * 1e6:>12.1f} {t_vec * 1e6:>16.1f} {t_loop / t_vec:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
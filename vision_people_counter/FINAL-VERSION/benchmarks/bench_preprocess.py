@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: per-frame preprocessing cost at 1080p and 4K.
+
+Compares the former path (fixed 720x405 resize in helper.py, then the
+Ultralytics letterbox to the model input: two resamples and fresh
+allocations every frame) with `preprocess.Letterbox` (one resample straight
+to the input size into a reused buffer).
+
+Usage (from FINAL-VERSION/):
+    python benchmarks/bench_preprocess.py
+    python benchmarks/bench_preprocess.py --sizes 1920x1080 3840x2160 1280x960 --imgsz 640
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from preprocess import Letterbox  # noqa: E402
+
+
+def ultralytics_letterbox(image, size, stride=32):
+    """Same steps as ultralytics.data.augment.LetterBox with auto=True."""
+    h, w = image.shape[:2]
+    ratio = min(size / h, size / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+    dw, dh = (size - new_w) % stride / 2, (size - new_h) % stride / 2
+    if (w, h) != (new_w, new_h):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    return cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+
+
+def legacy_preprocess(frame, size):
+    resized = cv2.resize(frame, (720, int(720 * (9 / 16))))
+    return ultralytics_letterbox(resized, size)
+
+
+def time_per_call(fn, frame, repeat):
+    fn(frame)  # warm-up (allocates the Letterbox buffers)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(frame)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1920x1080", "3840x2160"])
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    letterbox = Letterbox(args.imgsz)
+    print(f"{'source':>10} {'720px + letterbox (ms)':>23} {'single letterbox (ms)':>22} {'saved (ms)':>11} {'output':>10}")
+    for size in args.sizes:
+        w, h = map(int, size.lower().split("x"))
+        frame = rng.integers(0, 255, size=(h, w, 3), dtype=np.uint8)
+        t_legacy = time_per_call(lambda f: legacy_preprocess(f, args.imgsz), frame, args.repeat)
+        t_single = time_per_call(letterbox, frame, args.repeat)
+        out_h, out_w = letterbox(frame).image.shape[:2]
+        print(f"{size:>10} {t_legacy * 1e3:>23.3f} {t_single * 1e3:>22.3f} "
+              f"{(t_legacy - t_single) * 1e3:>11.3f} {out_w:>5}x{out_h:<4}")
+
+
+if __name__ == "__main__":
+    main()
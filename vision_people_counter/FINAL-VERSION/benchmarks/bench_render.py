@@ -0,0 +1,79 @@
+"""
+Micro-benchmark: per-frame annotation + delivery cost and payload size.
+
+Compares the former path (annotate a full-resolution copy of the frame, as
+`res[0].plot()` does, then PNG-encode it as Streamlit does for raw arrays)
+with `render.FrameRenderer` (downscale once into a reused buffer, draw at
+display size) followed by JPEG/WebP encoding.
+
+Usage (from FINAL-VERSION/):
+    python benchmarks/bench_render.py
+    python benchmarks/bench_render.py --sizes 1920x1080 3840x2160 --boxes 30 --quality 70
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from postprocess import Detections  # noqa: E402
+from render import FrameRenderer, encode_frame  # noqa: E402
+
+
+def legacy_render(frame, detections, max_width):
+    """Full-size copy and drawing, display downscale, PNG (Streamlit's encoding of arrays)."""
+    out = frame.copy()
+    for (x1, y1, x2, y2), conf in zip(detections.xyxy.astype(int).tolist(), detections.conf.tolist()):
+        cv2.rectangle(out, (x1, y1), (x2, y2), (56, 56, 255), 2)
+        cv2.putText(out, f"person {conf:.2f}", (x1, max(y1 - 5, 15)), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (255, 255, 255), 2)
+    h, w = out.shape[:2]
+    if w > max_width:
+        out = cv2.resize(out, (max_width, int(h * max_width / w)), interpolation=cv2.INTER_AREA)
+    return cv2.imencode(".png", out)[1].tobytes()
+
+
+def time_per_call(fn, repeat):
+    data = fn()  # warm-up (allocates the renderer buffers)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat, len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1920x1080", "3840x2160"])
+    parser.add_argument("--boxes", type=int, default=20)
+    parser.add_argument("--max-width", type=int, default=1280)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    renderer = FrameRenderer(max_width=args.max_width)
+    print(f"{'source':>10} {'path':>20} {'ms/frame':>9} {'KB/frame':>9}")
+    for size in args.sizes:
+        w, h = map(int, size.lower().split("x"))
+        # Smooth synthetic image: random noise would defeat every codec
+        frame = cv2.resize(rng.integers(0, 255, size=(h // 16, w // 16, 3), dtype=np.uint8), (w, h))
+        xy = rng.uniform(0, 1, size=(args.boxes, 2)) * (w * 0.9, h * 0.8)
+        xyxy = np.hstack([xy, xy + (w * 0.08, h * 0.2)])
+        detections = Detections(xyxy, rng.uniform(0.4, 1.0, args.boxes), np.zeros(args.boxes))
+
+        paths = {
+            "full-size + PNG": lambda: legacy_render(frame, detections, args.max_width),
+            "renderer + JPEG": lambda: encode_frame(renderer.render(frame, detections, {0: "person"}),
+                                                    "jpeg", args.quality),
+            "renderer + WebP": lambda: encode_frame(renderer.render(frame, detections, {0: "person"}),
+                                                    "webp", args.quality),
+        }
+        for name, fn in paths.items():
+            seconds, n_bytes = time_per_call(fn, args.repeat)
+            print(f"{size:>10} {name:>20} {seconds * 1e3:>9.2f} {n_bytes / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
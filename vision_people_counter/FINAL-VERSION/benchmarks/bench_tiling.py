@@ -0,0 +1,124 @@
+"""
+Accuracy vs throughput of tiled inference (tiling.py) on the bundled videos.
+
+Runs each frame through:
+- "image entière": the frame letterboxed to the model input, as before;
+- "tuiles": native-resolution tiles plus the whole frame, merged;
+- "tuiles zones": tiles only over `--zone` (default: the upper half, where
+  people are far from the camera), plus the whole frame.
+
+The densest setting ("tuiles") is the reference: for each setting the script
+reports ms/frame, FPS, persons per frame and the share of the reference
+persons it finds (IoU >= 0.5). Without ground truth, this shows how many
+people downscaling loses, not absolute accuracy.
+
+Usage (from FINAL-VERSION/):
+    python benchmarks/bench_tiling.py --frames 100
+    python benchmarks/bench_tiling.py --width 3840 --zone 0 0 1 0.4     # videos upscaled to 4K
+    python benchmarks/bench_tiling.py --synthetic --backend stub       # throughput only, no weights
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import settings  # noqa: E402
+from bytetrack import iou_matrix  # noqa: E402
+from detectors import BACKENDS, create_detector  # noqa: E402
+from postprocess import PERSON_CLASS  # noqa: E402
+from run_benchmark import synthetic_frames  # noqa: E402
+from tiling import Tiler, TiledDetector  # noqa: E402
+from zones import Zone, ZoneMap  # noqa: E402
+
+
+def read_frames(args):
+    if args.synthetic:
+        return {"synthetic": synthetic_frames(3840, 2160, n_frames=args.frames)}
+    videos = {}
+    for name, path in settings.VIDEOS_DICT.items():
+        cap = cv2.VideoCapture(str(path))
+        frames = []
+        while len(frames) < args.frames:
+            for _ in range(args.every - 1):
+                cap.grab()
+            ok, frame = cap.read()
+            if not ok:
+                break
+            if args.width and frame.shape[1] != args.width:
+                frame = cv2.resize(frame, (args.width, round(frame.shape[0] * args.width / frame.shape[1])))
+            frames.append(frame)
+        cap.release()
+        if frames:
+            videos[name] = frames
+    return videos
+
+
+def recall(found, reference):
+    """Share of the reference boxes matched one-to-one by a found box with IoU >= 0.5."""
+    if len(reference) == 0:
+        return None
+    iou = iou_matrix(reference, found)
+    matched = 0
+    while iou.size and iou.max() >= 0.5:
+        r, f = np.unravel_index(iou.argmax(), iou.shape)
+        iou[r, :] = iou[:, f] = 0
+        matched += 1
+    return matched / len(reference)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default=settings.DETECTOR_BACKEND, choices=sorted(BACKENDS))
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--frames", type=int, default=50, help="Frames per video")
+    parser.add_argument("--every", type=int, default=10, help="Keep one frame out of N")
+    parser.add_argument("--width", type=int, default=None, help="Resize the frames to this width first")
+    parser.add_argument("--tile-size", type=int, default=settings.TILE_SIZE)
+    parser.add_argument("--overlap", type=float, default=settings.TILE_OVERLAP)
+    parser.add_argument("--zone", type=float, nargs=4, default=(0, 0, 1, 0.5), metavar=("X0", "Y0", "X1", "Y1"),
+                        help="Normalised region of interest of 'tuiles zones'")
+    parser.add_argument("--synthetic", action="store_true", help="4K synthetic frames instead of the videos")
+    args = parser.parse_args()
+
+    videos = read_frames(args)
+    if not videos:
+        sys.exit(f"No readable video in {settings.VIDEO_DIR} (or use --synthetic)")
+    detector = create_detector(args.backend, args.model)
+    x0, y0, x1, y1 = args.zone
+    zones = ZoneMap([Zone("roi", [[x0, y0], [x1, y0], [x1, y1], [x0, y1]])])
+    modes = {
+        "image entière": detector,
+        "tuiles": TiledDetector(detector, Tiler(args.tile_size, args.overlap, full_frame=True)),
+        "tuiles zones": TiledDetector(detector, Tiler(args.tile_size, args.overlap, full_frame=True, zones_only=True),
+                                      zones),
+    }
+
+    print(f"{'vidéo':>10} {'mode':>14} {'fenêtres':>8} {'ms/image':>9} {'FPS':>6} {'pers./image':>11} {'rappel vs tuiles':>16}")
+    for name, frames in videos.items():
+        persons = {}
+        for label, det in modes.items():
+            det.detect(frames[0], args.conf)  # warm-up
+            start = time.perf_counter()
+            found = []
+            for frame in frames:
+                d = det.detect(frame, args.conf)
+                found.append(d.xyxy[d.cls == PERSON_CLASS])
+            elapsed = (time.perf_counter() - start) / len(frames)
+            persons[label] = (found, elapsed)
+        reference = persons["tuiles"][0]
+        for label, (found, elapsed) in persons.items():
+            det = modes[label]
+            n_windows = len(det.tiler.windows(frames[0].shape, det.zones)) if isinstance(det, TiledDetector) else 1
+            recalls = [r for r in (recall(f, ref) for f, ref in zip(found, reference)) if r is not None]
+            rec = f"{100 * np.mean(recalls):.1f} %" if recalls else "-"
+            print(f"{name:>10} {label:>14} {n_windows:>8} {elapsed * 1e3:>9.1f} {1 / elapsed:>6.1f} "
+                  f"{np.mean([len(f) for f in found]):>11.1f} {rec:>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark: pure-NumPy ByteTrack throughput on one CPU core.
+
+Simulates `--streams` cameras, each with its own `bytetrack.ByteTracker`,
+watching `--people` walking people (noisy boxes, missed detections, some
+low-score detections, people leaving and entering). Reports tracker updates
+per second against the rate needed for `--streams` x `--fps`, plus the peak
+number of tracks held by a tracker (bounded by settings.TRACKER_MAX_TRACKS).
+
+Usage (from FINAL-VERSION/):
+    python benchmarks/bench_tracker.py
+    python benchmarks/bench_tracker.py --streams 16 --fps 30 --people 40 --frames 600
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from bytetrack import ByteTracker  # noqa: E402
+from postprocess import Detections  # noqa: E402
+
+
+def synthetic_stream(rng, n_people, n_frames, width=1920, height=1080):
+    """Detections of one camera, frame by frame."""
+    pos = rng.uniform((0, 0), (width - 100, height - 250), size=(n_people, 2))
+    vel = rng.normal(0, 4, size=(n_people, 2))
+    size = rng.uniform((40, 100), (100, 250), size=(n_people, 2))
+    frames = []
+    for _ in range(n_frames):
+        pos += vel
+        # People leaving the image come back elsewhere (new identities)
+        out = (pos[:, 0] < 0) | (pos[:, 1] < 0) | (pos[:, 0] > width - 100) | (pos[:, 1] > height - 250)
+        pos[out] = rng.uniform((0, 0), (width - 100, height - 250), size=(int(out.sum()), 2))
+        visible = rng.random(n_people) > 0.05
+        xy = pos[visible] + rng.normal(0, 2, size=(int(visible.sum()), 2))
+        xyxy = np.hstack([xy, xy + size[visible]])
+        conf = np.where(rng.random(len(xyxy)) < 0.15, rng.uniform(0.15, 0.5, len(xyxy)), rng.uniform(0.5, 0.95, len(xyxy)))
+        frames.append(Detections(xyxy, conf, np.zeros(len(xyxy))))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=16)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--people", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    streams = [synthetic_stream(rng, args.people, args.frames) for _ in range(args.streams)]
+    trackers = [ByteTracker(frame_rate=args.fps) for _ in range(args.streams)]
+
+    peak = 0
+    start = time.perf_counter()
+    for i in range(args.frames):
+        # Interleaved, as the inference engine delivers them
+        for tracker, frames in zip(trackers, streams):
+            tracker.update(frames[i])
+            peak = max(peak, len(tracker))
+    elapsed = time.perf_counter() - start
+
+    updates = args.frames * args.streams
+    required = args.streams * args.fps
+    rate = updates / elapsed
+    print(f"{args.streams} flux x {args.people} personnes, {args.frames} images par flux")
+    print(f"  {rate:,.0f} mises à jour/s ({1e3 / rate:.3f} ms chacune), requis : {required:,.0f}/s "
+          f"-> {'OK' if rate >= required else 'INSUFFISANT'} (marge x{rate / required:.1f})")
+    print(f"  pistes max par tracker : {peak}")
+
+
+if __name__ == "__main__":
+    main()
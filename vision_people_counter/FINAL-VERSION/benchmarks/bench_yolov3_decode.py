@@ -0,0 +1,93 @@
+"""
+Micro-benchmark: YOLOv3 (OpenCV DNN) output decoding, without weights.
+
+Compares the former per-row decoding loop of src/detection.py (argmax per row,
+a box array per detection, class names compared as strings) with
+`decode_yolov3`, on synthetic outputs shaped like a 416x416 YOLOv3
+(3 scales, 10647 rows x 85, class scores <= objectness as OpenCV outputs them).
+
+Usage (from FINAL-VERSION/):
+    python benchmarks/bench_yolov3_decode.py
+    python benchmarks/bench_yolov3_decode.py --size 608 --objects 50
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parents[2]))  # src/
+from preprocess import Letterbox  # noqa: E402
+from src.detection import decode_yolov3  # noqa: E402
+
+CLASSES = ["person"] + [f"class_{i}" for i in range(1, 80)]
+
+
+def legacy_decode(layer_outputs, size, lb):
+    boxes, confidences, class_ids = [], [], []
+    for output in layer_outputs:
+        for detection in output:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+            if confidence > 0.5 and CLASSES[class_id] == "person":
+                (centerX, centerY, w, h) = detection[0:4] * size
+                centerX, centerY = centerX - lb.pad[0], centerY - lb.pad[1]
+                (centerX, centerY, w, h) = np.array([centerX, centerY, w, h]) / lb.ratio
+                boxes.append([int(centerX - w / 2), int(centerY - h / 2), int(w), int(h)])
+                confidences.append(float(confidence))
+                class_ids.append(class_id)
+    return cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
+
+
+def synthetic_outputs(rng, size, n_objects):
+    outputs = []
+    for stride in (32, 16, 8):
+        n = (size // stride) ** 2 * 3
+        out = np.zeros((n, 85), dtype=np.float32)
+        out[:, :4] = rng.uniform(0.05, 0.95, size=(n, 4)) * (1, 1, 0.2, 0.4)
+        out[:, 4] = rng.uniform(0, 0.3, size=n)
+        hits = rng.choice(n, size=n_objects, replace=False)
+        out[hits, 4] = rng.uniform(0.5, 1.0, n_objects)
+        out[:, 5:] = rng.uniform(0, 1, size=(n, 80)) * out[:, 4:5] * 0.3
+        out[hits, 5 + rng.integers(0, 3, n_objects)] = out[hits, 4] * rng.uniform(0.9, 1.0, n_objects)
+        outputs.append(out)
+    return outputs
+
+
+def time_per_call(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=416)
+    parser.add_argument("--objects", type=int, default=20, help="Detections above threshold per scale")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    frame = cv2.resize(rng.integers(0, 255, size=(68, 120, 3), dtype=np.uint8), (1920, 1080))
+    lb = Letterbox(args.size, auto=False)(frame)
+    outputs = synthetic_outputs(rng, args.size, args.objects)
+    wanted = np.array([name == "person" for name in CLASSES])
+
+    steps = {
+        "boucle par ligne": lambda: legacy_decode(outputs, args.size, lb),
+        "vectorisé": lambda: decode_yolov3(outputs, 0.5, wanted, args.size, lb.ratio, lb.pad, 0.4,
+                                                   lb.source_shape),
+    }
+    print(f"{'décodage':>26} {'ms/image':>9}")
+    for name, fn in steps.items():
+        print(f"{name:>26} {time_per_call(fn, args.repeat) * 1e3:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
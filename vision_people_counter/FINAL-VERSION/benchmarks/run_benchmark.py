@@ -0,0 +1,227 @@
+"""
+Headless throughput/latency benchmark of the detection loop.
+
+Replays the bundled videos (settings.VIDEOS_DICT) or synthetic frames through
+decode -> resize -> inference -> post-processing -> logging -> annotation and
+reports FPS, p50/p95/p99 latency per stage, peak RSS and CPU utilisation as
+JSON. With --baseline, the run is compared against a stored report and the
+script exits with status 1 on regression.
+
+Usage (from FINAL-VERSION/):
+    python benchmarks/run_benchmark.py --synthetic --backend stub --frames 300
+    python benchmarks/run_benchmark.py --backend pytorch --output bench.json
+    python benchmarks/run_benchmark.py --backend stub --synthetic --baseline benchmarks/baseline.json
+    python benchmarks/run_benchmark.py --backend stub --synthetic --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+import settings  # noqa: E402
+from capture import BACKENDS as CAPTURE_BACKENDS, open_capture  # noqa: E402
+from count_logger import LogSink  # noqa: E402
+from detection_store import DetectionStore  # noqa: E402
+from detectors import BACKENDS, create_detector  # noqa: E402
+from postprocess import summarize_persons  # noqa: E402
+
+STAGES = ["decode", "resize", "inference", "postprocess", "logging", "annotation"]
+
+
+# -- Sources -----------------------------------------------------------------
+
+def synthetic_frames(width, height, n_people=8, n_frames=120, seed=0):
+    """Pre-generate `n_frames` frames with moving "people" rectangles on noise."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 60, size=(height, width, 3), dtype=np.uint8)
+    pos = rng.uniform(0, 1, size=(n_people, 2)) * (width - 60, height - 160)
+    vel = rng.uniform(-4, 4, size=(n_people, 2))
+    frames = []
+    for _ in range(n_frames):
+        frame = background.copy()
+        pos = np.clip(pos + vel, 0, (width - 60, height - 160))
+        for x, y in pos.astype(int):
+            cv2.rectangle(frame, (x, y), (x + 60, y + 160), (200, 180, 160), -1)
+        frames.append(frame)
+    return frames
+
+
+class SyntheticCapture:
+    """cv2.VideoCapture-like reader cycling over pre-generated frames."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def read(self):
+        frame = self.frames[self.index % len(self.frames)].copy()
+        self.index += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def open_sources(args):
+    if args.synthetic:
+        frames = synthetic_frames(args.width, args.height)
+        return [("synthetic", SyntheticCapture(frames))]
+    return [
+        (name, open_capture(str(path), backend=args.capture, name=name, width=args.decode_width or None, stride=1))
+        for name, path in settings.VIDEOS_DICT.items()
+    ]
+
+
+# -- Measurement ---------------------------------------------------------------
+
+def percentiles(samples):
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    arr = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux, in bytes on macOS
+    return round(peak / 1024 / (1024 if sys.platform == "darwin" else 1), 1)
+
+
+def run(args):
+    detector = create_detector(args.backend, args.model, **(
+        {"n_boxes": args.stub_boxes, "latency_ms": args.stub_latency_ms} if args.backend == "stub" else {}
+    ))
+    timings = {stage: [] for stage in STAGES}
+
+    log_dir = tempfile.mkdtemp(prefix="bench_logs_")
+    store = DetectionStore(os.path.join(log_dir, "bench.db")) if settings.LOG_BACKEND == "sqlite" else None
+    sink = LogSink(log_dir, flush_interval=settings.LOG_FLUSH_INTERVAL,
+                   flush_size=settings.LOG_FLUSH_SIZE, store=store)
+    last_counts = {}
+
+    frames = 0
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for name, cap in open_sources(args):
+        per_source = 0
+        while per_source < args.frames:
+            t0 = time.perf_counter()
+            success, frame = cap.read()
+            if not success:
+                break
+            t1 = time.perf_counter()
+            resized = cv2.resize(frame, (args.resize, int(args.resize * 9 / 16))) if args.resize else frame
+            t2 = time.perf_counter()
+            detections = detector.detect(resized, args.conf)
+            t3 = time.perf_counter()
+            summary = summarize_persons(detections)
+            t4 = time.perf_counter()
+            if last_counts.get(name) != summary.count:
+                last_counts[name] = summary.count
+                sink.write(name, time.time(), summary.count)
+            t5 = time.perf_counter()
+            for x1, y1, x2, y2 in summary.detections.xyxy.astype(int):
+                cv2.rectangle(resized, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            t6 = time.perf_counter()
+
+            for stage, (a, b) in zip(STAGES, [(t0, t1), (t1, t2), (t2, t3), (t3, t4), (t4, t5), (t5, t6)]):
+                timings[stage].append(b - a)
+            per_source += 1
+        cap.release()
+        frames += per_source
+
+    sink.close()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    if store is not None:
+        store.close()
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+    return {
+        "config": {
+            "backend": args.backend,
+            "source": "synthetic" if args.synthetic else "videos",
+            "frames_per_source": args.frames,
+            "resolution": [args.width, args.height] if args.synthetic else None,
+            "resize": args.resize,
+            "capture": None if args.synthetic else args.capture,
+            "decode_width": args.decode_width or None,
+        },
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "frames": frames,
+        "fps": round(frames / wall, 2) if wall else 0.0,
+        "stages": {stage: percentiles(samples) for stage, samples in timings.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "cpu_utilisation": round(cpu / wall, 3) if wall else 0.0,  # 1.0 = one core fully busy
+    }
+
+
+def compare(report, baseline, tolerance):
+    """
+    Returns a list of regression messages: FPS lower than the baseline, or a
+    stage p95 higher than the baseline, by more than `tolerance` (fraction).
+    """
+    regressions = []
+    if baseline.get("fps") and report["fps"] < baseline["fps"] * (1 - tolerance):
+        regressions.append(f"fps {report['fps']} < baseline {baseline['fps']}")
+    for stage, stats in report["stages"].items():
+        base_p95 = baseline.get("stages", {}).get(stage, {}).get("p95_ms")
+        # Ignore sub-0.05 ms stages: timer noise dominates
+        if base_p95 and stats["p95_ms"] and base_p95 > 0.05 and stats["p95_ms"] > base_p95 * (1 + tolerance):
+            regressions.append(f"{stage} p95 {stats['p95_ms']} ms > baseline {base_p95} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="stub")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--synthetic", action="store_true", help="Generated frames instead of the bundled videos")
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=300, help="Frames per source")
+    parser.add_argument("--capture", choices=sorted(CAPTURE_BACKENDS), default=settings.CAPTURE_BACKEND,
+                        help="Decoder used for the bundled videos")
+    parser.add_argument("--decode-width", type=int, default=0, help="Decode width (0 = native)")
+    parser.add_argument("--resize", type=int, default=720, help="Resize width before inference (0 = native)")
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--stub-boxes", type=int, default=20)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare with this JSON report")
+    parser.add_argument("--save-baseline", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    for path in filter(None, [args.output, args.save_baseline]):
+        Path(path).write_text(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for message in regressions:
+            print(f"❌ Régression : {message}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("✅ Pas de régression par rapport à la référence", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
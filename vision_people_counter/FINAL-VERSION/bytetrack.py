@@ -0,0 +1,282 @@
+"""
+Pure-NumPy ByteTrack with bounded memory.
+
+Same association scheme as ByteTrack (Zhang et al., 2022) and the Ultralytics
+BYTETracker: high-score detections are matched to every track by IoU, then
+low-score detections recover the tracks left unmatched, new tracks need a
+second hit to be confirmed, and lost tracks are kept `max_age` frames.
+
+Track state lives in flat arrays (Kalman means and covariances, IDs,
+states, scores, last frame), so the Kalman predict/update, the IoU matrix and
+the bookkeeping are a few vectorised operations per frame rather than a
+Python object per track. At most `max_tracks` tracks are kept per stream.
+The oldest lost tracks are dropped first.
+
+`update()` takes and returns the same data as the Ultralytics trackers
+(detections with xyxy/conf/cls, rows of [x1, y1, x2, y2, id, score, cls, idx]),
+so inference_engine can use either one.
+
+Assignment uses scipy's linear_sum_assignment when scipy is installed,
+otherwise a greedy lowest-cost matching.
+"""
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # optional
+    linear_sum_assignment = None
+
+import settings
+
+TENTATIVE, TRACKED, LOST = 0, 1, 2
+
+_STD_POSITION = 1.0 / 20
+_STD_VELOCITY = 1.0 / 160
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)
+
+
+# -- Geometry -----------------------------------------------------------------
+
+def _xyxy_to_xyah(xyxy):
+    w = xyxy[:, 2] - xyxy[:, 0]
+    h = np.maximum(xyxy[:, 3] - xyxy[:, 1], 1e-6)
+    return np.stack([xyxy[:, 0] + w / 2, xyxy[:, 1] + h / 2, w / h, h], axis=1)
+
+
+def _xyah_to_xyxy(xyah):
+    w = xyah[:, 2] * xyah[:, 3]
+    x1 = xyah[:, 0] - w / 2
+    y1 = xyah[:, 1] - xyah[:, 3] / 2
+    return np.stack([x1, y1, x1 + w, y1 + xyah[:, 3]], axis=1)
+
+
+def iou_matrix(a, b):
+    """(len(a), len(b)) IoU of two sets of xyxy boxes."""
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)))
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def _assign(cost, threshold):
+    """Matched (rows, cols) with cost <= threshold, plus unmatched rows and cols."""
+    n_rows, n_cols = cost.shape
+    if n_rows == 0 or n_cols == 0:
+        return np.empty(0, int), np.empty(0, int), np.arange(n_rows), np.arange(n_cols)
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(cost)
+        keep = cost[rows, cols] <= threshold
+        rows, cols = rows[keep], cols[keep]
+    else:
+        # Greedy: accept candidate pairs from the lowest cost up
+        cand_r, cand_c = np.nonzero(cost <= threshold)
+        order = np.argsort(cost[cand_r, cand_c], kind="stable")
+        used_r, used_c = np.zeros(n_rows, bool), np.zeros(n_cols, bool)
+        rows, cols = [], []
+        for r, c in zip(cand_r[order].tolist(), cand_c[order].tolist()):
+            if not used_r[r] and not used_c[c]:
+                used_r[r] = used_c[c] = True
+                rows.append(r)
+                cols.append(c)
+        rows, cols = np.array(rows, int), np.array(cols, int)
+    unmatched_rows = np.setdiff1d(np.arange(n_rows), rows)
+    unmatched_cols = np.setdiff1d(np.arange(n_cols), cols)
+    return rows, cols, unmatched_rows, unmatched_cols
+
+
+# -- Batched Kalman filter (constant velocity in x, y, aspect, height) ------------
+
+def _kalman_initiate(xyah):
+    n = len(xyah)
+    mean = np.zeros((n, 8))
+    mean[:, :4] = xyah
+    h = xyah[:, 3]
+    std = np.stack([
+        2 * _STD_POSITION * h, 2 * _STD_POSITION * h, np.full(n, 1e-2), 2 * _STD_POSITION * h,
+        10 * _STD_VELOCITY * h, 10 * _STD_VELOCITY * h, np.full(n, 1e-5), 10 * _STD_VELOCITY * h,
+    ], axis=1)
+    cov = np.zeros((n, 8, 8))
+    idx = np.arange(8)
+    cov[:, idx, idx] = std ** 2
+    return mean, cov
+
+
+def _kalman_predict(mean, cov):
+    h = mean[:, 3]
+    n = len(mean)
+    std = np.stack([
+        _STD_POSITION * h, _STD_POSITION * h, np.full(n, 1e-2), _STD_POSITION * h,
+        _STD_VELOCITY * h, _STD_VELOCITY * h, np.full(n, 1e-5), _STD_VELOCITY * h,
+    ], axis=1)
+    mean = mean @ _F.T
+    cov = _F @ cov @ _F.T
+    idx = np.arange(8)
+    cov[:, idx, idx] += std ** 2
+    return mean, cov
+
+
+def _kalman_update(mean, cov, xyah):
+    h = mean[:, 3]
+    n = len(mean)
+    std = np.stack([_STD_POSITION * h, _STD_POSITION * h, np.full(n, 1e-1), _STD_POSITION * h], axis=1)
+    s = cov[:, :4, :4].copy()
+    idx = np.arange(4)
+    s[:, idx, idx] += std ** 2
+    gain = np.linalg.solve(s, cov[:, :4, :]).transpose(0, 2, 1)  # (n, 8, 4) = P H^T S^-1
+    mean = mean + np.einsum("nij,nj->ni", gain, xyah - mean[:, :4])
+    cov = cov - gain @ s @ gain.transpose(0, 2, 1)
+    return mean, cov
+
+
+class ByteTracker:
+    """
+    Multi-object tracker of one stream.
+
+    Args:
+    - track_thresh (float): Detections above this score start/extend tracks first.
+    - low_thresh (float): Lower bound of the second-stage (low score) detections.
+    - new_track_thresh (float): Minimum score to start a new track.
+    - match_thresh (float): Maximum 1 - IoU cost of the first association.
+    - max_age (int): Frames a lost track is kept (default settings.TRACKER_MAX_AGE, scaled by frame_rate / 30).
+    - max_tracks (int): Maximum number of tracks kept (default settings.TRACKER_MAX_TRACKS).
+    - frame_rate (float): Stream frame rate.
+    """
+
+    def __init__(self, track_thresh=None, low_thresh=0.1, new_track_thresh=None, match_thresh=None,
+                 max_age=None, max_tracks=None, frame_rate=30):
+        self.track_thresh = track_thresh if track_thresh is not None else settings.TRACKER_TRACK_THRESH
+        self.low_thresh = low_thresh
+        self.new_track_thresh = new_track_thresh if new_track_thresh is not None else settings.TRACKER_NEW_TRACK_THRESH
+        self.match_thresh = match_thresh if match_thresh is not None else settings.TRACKER_MATCH_THRESH
+        self.max_age = int(round((max_age or settings.TRACKER_MAX_AGE) * frame_rate / 30.0))
+        self.max_tracks = max_tracks or settings.TRACKER_MAX_TRACKS
+        self.reset()
+
+    def reset(self):
+        self.frame_id = 0
+        self._next_id = 1
+        self.mean = np.zeros((0, 8))
+        self.cov = np.zeros((0, 8, 8))
+        self.ids = np.zeros(0, np.int64)
+        self.state = np.zeros(0, np.int8)
+        self.score = np.zeros(0)
+        self.cls = np.zeros(0)
+        self.last_frame = np.zeros(0, np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _keep(self, mask):
+        self.mean, self.cov = self.mean[mask], self.cov[mask]
+        self.ids, self.state = self.ids[mask], self.state[mask]
+        self.score, self.cls, self.last_frame = self.score[mask], self.cls[mask], self.last_frame[mask]
+
+    def _boxes(self, index):
+        return _xyah_to_xyxy(self.mean[index, :4])
+
+    def update(self, detections, img=None):
+        """
+        Associate one frame of detections.
+
+        Args:
+        - detections: Object with numpy `xyxy`, `conf` and `cls` (Ultralytics
+          Boxes on CPU, or postprocess.Detections).
+        - img: Unused, for compatibility with the Ultralytics trackers.
+
+        Returns:
+        (N, 8) float32 rows [x1, y1, x2, y2, track_id, score, cls, detection index]
+        of the tracks updated by this frame.
+        """
+        self.frame_id += 1
+        xyxy = np.asarray(detections.xyxy, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(detections.conf, dtype=np.float64).reshape(-1)
+        classes = np.asarray(detections.cls, dtype=np.float64).reshape(-1)
+
+        # Predict every track (lost tracks don't keep growing in height)
+        if len(self):
+            self.mean[self.state != TRACKED, 7] = 0
+            self.mean, self.cov = _kalman_predict(self.mean, self.cov)
+
+        high = np.flatnonzero(scores >= self.track_thresh)
+        low = np.flatnonzero((scores > self.low_thresh) & (scores < self.track_thresh))
+        matched_tracks, matched_dets = [], []
+
+        # 1) Confirmed and lost tracks <-> high-score detections
+        pool = np.flatnonzero(self.state != TENTATIVE)
+        cost = 1 - iou_matrix(self._boxes(pool), xyxy[high]) * scores[high][None, :]  # IoU fused with scores
+        rows, cols, left_tracks, left_high = _assign(cost, self.match_thresh)
+        matched_tracks.append(pool[rows])
+        matched_dets.append(high[cols])
+        pool, high = pool[left_tracks], high[left_high]
+
+        # 2) Remaining tracked (not lost) tracks <-> low-score detections
+        pool = pool[self.state[pool] == TRACKED]
+        rows, cols, left_tracks, _ = _assign(1 - iou_matrix(self._boxes(pool), xyxy[low]), 0.5)
+        matched_tracks.append(pool[rows])
+        matched_dets.append(low[cols])
+        newly_lost = pool[left_tracks]
+
+        # 3) Tentative tracks <-> remaining high-score detections; unmatched ones are dropped
+        tentative = np.flatnonzero(self.state == TENTATIVE)
+        rows, cols, left_tentative, left_high = _assign(1 - iou_matrix(self._boxes(tentative), xyxy[high]), 0.7)
+        matched_tracks.append(tentative[rows])
+        matched_dets.append(high[cols])
+        high = high[left_high]
+
+        tracks = np.concatenate(matched_tracks).astype(int)
+        dets = np.concatenate(matched_dets).astype(int)
+        if len(tracks):
+            self.mean[tracks], self.cov[tracks] = _kalman_update(
+                self.mean[tracks], self.cov[tracks], _xyxy_to_xyah(xyxy[dets])
+            )
+            self.state[tracks] = TRACKED
+            self.score[tracks] = scores[dets]
+            self.cls[tracks] = classes[dets]
+            self.last_frame[tracks] = self.frame_id
+        self.state[newly_lost] = LOST
+
+        keep = np.ones(len(self), bool)
+        keep[tentative[left_tentative]] = False
+        keep &= (self.state != LOST) | (self.frame_id - self.last_frame <= self.max_age)
+        updated = np.zeros(len(self), bool)
+        updated[tracks] = True
+        det_of_track = np.full(len(self), -1)
+        det_of_track[tracks] = dets
+        self._keep(keep)
+        updated, det_of_track = updated[keep], det_of_track[keep]
+
+        # 4) New tentative tracks (confirmed at once on the very first frame)
+        new = high[scores[high] >= self.new_track_thresh]
+        if len(new):
+            mean, cov = _kalman_initiate(_xyxy_to_xyah(xyxy[new]))
+            self.mean = np.concatenate([self.mean, mean])
+            self.cov = np.concatenate([self.cov, cov])
+            self.ids = np.concatenate([self.ids, np.arange(self._next_id, self._next_id + len(new))])
+            self._next_id += len(new)
+            self.state = np.concatenate([self.state, np.full(len(new), TRACKED if self.frame_id == 1 else TENTATIVE,
+                                                             np.int8)])
+            self.score = np.concatenate([self.score, scores[new]])
+            self.cls = np.concatenate([self.cls, classes[new]])
+            self.last_frame = np.concatenate([self.last_frame, np.full(len(new), self.frame_id)])
+            updated = np.concatenate([updated, np.full(len(new), self.frame_id == 1)])
+            det_of_track = np.concatenate([det_of_track, new])
+
+        # Memory bound: drop the stalest lost tracks first, then the stalest tracks
+        if len(self) > self.max_tracks:
+            order = np.lexsort((self.last_frame, self.state != LOST))  # lost first, oldest first
+            keep = np.ones(len(self), bool)
+            keep[order[:len(self) - self.max_tracks]] = False
+            self._keep(keep)
+            updated, det_of_track = updated[keep], det_of_track[keep]
+
+        out = np.flatnonzero(updated & (self.state == TRACKED))
+        if not len(out):
+            return np.zeros((0, 8), np.float32)
+        return np.column_stack([
+            self._boxes(out), self.ids[out], self.score[out], self.cls[out], det_of_track[out],
+        ]).astype(np.float32)
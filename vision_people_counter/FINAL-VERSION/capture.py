@@ -0,0 +1,312 @@
+"""
+Video capture behind one cv2.VideoCapture-like interface, with cheaper
+decode modes for when we infer far fewer frames than the source produces.
+
+    cap = open_capture("rtsp://...", width=960, target_fps=5, name="rtsp")
+    success, frame = cap.read()
+    cap.stats()   # decode FPS, CPU, skipped frames
+
+Backends:
+- "opencv": cv2.VideoCapture, asking for hardware decode when OpenCV supports it.
+- "pyav":   PyAV / FFmpeg (`pip install av`): multi-threaded decode, scaling
+            fused with the YUV -> BGR conversion, keyframe-only decode.
+
+Modes:
+- width: frames are delivered at this width (aspect kept). PyAV scales during
+  the colour conversion; OpenCV asks webcams for it, otherwise resizes after decode.
+- stride / target_fps: only every Nth frame is retrieved, the others are only
+  grabbed (no colour conversion nor copy).
+- keyframes_only (PyAV, files): the decoder skips every non-key frame.
+"""
+import time
+import warnings
+
+import cv2
+
+import settings
+from metrics import metrics
+
+
+class Capture:
+    """
+    Base class: subclasses implement `_grab`, `_retrieve`, `_timestamp`,
+    `_seek`, `isOpened`, `release` and `fps`. Times every call and keeps
+    decode statistics.
+
+    CPU is measured on the calling thread (`time.thread_time`), so decoder
+    worker threads spawned by FFmpeg itself are not included.
+    """
+
+    backend = "base"
+
+    def __init__(self, name="default", width=None, stride=1):
+        self.name = name
+        self.width = width
+        self.stride = max(1, int(stride))
+        self.decoded = 0
+        self.skipped = 0
+        self._decode_seconds = 0.0
+        self._cpu_seconds = 0.0
+        self._opened_at = time.perf_counter()
+        self._shape = None
+
+    # -- Subclass interface -----------------------------------------------
+
+    def _grab(self):
+        raise NotImplementedError
+
+    def _retrieve(self):
+        raise NotImplementedError
+
+    def _timestamp(self):
+        raise NotImplementedError
+
+    def _seek(self, seconds):
+        raise NotImplementedError
+
+    def isOpened(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    @property
+    def fps(self):
+        """Nominal frame rate of the source (0.0 if unknown)."""
+        return 0.0
+
+    @property
+    def timestamp(self):
+        """Position (seconds) of the last grabbed frame in the source."""
+        return self._timestamp()
+
+    def seek(self, seconds):
+        """Move to `seconds` into a file; the next frame read is the first one at or after it."""
+        return self._seek(seconds)
+
+    # -- cv2.VideoCapture-like API -----------------------------------------
+
+    def grab(self):
+        start, cpu = time.perf_counter(), time.thread_time()
+        ok = self._grab()
+        self._account(start, cpu)
+        return ok
+
+    def retrieve(self):
+        start, cpu = time.perf_counter(), time.thread_time()
+        ok, frame = self._retrieve()
+        if ok and self.width and frame.shape[1] != self.width:
+            h, w = frame.shape[:2]
+            frame = cv2.resize(frame, (self.width, int(round(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        self._account(start, cpu)
+        if ok:
+            self.decoded += 1
+            self._shape = frame.shape
+        return ok, frame
+
+    def read(self):
+        """Skip `stride - 1` frames (grab only), then grab and retrieve one."""
+        start = time.perf_counter()
+        for _ in range(self.stride - 1):
+            if not self.grab():
+                return False, None
+            self.skipped += 1
+        if not self.grab():
+            return False, None
+        ok, frame = self.retrieve()
+        if ok:
+            metrics.observe("decode", self.name, time.perf_counter() - start)
+        return ok, frame
+
+    def _account(self, start, cpu):
+        self._decode_seconds += time.perf_counter() - start
+        self._cpu_seconds += time.thread_time() - cpu
+
+    def stats(self):
+        """
+        Returns a dict with the backend, delivered resolution, frames decoded
+        and skipped, decode FPS (frames per second spent decoding), delivered
+        FPS and CPU usage (% of one core) since the source was opened.
+        """
+        wall = time.perf_counter() - self._opened_at
+        return {
+            "backend": self.backend,
+            "resolution": list(self._shape[1::-1]) if self._shape else None,
+            "decoded": self.decoded,
+            "skipped": self.skipped,
+            "decode_fps": round((self.decoded + self.skipped) / self._decode_seconds, 1) if self._decode_seconds else 0.0,
+            "delivered_fps": round(self.decoded / wall, 1) if wall else 0.0,
+            "cpu_percent": round(100 * self._cpu_seconds / wall, 1) if wall else 0.0,
+        }
+
+
+class OpenCVCapture(Capture):
+    """cv2.VideoCapture, with hardware-accelerated decode requested when available."""
+
+    backend = "opencv"
+
+    def __init__(self, source, name="default", width=None, stride=1, hw_accel=True, open_timeout=None,
+                 read_timeout=None):
+        super().__init__(name, width, stride)
+        params = []
+        if hw_accel and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        # Network streams (FFmpeg backend): give up instead of blocking for minutes
+        if open_timeout and hasattr(cv2, "CAP_PROP_OPEN_TIMEOUT_MSEC"):
+            params += [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(open_timeout * 1000)]
+        if read_timeout and hasattr(cv2, "CAP_PROP_READ_TIMEOUT_MSEC"):
+            params += [cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(read_timeout * 1000)]
+        self.cap = cv2.VideoCapture(source, cv2.CAP_ANY, params) if params else cv2.VideoCapture(source)
+        if width and isinstance(source, int):
+            # Webcams can deliver a smaller mode directly
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+
+    def _grab(self):
+        return self.cap.grab()
+
+    def _retrieve(self):
+        return self.cap.retrieve()
+
+    def _timestamp(self):
+        return self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+    def _seek(self, seconds):
+        return self.cap.set(cv2.CAP_PROP_POS_MSEC, seconds * 1000.0)
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def release(self):
+        self.cap.release()
+
+    @property
+    def fps(self):
+        return self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+
+
+class PyAVCapture(Capture):
+    """PyAV / FFmpeg decoder; see the module docstring for what it adds over OpenCV."""
+
+    backend = "pyav"
+
+    def __init__(self, source, name="default", width=None, stride=1, keyframes_only=False, threads=0,
+                 open_timeout=None, read_timeout=None):
+        import av
+
+        super().__init__(name, width, stride)
+        self._errors = (StopIteration, av.error.FFmpegError)
+        options, fmt, kwargs = {}, None, {}
+        if isinstance(source, int):
+            source, fmt = f"/dev/video{source}", "v4l2"
+        elif str(source).startswith("rtsp://"):
+            options["rtsp_transport"] = "tcp"
+        if open_timeout or read_timeout:
+            kwargs["timeout"] = (open_timeout or read_timeout, read_timeout or open_timeout)
+        try:
+            self.container = av.open(str(source), format=fmt, options=options, **kwargs)
+            self.stream = self.container.streams.video[0]
+        except (av.error.FFmpegError, IndexError):
+            self.container = None
+            return
+        self.stream.thread_type = "AUTO"
+        if threads:
+            self.stream.thread_count = threads
+        if keyframes_only:
+            self.stream.codec_context.skip_frame = "NONKEY"
+        self._frames = self.container.decode(self.stream)
+        self._pending = None
+        self._skip_until = None
+
+    def _grab(self):
+        if self.container is None:
+            return False
+        try:
+            frame = next(self._frames)
+            # After a seek, decode forward from the keyframe to the requested time
+            while self._skip_until is not None and frame.time is not None and frame.time < self._skip_until:
+                frame = next(self._frames)
+            self._skip_until = None
+            self._pending = frame
+            return True
+        except self._errors:
+            self._pending = None
+            return False
+
+    def _timestamp(self):
+        if self._pending is None or self._pending.time is None:
+            return 0.0
+        return float(self._pending.time)
+
+    def _seek(self, seconds):
+        if self.container is None:
+            return False
+        self.container.seek(int(seconds / self.stream.time_base), stream=self.stream, backward=True)
+        self._frames = self.container.decode(self.stream)
+        self._skip_until = seconds - 1e-3
+        return True
+
+    def _retrieve(self):
+        frame = self._pending
+        if frame is None:
+            return False, None
+        if self.width and frame.width != self.width:
+            height = int(round(frame.height * self.width / frame.width / 2)) * 2
+            return True, frame.to_ndarray(width=self.width, height=height, format="bgr24")
+        return True, frame.to_ndarray(format="bgr24")
+
+    def isOpened(self):
+        return self.container is not None
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+
+    @property
+    def fps(self):
+        return float(self.stream.average_rate or 0) if self.container is not None else 0.0
+
+
+BACKENDS = {
+    OpenCVCapture.backend: OpenCVCapture,
+    PyAVCapture.backend: PyAVCapture,
+}
+
+
+def open_capture(source, backend=None, name="default", width=None, stride=None, target_fps=None,
+                 keyframes_only=False, open_timeout=None, read_timeout=None):
+    """
+    Open `source` (file path, URL or webcam index) with the configured decode options.
+
+    Args:
+    - backend (str): "opencv" or "pyav" (default settings.CAPTURE_BACKEND).
+    - width (int): Deliver frames at this width (default settings.CAPTURE_WIDTH, None = native).
+    - stride (int): Retrieve one frame out of `stride`.
+    - target_fps (float): Alternative to `stride`, derived from the source frame
+      rate (default settings.CAPTURE_TARGET_FPS, None = every frame).
+    - keyframes_only (bool): Decode keyframes only (PyAV). With OpenCV it falls
+      back to one frame per second.
+    - open_timeout / read_timeout (float): Seconds before opening or reading a
+      network stream gives up (backend support permitting).
+    """
+    backend = backend or settings.CAPTURE_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown capture backend '{backend}', expected one of {sorted(BACKENDS)}")
+    width = settings.CAPTURE_WIDTH if width is None else width
+    if stride is None and target_fps is None:
+        target_fps = settings.CAPTURE_TARGET_FPS
+
+    if backend == "pyav":
+        cap = PyAVCapture(source, name, width, keyframes_only=keyframes_only, open_timeout=open_timeout,
+                          read_timeout=read_timeout)
+    else:
+        if keyframes_only:
+            warnings.warn("keyframes_only needs the 'pyav' capture backend, sampling 1 frame/s instead")
+            target_fps = 1
+        cap = OpenCVCapture(source, name, width, open_timeout=open_timeout, read_timeout=read_timeout)
+
+    if stride:
+        cap.stride = max(1, int(stride))
+    elif target_fps and cap.fps > target_fps:
+        cap.stride = max(1, int(round(cap.fps / target_fps)))
+    return cap
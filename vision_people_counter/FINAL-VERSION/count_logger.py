@@ -0,0 +1,203 @@
+import atexit
+import csv
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+import settings
+from detection_store import TIME_FORMAT, get_store
+
+_last_logged_count = {}  # dernier nombre de personnes loggé, par source
+
+
+class LogSink:
+    """
+    Buffered writer for the per-source count logs.
+
+    Rows are appended to an in-memory ring buffer and written by a background
+    thread every `flush_interval` seconds, or as soon as `flush_size` rows are
+    waiting. With a `store`, each flush is one SQLite transaction; otherwise
+    each logs/<source>_log.csv stays open between flushes.
+
+    Args:
+    - log_dir (str): Directory of the <source>_log.csv files.
+    - store (DetectionStore): Optional database receiving the rows instead of the CSV files.
+    - flush_interval (float): Maximum time (s) a row stays in memory.
+    - flush_size (int): Number of pending rows that triggers an early flush.
+    - capacity (int): Ring buffer size; the oldest rows are dropped when full.
+
+    A failed flush (e.g. a locked database) puts its rows back in the buffer
+    and is retried at the next flush; the writer thread keeps running.
+    """
+
+    def __init__(self, log_dir="logs", flush_interval=1.0, flush_size=256, capacity=10000, store=None):
+        self.log_dir = log_dir
+        self.store = store
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.dropped = 0
+        self.last_error = None
+
+        self._buffer = deque(maxlen=capacity)
+        self._files = {}
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"log-sink-{log_dir}", daemon=True)
+        self._thread.start()
+
+    def write(self, source_name, timestamp, count):
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+            self._buffer.append((source_name, timestamp, count))
+            pending = len(self._buffer)
+        if pending >= self.flush_size:
+            self._wakeup.set()
+
+    def _writer_for(self, source_name):
+        f = self._files.get(source_name)
+        if f is None:
+            os.makedirs(self.log_dir, exist_ok=True)
+            f = open(os.path.join(self.log_dir, f"{source_name}_log.csv"), "a", newline="")
+            self._files[source_name] = f
+        return f
+
+    def flush(self):
+        """
+        Write every pending row to disk. The buffer is drained and written under
+        one lock, so concurrent flushes keep the rows in order; after a failure,
+        only the rows not written yet go back to the buffer.
+        """
+        with self._io_lock:
+            with self._lock:
+                rows = list(self._buffer)
+                self._buffer.clear()
+            if not rows:
+                return
+            written = 0
+            try:
+                if self.store is not None:
+                    self.store.append_many(rows)  # one transaction: all rows or none
+                    written = len(rows)
+                else:
+                    touched = set()
+                    try:
+                        for source_name, timestamp, count in rows:
+                            f = self._writer_for(source_name)
+                            csv.writer(f).writerow([timestamp.strftime(TIME_FORMAT), count])
+                            touched.add(f)
+                            written += 1
+                    finally:
+                        for f in touched:
+                            f.flush()
+            except Exception:
+                self._requeue(rows[written:])
+                raise
+
+    def _requeue(self, rows):
+        """Put unwritten rows back in front of the newer ones, within the buffer capacity."""
+        with self._lock:
+            room = self._buffer.maxlen - len(self._buffer)
+            if len(rows) > room:
+                self.dropped += len(rows) - room
+                rows = rows[len(rows) - room:] if room else []
+            self._buffer.extendleft(reversed(rows))
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                self.last_error = None
+            except Exception as e:
+                # Rows stay buffered and are retried at the next flush
+                if repr(e) != self.last_error:
+                    print(f"⚠️ Écriture des logs impossible ({self.log_dir}) : {e}")
+                self.last_error = repr(e)
+
+    def close(self):
+        """Stop the writer thread, flush what is left and close the files."""
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout=2)
+        self.flush()
+        with self._io_lock:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def get_sink(log_dir="logs"):
+    """Returns the process-wide LogSink for `log_dir`, shared by every caller."""
+    with _sinks_lock:
+        sink = _sinks.get(log_dir)
+        if sink is None:
+            store = None
+            if settings.LOG_BACKEND == "sqlite":
+                store = get_store(os.path.join(log_dir, settings.DETECTION_DB_NAME))
+            sink = LogSink(
+                log_dir,
+                flush_interval=settings.LOG_FLUSH_INTERVAL,
+                flush_size=settings.LOG_FLUSH_SIZE,
+                capacity=settings.LOG_BUFFER_CAPACITY,
+                store=store,
+            )
+            _sinks[log_dir] = sink
+        return sink
+
+
+def flush(log_dir=None):
+    """Flush one sink (or all of them) so readers see the latest rows."""
+    with _sinks_lock:
+        if log_dir is None:
+            sinks = list(_sinks.values())
+        else:
+            sinks = [_sinks[log_dir]] if log_dir in _sinks else []
+    for sink in sinks:
+        sink.flush()
+
+
+@atexit.register
+def close_all():
+    with _sinks_lock:
+        sinks = list(_sinks.values())
+        _sinks.clear()
+    for sink in sinks:
+        sink.close()
+
+
+def log_people_count(count, source_name="default", log_dir="logs"):
+    """
+    Queue a row for `source_name` unconditionally.
+
+    Returns:
+    The timestamp string of the row.
+    """
+    now = datetime.now()
+    get_sink(log_dir).write(source_name, now, count)
+    return now.strftime(TIME_FORMAT)
+
+
+def log_people_count_if_changed(count, source_name="default", log_dir="logs"):
+    """
+    Queue `count` for `source_name` if it differs from the last value logged
+    for this source. No Streamlit dependency, so it can be used from headless
+    workers.
+
+    Returns:
+    The timestamp string of the queued row, or None if nothing was logged.
+    """
+    previous_count = _last_logged_count.get(source_name)
+    if previous_count is not None and previous_count == count:
+        return None  # aucun changement
+
+    _last_logged_count[source_name] = count
+    return log_people_count(count, source_name, log_dir)
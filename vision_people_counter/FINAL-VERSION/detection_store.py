@@ -0,0 +1,192 @@
+"""
+Append-only SQLite store for people counts, indexed by (source, timestamp).
+
+Replaces the ever-growing logs/<source>_log.csv files: dashboards ask for
+the window they display instead of re-reading a whole file.
+
+Usage:
+    python detection_store.py migrate [--log-dir logs] [--db logs/detections.db]
+    python detection_store.py tail video_1 [--limit 20]
+"""
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import settings
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS counts (
+    source       TEXT    NOT NULL,
+    ts           REAL    NOT NULL,
+    person_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_counts_source_ts ON counts (source, ts);
+"""
+
+
+def _to_epoch(timestamp):
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    if isinstance(timestamp, str):
+        return datetime.strptime(timestamp, TIME_FORMAT).timestamp()
+    return float(timestamp)
+
+
+def format_timestamp(epoch):
+    return datetime.fromtimestamp(epoch).strftime(TIME_FORMAT)
+
+
+class DetectionStore:
+    """
+    SQLite (WAL mode) store of (source, timestamp, person_count) rows.
+
+    A single connection is shared between threads behind a lock; several
+    processes can write to the same file thanks to WAL and the busy timeout.
+
+    Args:
+    - path (str): Database file, created if missing.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def append_many(self, rows):
+        """
+        Insert (source, timestamp, count) rows in one transaction. Timestamps may
+        be datetimes, "%Y-%m-%d %H:%M:%S" strings or epoch seconds.
+
+        Returns:
+        The number of inserted rows.
+        """
+        values = [(source, _to_epoch(ts), int(count)) for source, ts, count in rows]
+        if not values:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO counts (source, ts, person_count) VALUES (?, ?, ?)", values)
+        return len(values)
+
+    def append(self, source, timestamp, count):
+        return self.append_many([(source, timestamp, count)])
+
+    def latest(self, source, limit=20):
+        """
+        The `limit` most recent rows of `source`, oldest first, as
+        (timestamp string, count) tuples.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ts, person_count FROM counts WHERE source = ? ORDER BY ts DESC LIMIT ?",
+                (source, limit),
+            ).fetchall()
+        return [(format_timestamp(ts), count) for ts, count in reversed(rows)]
+
+    def query(self, source, start=None, end=None):
+        """Rows of `source` with start <= ts < end (either bound optional), oldest first."""
+        sql = "SELECT ts, person_count FROM counts WHERE source = ?"
+        params = [source]
+        if start is not None:
+            sql += " AND ts >= ?"
+            params.append(_to_epoch(start))
+        if end is not None:
+            sql += " AND ts < ?"
+            params.append(_to_epoch(end))
+        sql += " ORDER BY ts"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [(format_timestamp(ts), count) for ts, count in rows]
+
+    def last_timestamp(self, source):
+        """Epoch of the most recent row of `source`, or None."""
+        with self._lock:
+            return self._conn.execute("SELECT MAX(ts) FROM counts WHERE source = ?", (source,)).fetchone()[0]
+
+    def sources(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT source FROM counts ORDER BY source")]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=None):
+    """Returns the process-wide DetectionStore for `path` (default logs/<DETECTION_DB_NAME>)."""
+    path = str(path or os.path.join("logs", settings.DETECTION_DB_NAME))
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = DetectionStore(path)
+            _stores[path] = store
+        return store
+
+
+def import_csv_logs(store, log_dir="logs"):
+    """
+    Import every <source>_log.csv of `log_dir` into `store`. Lines that are not
+    "timestamp,count" (headers, blank lines) are skipped, as are rows not newer
+    than what the store already holds, so running the migration twice is safe.
+
+    Returns:
+    A dict {source: number of imported rows}.
+    """
+    imported = {}
+    for filename in sorted(os.listdir(log_dir)):
+        if not filename.endswith("_log.csv"):
+            continue
+        source = filename[:-len("_log.csv")]
+        last_ts = store.last_timestamp(source)
+        rows = []
+        with open(os.path.join(log_dir, filename), newline="") as f:
+            for line in csv.reader(f):
+                try:
+                    row = (source, _to_epoch(line[0]), int(line[1]))
+                except (ValueError, IndexError):
+                    continue
+                if last_ts is None or row[1] > last_ts:
+                    rows.append(row)
+        imported[source] = store.append_many(rows)
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="People count store")
+    parser.add_argument("--db", default=os.path.join("logs", settings.DETECTION_DB_NAME))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser("migrate", help="Import existing logs/<source>_log.csv files")
+    migrate.add_argument("--log-dir", default="logs")
+
+    tail = sub.add_parser("tail", help="Show the latest counts of a source")
+    tail.add_argument("source")
+    tail.add_argument("--limit", type=int, default=20)
+
+    args = parser.parse_args()
+    store = DetectionStore(args.db)
+
+    if args.command == "migrate":
+        for source, n in import_csv_logs(store, args.log_dir).items():
+            print(f"✅ {source}: {n} lignes importées")
+    elif args.command == "tail":
+        for timestamp, count in store.latest(args.source, args.limit):
+            print(f"{timestamp}  {count}")
+
+
+if __name__ == "__main__":
+    main()
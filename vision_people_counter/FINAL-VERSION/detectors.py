@@ -0,0 +1,252 @@
+"""
+Interchangeable detection backends behind one interface.
+
+Every backend returns `postprocess.Detections` in source-frame pixel
+coordinates, so counting/logging code does not care which one is used:
+
+- "pytorch":  Ultralytics YOLO (.pt, or an exported OpenVINO directory)
+- "onnxruntime": ONNX Runtime on an exported YOLOv8 .onnx (OpenVINO EP if installed)
+- "opencv":   OpenCV DNN on the same .onnx file
+- "stub":     no model, synthetic boxes (benchmarks of the non-model stages)
+"""
+import time
+
+import cv2
+import numpy as np
+
+import settings
+from postprocess import Detections
+from preprocess import Letterbox, boxes_to_source
+
+
+# OpenCV DNN backend/target pairs, by name; "auto" takes the first one this OpenCV build offers
+DNN_BACKENDS = {
+    "cuda": (cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA),
+    "cuda_fp16": (cv2.dnn.DNN_BACKEND_CUDA, cv2.dnn.DNN_TARGET_CUDA_FP16),
+    "vulkan": (cv2.dnn.DNN_BACKEND_VKCOM, cv2.dnn.DNN_TARGET_VULKAN),
+    "opencl": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL),
+    "opencl_fp16": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_OPENCL_FP16),
+    "cpu": (cv2.dnn.DNN_BACKEND_OPENCV, cv2.dnn.DNN_TARGET_CPU),
+}
+_DNN_AUTO = ("cuda", "vulkan", "opencl", "cpu")
+
+
+def _dnn_available(name):
+    backend, target = DNN_BACKENDS[name]
+    if target in (cv2.dnn.DNN_TARGET_OPENCL, cv2.dnn.DNN_TARGET_OPENCL_FP16) and not cv2.ocl.haveOpenCL():
+        return False
+    try:
+        return target in cv2.dnn.getAvailableTargets(backend)
+    except cv2.error:
+        return False
+
+
+def configure_dnn(net, backend=None):
+    """
+    Run `net` on the requested OpenCV DNN backend (default settings.DNN_BACKEND),
+    falling back to the CPU when this OpenCV build or machine lacks it.
+
+    Args:
+    - backend (str): A key of DNN_BACKENDS, or "auto" for CUDA, then Vulkan,
+      then OpenCL, then CPU.
+
+    Returns:
+    The name of the backend actually used.
+    """
+    backend = backend or settings.DNN_BACKEND
+    if backend != "auto" and backend not in DNN_BACKENDS:
+        raise ValueError(f"Unknown DNN backend '{backend}', expected 'auto' or one of {sorted(DNN_BACKENDS)}")
+    candidates = _DNN_AUTO if backend == "auto" else (backend, "cpu")
+    chosen = next(name for name in candidates if name == "cpu" or _dnn_available(name))
+    if chosen != backend and backend != "auto":
+        print(f"⚠️ Backend DNN « {backend} » indisponible, repli sur le CPU")
+    net.setPreferableBackend(DNN_BACKENDS[chosen][0])
+    net.setPreferableTarget(DNN_BACKENDS[chosen][1])
+    return chosen
+
+
+def nms(xyxy, scores, cls, iou_threshold=0.45):
+    """Class-aware NMS; returns the indices to keep."""
+    if len(scores) == 0:
+        return np.empty(0, dtype=np.int64)
+    # Offset boxes by class so boxes of different classes never overlap
+    offset = cls[:, None].astype(np.float32) * 4096.0
+    boxes = xyxy + offset
+    xywh = np.concatenate([boxes[:, :2], boxes[:, 2:] - boxes[:, :2]], axis=1)
+    keep = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), 0.0, iou_threshold)
+    return np.asarray(keep, dtype=np.int64).reshape(-1)
+
+
+def decode_yolov8(output, conf, ratio, pad, iou_threshold=0.45, classes=None, source_shape=None):
+    """
+    Decode a raw YOLOv8 head output of shape (4 + nc, N) into Detections,
+    entirely with array operations, and map the boxes back to the source frame.
+    """
+    preds = output.T  # (N, 4 + nc)
+    scores = preds[:, 4:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(cls)), cls]
+    mask = best > conf
+    if classes is not None:
+        mask &= np.isin(cls, classes)
+    preds, cls, best = preds[mask], cls[mask], best[mask]
+
+    cx, cy, w, h = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+    xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    keep = nms(xyxy, best, cls, iou_threshold)
+    xyxy, best, cls = xyxy[keep], best[keep], cls[keep]
+
+    return Detections(boxes_to_source(xyxy, ratio, pad, source_shape), best, cls)
+
+
+class Detector:
+    """Base class: subclasses implement `detect_batch`."""
+
+    name = "base"
+
+    def detect(self, frame, conf=0.25):
+        return self.detect_batch([frame], conf)[0]
+
+    def detect_batch(self, frames, conf=0.25):
+        raise NotImplementedError
+
+
+class UltralyticsDetector(Detector):
+    """PyTorch (or any format Ultralytics can load, e.g. OpenVINO) through `YOLO.predict`."""
+
+    name = "pytorch"
+
+    def __init__(self, model_path=None, imgsz=640, device=None):
+        from model_registry import get_model
+
+        self.model = get_model(model_path or settings.DETECTION_MODEL, device=device)
+        self.imgsz = imgsz
+
+    def detect_batch(self, frames, conf=0.25):
+        results = self.model.predict(list(frames), conf=conf, imgsz=self.imgsz, verbose=False)
+        return [Detections.from_boxes(r.boxes) for r in results]
+
+
+class _YoloV8OnnxDetector(Detector):
+    def __init__(self, imgsz=640, classes=None):
+        self.imgsz = imgsz
+        self.classes = classes
+        self.letterbox = Letterbox(imgsz, auto=False)
+        self._blob_buffer = np.empty((0, 3, imgsz, imgsz), dtype=np.float32)
+
+    def _blob(self, frames):
+        """Letterbox each frame once and write it straight into a reused NCHW float blob."""
+        if len(self._blob_buffer) < len(frames):
+            self._blob_buffer = np.empty((len(frames), 3, self.imgsz, self.imgsz), dtype=np.float32)
+        blob = self._blob_buffer[:len(frames)]
+        transforms = []
+        for i, frame in enumerate(frames):
+            lb = self.letterbox(frame)
+            blob[i] = cv2.dnn.blobFromImage(lb.image, 1 / 255.0, swapRB=True)[0]
+            transforms.append((lb.ratio, lb.pad, lb.source_shape))
+        return blob, transforms
+
+    def _forward(self, blob):
+        raise NotImplementedError
+
+    def detect_batch(self, frames, conf=0.25):
+        blob, transforms = self._blob(frames)
+        outputs = self._forward(blob)
+        return [
+            decode_yolov8(out, conf, ratio, pad, classes=self.classes, source_shape=shape)
+            for out, (ratio, pad, shape) in zip(outputs, transforms)
+        ]
+
+
+class OnnxRuntimeDetector(_YoloV8OnnxDetector):
+    """YOLOv8 .onnx on ONNX Runtime; picks the OpenVINO provider when available."""
+
+    name = "onnxruntime"
+
+    def __init__(self, model_path=None, imgsz=640, classes=None, threads=None):
+        import onnxruntime as ort
+
+        super().__init__(imgsz, classes)
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        providers = [p for p in ("OpenVINOExecutionProvider", "CPUExecutionProvider")
+                     if p in ort.get_available_providers()]
+        self.session = ort.InferenceSession(str(model_path or settings.ONNX_MODEL), options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        # Models exported without dynamic=True only take a batch of 1
+        self.fixed_batch = isinstance(self.session.get_inputs()[0].shape[0], int)
+
+    def _forward(self, blob):
+        if self.fixed_batch:
+            return [self.session.run(None, {self.input_name: blob[i:i + 1]})[0][0] for i in range(len(blob))]
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenCVDnnDetector(_YoloV8OnnxDetector):
+    """YOLOv8 .onnx on OpenCV DNN (no extra dependency)."""
+
+    name = "opencv"
+
+    def __init__(self, model_path=None, imgsz=640, classes=None, dnn_backend=None):
+        super().__init__(imgsz, classes)
+        self.net = cv2.dnn.readNetFromONNX(str(model_path or settings.ONNX_MODEL))
+        self.dnn_backend = configure_dnn(self.net, dnn_backend)
+
+    def _forward(self, blob):
+        outputs = []
+        for i in range(len(blob)):
+            self.net.setInput(blob[i:i + 1])
+            outputs.append(self.net.forward()[0])
+        return outputs
+
+
+class StubDetector(Detector):
+    """
+    Weight-free detector returning `n_boxes` random boxes per frame after an
+    optional fixed `latency_ms`, so the rest of the pipeline can be measured alone.
+    """
+
+    name = "stub"
+
+    def __init__(self, model_path=None, n_boxes=20, latency_ms=0.0, seed=0):
+        self.n_boxes = n_boxes
+        self.latency = latency_ms / 1000.0
+        self.rng = np.random.default_rng(seed)
+
+    def detect_batch(self, frames, conf=0.25):
+        if self.latency:
+            time.sleep(self.latency * len(frames))
+        detections = []
+        for frame in frames:
+            h, w = frame.shape[:2]
+            xy = self.rng.uniform(0, 1, size=(self.n_boxes, 2)) * (w * 0.9, h * 0.8)
+            wh = self.rng.uniform(0.03, 0.1, size=(self.n_boxes, 2)) * (w, h * 2)
+            scores = self.rng.uniform(0.2, 1.0, size=self.n_boxes)
+            cls = self.rng.choice([0, 0, 0, 2], size=self.n_boxes)
+            keep = scores > conf
+            detections.append(Detections(np.hstack([xy, xy + wh])[keep], scores[keep], cls[keep]))
+        return detections
+
+
+BACKENDS = {
+    UltralyticsDetector.name: UltralyticsDetector,
+    OnnxRuntimeDetector.name: OnnxRuntimeDetector,
+    OpenCVDnnDetector.name: OpenCVDnnDetector,
+    StubDetector.name: StubDetector,
+}
+
+
+def create_detector(backend=None, model_path=None, **kwargs):
+    """
+    Build a detector by backend name (default settings.DETECTOR_BACKEND).
+
+    Args:
+    - backend (str): "pytorch", "onnxruntime", "opencv" or "stub".
+    - model_path (str): Weights file; defaults to settings.DETECTION_MODEL for
+      "pytorch" and settings.ONNX_MODEL for the ONNX backends.
+    """
+    backend = backend or settings.DETECTOR_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[backend](model_path, **kwargs)
@@ -0,0 +1,57 @@
+"""
+One-shot export of settings.DETECTION_MODEL for the CPU backends of detectors.py.
+
+Usage:
+    python export_model.py --format onnx              # -> weights/yolov8n.onnx
+    python export_model.py --format onnx --int8       # + dynamic INT8 quantisation (weights/yolov8n.int8.onnx)
+    python export_model.py --format openvino --half   # FP16 OpenVINO IR, loadable by the "pytorch" backend
+    python export_model.py --format openvino --int8   # INT8 OpenVINO IR (calibrated by Ultralytics)
+"""
+import argparse
+from pathlib import Path
+
+import settings
+
+
+def export(model_path, fmt="onnx", imgsz=640, half=False, int8=False, dynamic=False):
+    """
+    Export `model_path` with Ultralytics and, for ONNX + INT8, quantise the
+    result with onnxruntime (Ultralytics only quantises OpenVINO/TFLite itself).
+
+    Returns:
+    The path of the exported model.
+    """
+    from ultralytics import YOLO
+
+    model = YOLO(str(model_path))
+    native_int8 = int8 and fmt != "onnx"
+    exported = model.export(format=fmt, imgsz=imgsz, half=half, int8=native_int8, dynamic=dynamic)
+
+    if int8 and fmt == "onnx":
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized = Path(exported).with_suffix(".int8.onnx")
+        quantize_dynamic(str(exported), str(quantized), weight_type=QuantType.QUInt8)
+        exported = quantized
+    return exported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the detection model for CPU backends")
+    parser.add_argument("--model", default=str(settings.DETECTION_MODEL))
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--half", action="store_true", help="FP16 weights (OpenVINO)")
+    parser.add_argument("--int8", action="store_true", help="INT8 weights")
+    parser.add_argument("--dynamic", action="store_true", help="Dynamic batch size (ONNX)")
+    args = parser.parse_args()
+
+    if args.half and args.format == "onnx":
+        parser.error("--half is only useful with --format openvino on CPU")
+
+    path = export(args.model, args.format, args.imgsz, args.half, args.int8, args.dynamic)
+    print(f"✅ Modèle exporté : {path}")
+
+
+if __name__ == "__main__":
+    main()
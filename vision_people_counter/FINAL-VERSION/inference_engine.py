@@ -0,0 +1,377 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import settings
+from bytetrack import ByteTracker
+from metrics import metrics
+from preprocess import Letterbox, boxes_to_source
+from tiling import merge_boxes
+
+
+class _Request:
+    __slots__ = ("source_id", "frame", "conf", "tracker", "tiler", "zones", "future", "submitted_at")
+
+    def __init__(self, source_id, frame, conf, tracker, tiler=None, zones=None):
+        self.source_id = source_id
+        self.frame = frame
+        self.conf = conf
+        self.tracker = tracker
+        self.tiler = tiler
+        self.zones = zones
+        self.future = Future()
+        self.submitted_at = time.perf_counter()
+
+
+NUMPY_BYTETRACK = "bytetrack-numpy"
+
+
+class EngineClosed(RuntimeError):
+    """The engine was closed (e.g. its model was evicted) before the frame was processed."""
+
+
+def _make_tracker(tracker_cfg, frame_rate=30):
+    """
+    Build a standalone tracker: the pure-NumPy ByteTrack for NUMPY_BYTETRACK,
+    otherwise an Ultralytics tracker (ByteTrack/BoT-SORT) from its yaml config,
+    the same way `model.track` does internally. Lost tracks are kept
+    settings.TRACKER_MAX_AGE frames in both cases.
+    """
+    if tracker_cfg == NUMPY_BYTETRACK:
+        return ByteTracker(frame_rate=frame_rate)
+
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+
+    cfg = IterableSimpleNamespace(**yaml_load(check_yaml(tracker_cfg)))
+    cfg.track_buffer = settings.TRACKER_MAX_AGE
+    return TRACKER_MAP[cfg.tracker_type](args=cfg, frame_rate=frame_rate)
+
+
+def _bound_tracker(tracker, max_tracks):
+    """
+    Cap the track lists of an Ultralytics tracker, which keeps every removed
+    track: the oldest removed, then lost tracks are dropped first.
+    """
+    removed = getattr(tracker, "removed_stracks", None)
+    if removed is None:
+        return  # ByteTracker bounds itself
+    lost = tracker.lost_stracks
+    excess = len(tracker.tracked_stracks) + len(lost) + len(removed) - max_tracks
+    if excess > 0:
+        drop = min(excess, len(removed))
+        del removed[:drop]
+        excess -= drop
+    if excess > 0:
+        lost.sort(key=lambda t: t.end_frame)
+        del lost[:min(excess, len(lost))]
+
+
+def _apply_tracker(tracker, result):
+    """Update `tracker` with the detections of `result` and return the tracked result."""
+    import torch
+
+    det = result.boxes.cpu().numpy()
+    if len(det) == 0:
+        return result
+    tracks = tracker.update(det, result.orig_img)
+    _bound_tracker(tracker, settings.TRACKER_MAX_TRACKS)
+    if len(tracks) == 0:
+        return result[[]]
+    idx = tracks[:, -1].astype(int)
+    result = result[idx]
+    result.update(boxes=torch.as_tensor(tracks[:, :-1]))
+    return result
+
+
+def _to_source(result, frame, lb, offset=None):
+    """
+    Re-attach a result computed on a letterboxed frame to its source frame, or
+    to the frame a tile (a window of it starting at `offset`) was cut from.
+    """
+    data = result.boxes.data.clone()
+    boxes_to_source(data[:, :4], lb.ratio, lb.pad)
+    if offset is not None:
+        data[:, [0, 2]] += offset[0]
+        data[:, [1, 3]] += offset[1]
+    result.orig_img = frame
+    result.orig_shape = frame.shape[:2]
+    result.update(boxes=data)
+    return result
+
+
+def _merge_tiles(results):
+    """One result for a frame from the results of its windows (already in frame pixels)."""
+    import torch
+
+    data = torch.cat([r.boxes.data for r in results])
+    window = torch.cat([torch.full((len(r.boxes),), i) for i, r in enumerate(results)]).numpy()
+    boxes = data.cpu().numpy()
+    keep, merged = merge_boxes(boxes[:, :4], boxes[:, 4], boxes[:, 5], settings.TILE_MERGE_THRESHOLD, window)
+    data = data[torch.as_tensor(keep, dtype=torch.long, device=data.device)]
+    data[:, :4] = torch.as_tensor(merged, device=data.device)
+    result = results[0]
+    result.update(boxes=data)
+    return result
+
+
+class InferenceEngine:
+    """
+    Shared inference service that batches frames coming from several streams.
+
+    Frames submitted by any source are collected until `max_batch_size` frames
+    are waiting or the oldest one has waited `max_wait_ms`, then run through a
+    single `model.predict` call. Tracking is applied afterwards with one
+    tracker instance per source, so IDs from different cameras never mix.
+    Trackers hold at most settings.TRACKER_MAX_TRACKS tracks and are dropped
+    after settings.TRACKER_IDLE_SECONDS without frames.
+
+    Detection models get native-resolution frames letterboxed once to `imgsz`
+    (see preprocess.Letterbox), which Ultralytics then passes through without
+    resampling again; boxes are mapped back to source pixels.
+
+    Frames submitted with a `tiling.Tiler` are cut into native-resolution
+    tiles that join the same forward pass as the other frames; their
+    detections are merged across tiles into one result per frame.
+
+    Args:
+    - model (YOLO): A loaded Ultralytics model.
+    - max_batch_size (int): Upper bound on frames per forward pass.
+    - max_wait_ms (float): How long the first frame of a batch may wait for company.
+    - imgsz (int): Model input size.
+    """
+
+    def __init__(self, model, max_batch_size=8, max_wait_ms=10, imgsz=640):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.imgsz = imgsz
+        # Masks/keypoints would also need remapping: only detection models are letterboxed here
+        self._letterbox = (
+            Letterbox(imgsz, n_buffers=self.max_batch_size) if getattr(model, "task", "detect") == "detect" else None
+        )
+        self._tile_letterbox = None  # grown to the largest number of tiles per batch
+
+        self._requests = queue.Queue()
+        self._submit_lock = threading.Lock()
+        self._trackers = {}
+        self._tracker_used = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        self._batch_sizes = Counter()
+        self._wait_times = deque(maxlen=500)
+        self._batch_latencies = deque(maxlen=500)
+        self._frames = 0
+
+        self._worker = threading.Thread(target=self._run, name="inference-engine", daemon=True)
+        self._worker.start()
+
+    def submit(self, source_id, frame, conf, tracker=None, tiler=None, zones=None):
+        """
+        Queue a frame for inference.
+
+        Args:
+        - source_id (str): Stream identifier, also used to select the tracker state.
+        - frame (numpy array): BGR image.
+        - conf (float): Confidence threshold.
+        - tracker (str): Tracker yaml ("bytetrack.yaml"/"botsort.yaml"), NUMPY_BYTETRACK, or None
+          for plain detection.
+        - tiler (tiling.Tiler): Run the frame as overlapping native-resolution tiles
+          (detection models only).
+        - zones (zones.ZoneMap): Zones of the source, for a zones-only tiler.
+
+        Returns:
+        A Future resolving to the Ultralytics `Results` for this frame.
+        """
+        request = _Request(source_id, frame, conf, tracker, tiler, zones)
+        with self._submit_lock:
+            if self._stop.is_set():
+                request.future.set_exception(EngineClosed("Inference engine closed"))
+            else:
+                self._requests.put(request)
+        return request.future
+
+    def infer(self, source_id, frame, conf, tracker=None, tiler=None, zones=None, timeout=None):
+        """
+        Blocking variant of `submit`, returns a one-element results list like `model.predict`.
+
+        Raises:
+        EngineClosed if the engine is closed meanwhile, concurrent.futures.TimeoutError
+        after `timeout` seconds (default settings.INFERENCE_TIMEOUT).
+        """
+        future = self.submit(source_id, frame, conf, tracker, tiler, zones)
+        return [future.result(timeout=timeout or settings.INFERENCE_TIMEOUT)]
+
+    def reset_tracker(self, source_id):
+        """Forget the tracker state of `source_id` (e.g. when its stream restarts)."""
+        with self._lock:
+            for key in [k for k in self._trackers if k[0] == source_id]:
+                del self._trackers[key]
+                del self._tracker_used[key]
+
+    def _collect_batch(self):
+        try:
+            first = self._requests.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = first.submitted_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _tracker_for(self, request):
+        key = (request.source_id, request.tracker)
+        now = time.monotonic()
+        with self._lock:
+            # Streams that stopped without reset_tracker() (closed page, dropped camera)
+            for stale in [k for k, used in self._tracker_used.items()
+                          if now - used > settings.TRACKER_IDLE_SECONDS]:
+                del self._trackers[stale]
+                del self._tracker_used[stale]
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                tracker = _make_tracker(request.tracker)
+                self._trackers[key] = tracker
+            self._tracker_used[key] = now
+        return tracker
+
+    def _windows(self, request):
+        """(image, offset) pairs to run for `request`: its frame (offset None) or its tiles."""
+        if request.tiler is None or self._letterbox is None:
+            return [(request.frame, None)]
+        crops, windows = request.tiler.crops(request.frame, request.zones)
+        if not crops:
+            return [(request.frame, None)]
+        if len(crops) > 1:
+            metrics.inc("tiles", request.source_id, len(crops))
+        return [(crop, None if crop.shape == request.frame.shape else (x0, y0))
+                for crop, (x0, y0) in zip(crops, windows[:, :2].tolist())]
+
+    def _run_batch(self, batch):
+        # `conf` is a per-call argument in Ultralytics, so group by threshold.
+        groups = {}
+        for request in batch:
+            groups.setdefault(request.conf, []).append(request)
+
+        for conf, requests in groups.items():
+            try:
+                windows = [self._windows(r) for r in requests]
+                n_tiles = sum(offset is not None for pairs in windows for _, offset in pairs)
+                if n_tiles and (self._tile_letterbox is None or self._tile_letterbox.n_buffers < n_tiles):
+                    # Every tile of the batch needs its own buffer until predict() returns
+                    self._tile_letterbox = Letterbox(self.imgsz, n_buffers=n_tiles)
+                letterboxed, frames = [], []
+                for r, pairs in zip(requests, windows):
+                    with metrics.timer("preprocess", r.source_id):
+                        for image, offset in pairs:
+                            if self._letterbox is None:
+                                lb = None
+                                frames.append(image)
+                            else:
+                                lb = (self._letterbox if offset is None else self._tile_letterbox)(image)
+                                frames.append(lb.image)
+                            letterboxed.append(lb)
+                # All the frames and tiles of the batch in one forward pass
+                results = iter(zip(self.model.predict(frames, conf=conf, imgsz=self.imgsz, verbose=False),
+                                   letterboxed))
+                for request, pairs in zip(requests, windows):
+                    parts = []
+                    for _, offset in pairs:
+                        result, lb = next(results)
+                        if lb is not None:
+                            result = _to_source(result, request.frame, lb, offset)
+                        parts.append(result)
+                    result = parts[0] if len(parts) == 1 else _merge_tiles(parts)
+                    if request.tracker:
+                        result = _apply_tracker(self._tracker_for(request), result)
+                    request.future.set_result(result)
+            except Exception as e:
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            start = time.perf_counter()
+            for request in batch:
+                self._wait_times.append(start - request.submitted_at)
+            self._run_batch(batch)
+            self._batch_latencies.append(time.perf_counter() - start)
+            self._batch_sizes[len(batch)] += 1
+            self._frames += len(batch)
+
+    def metrics(self):
+        """
+        Returns batching metrics: number of batches, mean batch size, batch size
+        histogram, mean/max queue wait and mean batch latency (ms).
+        """
+        batches = sum(self._batch_sizes.values())
+        waits = list(self._wait_times)
+        latencies = list(self._batch_latencies)
+        return {
+            "batches": batches,
+            "frames": self._frames,
+            "avg_batch_size": round(self._frames / batches, 2) if batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "avg_wait_ms": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            "max_wait_ms": round(1000 * max(waits), 2) if waits else 0.0,
+            "avg_batch_latency_ms": round(1000 * sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "queued": self._requests.qsize(),
+            "active_trackers": len(self._trackers),
+        }
+
+    def close(self):
+        """Stop the worker and fail the frames still queued with EngineClosed."""
+        with self._submit_lock:
+            self._stop.set()
+        self._worker.join(timeout=2)
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            request.future.set_exception(EngineClosed("Inference engine closed"))
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(model):
+    """
+    Returns the process-wide InferenceEngine for `model`, creating it on first use.
+    Every stream sharing the same model object shares the same batches.
+    """
+    with _engines_lock:
+        engine = _engines.get(id(model))
+        if engine is None:
+            engine = InferenceEngine(
+                model,
+                max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+                max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+                imgsz=settings.INFERENCE_IMGSZ,
+            )
+            _engines[id(model)] = engine
+        return engine
+
+
+def release_engine(model):
+    """Stop and forget the engine of `model` (e.g. when the model is evicted)."""
+    with _engines_lock:
+        engine = _engines.pop(id(model), None)
+    if engine is not None:
+        engine.close()
@@ -0,0 +1,303 @@
+"""
+Live stream ingest: non-blocking open, reconnection with exponential backoff
+and "latest frame wins" delivery, with per-camera health.
+
+    stream = open_live("rtsp://...", name="entree")   # returns at once
+    success, frame = stream.read()                      # waits for the next frame
+    stream.health()   # state, uptime, reconnects, last error
+
+A reader thread owns the capture. It opens the source (with the backend
+open/read timeouts), reads frames as fast as the source delivers them and
+keeps only the newest one, so a slow consumer never gets queued, stale
+frames. When opening or reading fails, the capture is released and reopened
+after `backoff_initial` seconds, doubled up to `backoff_max` on every
+consecutive failure (with jitter, so cameras behind the same failed switch
+don't all reconnect at once); the delay resets as soon as frames flow again.
+
+For tests without a camera, "fake://<video file>?fail_after=10&outage=3"
+plays a file in a loop at its own frame rate and simulates a connection loss
+every `fail_after` seconds, the source staying unreachable for `outage`
+seconds. A real RTSP server can be simulated with FFmpeg (see README).
+"""
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import cv2
+
+import settings
+from capture import Capture, open_capture
+from metrics import metrics
+
+# Stream states, exposed by `health()`
+CONNECTING = "connecting"
+STREAMING = "streaming"
+RECONNECTING = "reconnecting"
+FAILED = "failed"
+CLOSED = "closed"
+
+
+def is_live_source(source):
+    """True for webcams and network streams (anything but a local file)."""
+    return isinstance(source, int) or "://" in str(source)
+
+
+class FakeLiveCapture(Capture):
+    """
+    File-backed stand-in for a flaky camera: "fake://<path>?fps=25&fail_after=10&outage=3".
+    Frames are paced at `fps` (default: the file's), the file loops, and the
+    source fails after `fail_after` seconds then refuses to open for `outage` seconds.
+    """
+
+    backend = "fake"
+    _down_until = {}  # url -> monotonic time until which opening fails
+
+    def __init__(self, url, name="default", width=None, stride=1, **_):
+        super().__init__(name, width, stride)
+        parsed = urlparse(url)
+        query = {k: float(v[0]) for k, v in parse_qs(parsed.query).items()}
+        self.url = url
+        self.fail_after = query.get("fail_after")
+        self.outage = query.get("outage", 0.0)
+        self.cap = None
+        if time.monotonic() < self._down_until.get(url, 0.0):
+            return
+        self.cap = cv2.VideoCapture(parsed.netloc + parsed.path)
+        self._fps = query.get("fps") or self.cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self._next = time.monotonic()
+        self._opened = time.monotonic()
+
+    def _grab(self):
+        now = time.monotonic()
+        if self.fail_after and now - self._opened > self.fail_after:
+            self._down_until[self.url] = now + self.outage
+            return False
+        time.sleep(max(0.0, self._next - now))
+        self._next = max(self._next, now) + 1.0 / self._fps
+        if self.cap.grab():
+            return True
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        return self.cap.grab()
+
+    def _retrieve(self):
+        return self.cap.retrieve()
+
+    def _timestamp(self):
+        return time.monotonic() - self._opened
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+    @property
+    def fps(self):
+        return self._fps if self.cap is not None else 0.0
+
+
+class LiveStream:
+    """
+    Self-healing live source with a cv2.VideoCapture-like `read()`.
+
+    Args:
+    - source: URL (rtsp://, http://, fake://...) or webcam index.
+    - name (str): Stream name, used for metrics and the health registry.
+    - open_timeout / read_timeout (float): Backend timeouts in seconds
+      (default settings.INGEST_OPEN_TIMEOUT / INGEST_READ_TIMEOUT).
+    - backoff_initial / backoff_max (float): Reconnection delays in seconds.
+    - max_retries (int): Consecutive failures before giving up (None = never).
+    - capture_options: Passed to `open_capture` (backend, width, target_fps...).
+    """
+
+    def __init__(self, source, name="default", open_timeout=None, read_timeout=None, backoff_initial=None,
+                 backoff_max=None, max_retries=None, **capture_options):
+        self.source = source
+        self.name = name
+        self.open_timeout = open_timeout or settings.INGEST_OPEN_TIMEOUT
+        self.read_timeout = read_timeout or settings.INGEST_READ_TIMEOUT
+        self.backoff_initial = backoff_initial or settings.INGEST_BACKOFF_INITIAL
+        self.backoff_max = backoff_max or settings.INGEST_BACKOFF_MAX
+        self.max_retries = max_retries
+        self.capture_options = capture_options
+
+        self.state = CONNECTING
+        self.last_error = None
+        self.connects = 0
+        self.reconnects = 0
+        self.frames = 0
+        self.stale = 0  # frames replaced before anyone read them
+        self._capture = None
+        self._frame = None
+        self._seq = 0
+        self._read_seq = 0
+        self._last_frame_at = None
+        self._started_at = time.monotonic()
+        self._up_since = None
+        self._up_seconds = 0.0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"ingest-{name}", daemon=True)
+        self._thread.start()
+        _register(self)
+
+    # -- Reader thread ------------------------------------------------------
+
+    def _open(self):
+        if str(self.source).startswith("fake://"):
+            return FakeLiveCapture(self.source, self.name, **self.capture_options)
+        return open_capture(self.source, name=self.name, open_timeout=self.open_timeout,
+                            read_timeout=self.read_timeout, **self.capture_options)
+
+    def _set_state(self, state):
+        with self._cond:
+            now = time.monotonic()
+            if state == STREAMING and self._up_since is None:
+                self._up_since = now
+            elif state != STREAMING and self._up_since is not None:
+                self._up_seconds += now - self._up_since
+                self._up_since = None
+            self.state = state
+            self._cond.notify_all()
+        metrics.set_gauge("stream_up", self.name, 1 if state == STREAMING else 0)
+
+    def _run(self):
+        delay = self.backoff_initial
+        failures = 0
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            try:
+                capture = self._open()
+            except Exception as e:
+                capture, self.last_error = None, f"{type(e).__name__}: {e}"
+            if capture is not None and capture.isOpened():
+                metrics.observe("connect", self.name, time.perf_counter() - start)
+                self.connects += 1
+                self._capture = capture
+                delivered = self._pump(capture)
+                capture.release()
+                if self._stop.is_set():
+                    break
+                if delivered:
+                    delay, failures = self.backoff_initial, 0
+                self.last_error = "flux interrompu"
+            else:
+                if capture is not None:
+                    capture.release()
+                    self.last_error = "ouverture impossible"
+            failures += 1
+            if self.max_retries is not None and failures > self.max_retries:
+                self._set_state(FAILED)
+                return
+            self.reconnects += 1
+            metrics.inc("reconnects", self.name)
+            self._set_state(RECONNECTING)
+            self._stop.wait(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self.backoff_max)
+        self._set_state(CLOSED)
+
+    def _pump(self, capture):
+        """Read until the capture fails or the stream is released; True if any frame came."""
+        delivered = False
+        while not self._stop.is_set():
+            success, frame = capture.read()
+            if not success:
+                break
+            if not delivered:
+                delivered = True
+                self._set_state(STREAMING)
+            with self._cond:
+                if self._seq > self._read_seq:
+                    self.stale += 1
+                    metrics.inc("dropped_frames", self.name)
+                self._frame = frame
+                self._seq += 1
+                self.frames += 1
+                self._last_frame_at = time.monotonic()
+                self._cond.notify_all()
+        return delivered
+
+    # -- cv2.VideoCapture-like API -------------------------------------------
+
+    def read(self, timeout=None):
+        """
+        Wait for a frame newer than the last one returned. Returns (False, None)
+        once the stream is released or has failed for good, or after `timeout`
+        seconds without a new frame (e.g. to check a stop flag while reconnecting).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._read_seq or self.state in (FAILED, CLOSED), timeout)
+            if self._seq == self._read_seq:
+                return False, None
+            self._read_seq = self._seq
+            return True, self._frame
+
+    def isOpened(self):
+        """True until the stream is released or gives up (also while reconnecting)."""
+        return self.state not in (FAILED, CLOSED) and not self._stop.is_set()
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+        _unregister(self)
+
+    @property
+    def fps(self):
+        return self._capture.fps if self._capture is not None else 0.0
+
+    # -- Health ---------------------------------------------------------------
+
+    def health(self):
+        """State, uptime (% of the time since creation spent streaming), reconnections and last error."""
+        with self._cond:
+            now = time.monotonic()
+            up = self._up_seconds + (now - self._up_since if self._up_since is not None else 0.0)
+            age = now - self._last_frame_at if self._last_frame_at is not None else None
+            return {
+                "state": self.state,
+                "uptime_percent": round(100 * up / max(now - self._started_at, 1e-6), 1),
+                "up_seconds": round(up, 1),
+                "connects": self.connects,
+                "reconnects": self.reconnects,
+                "frames": self.frames,
+                "stale_frames": self.stale,
+                "last_frame_age_s": round(age, 2) if age is not None else None,
+                "last_error": self.last_error,
+            }
+
+    def stats(self):
+        """Decode statistics of the current connection (see Capture.stats) plus `health()`."""
+        stats = self._capture.stats() if self._capture is not None else {}
+        stats.update(self.health())
+        return stats
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def _register(stream):
+    with _streams_lock:
+        _streams[stream.name] = stream
+
+
+def _unregister(stream):
+    with _streams_lock:
+        if _streams.get(stream.name) is stream:
+            del _streams[stream.name]
+
+
+def open_live(source, name="default", **options):
+    """Start a `LiveStream`; returns immediately, the connection happens in the background."""
+    return LiveStream(source, name, **options)
+
+
+def get_health():
+    """{stream name: health dict} of every open LiveStream of the process."""
+    with _streams_lock:
+        streams = list(_streams.values())
+    return {stream.name: stream.health() for stream in streams}
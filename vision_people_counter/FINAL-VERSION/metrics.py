@@ -0,0 +1,259 @@
+"""
+Lightweight per-stage timing and counters for the detection loops.
+
+    with metrics.timer("inference", source_name):
+        res = model.predict(...)
+    metrics.inc("frames", source_name)
+
+When disabled, `timer()` returns a shared no-op context manager, so the hooks
+can stay in the hot loops. Metrics can be exported in Prometheus text format
+over HTTP (/metrics) or to a file, and shown in a Streamlit panel.
+"""
+import bisect
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+
+# Upper bounds (seconds) of the Prometheus histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Histogram:
+    """Cumulative Prometheus-style buckets plus a rolling window for percentiles."""
+
+    __slots__ = ("counts", "total", "count", "window", "lock")
+
+    def __init__(self, window=512):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.window = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+            self.total += seconds
+            self.count += 1
+            self.window.append(seconds)
+
+    def percentile(self, q):
+        with self.lock:
+            samples = sorted(self.window)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q / 100 * len(samples)))]
+
+
+class Metrics:
+    """
+    Registry of stage histograms and counters, labelled by source.
+
+    Args:
+    - enabled (bool): If False every hook is a no-op.
+    - fps_window (float): Seconds over which the per-source FPS is computed.
+    """
+
+    def __init__(self, enabled=True, fps_window=5.0):
+        self.enabled = enabled
+        self.fps_window = fps_window
+        self._histograms = defaultdict(Histogram)   # (stage, source) -> Histogram
+        self._counters = defaultdict(int)           # (name, source) -> int
+        self._gauges = {}                           # (name, source) -> float
+        self._frame_times = defaultdict(lambda: deque(maxlen=1024))
+        self._lock = threading.Lock()
+
+    def timer(self, stage, source="default"):
+        """Context manager timing one execution of `stage` for `source`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self._histograms[(stage, source)])
+
+    def timed(self, stage, source="default"):
+        """Decorator version of `timer`."""
+        def decorator(fn):
+            def wrapper(*args, **kwargs):
+                with self.timer(stage, source):
+                    return fn(*args, **kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            return wrapper
+        return decorator
+
+    def observe(self, stage, source, seconds):
+        if self.enabled:
+            self._histograms[(stage, source)].observe(seconds)
+
+    def inc(self, name, source="default", value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[(name, source)] += value
+        if name == "frames":
+            self._frame_times[source].append(time.monotonic())
+
+    def set_gauge(self, name, source, value):
+        """Set a point-in-time value (e.g. whether a camera is up)."""
+        if self.enabled:
+            self._gauges[(name, source)] = value
+
+    def fps(self, source):
+        times = self._frame_times.get(source)
+        if not times:
+            return 0.0
+        now = time.monotonic()
+        recent = [t for t in times if now - t <= self.fps_window]
+        if len(recent) < 2:
+            return 0.0
+        return (len(recent) - 1) / max(recent[-1] - recent[0], 1e-6)
+
+    def sources(self):
+        return sorted({source for _, source in list(self._histograms)} | {source for _, source in list(self._counters)}
+                      | {source for _, source in list(self._gauges)})
+
+    def summary(self, source):
+        """Dict with FPS, counters and p50/p95 (ms) of every stage of `source`."""
+        stages = {}
+        for (stage, src), hist in list(self._histograms.items()):
+            if src == source:
+                p50, p95 = hist.percentile(50), hist.percentile(95)
+                stages[stage] = {
+                    "p50_ms": round(p50 * 1000, 2) if p50 is not None else None,
+                    "p95_ms": round(p95 * 1000, 2) if p95 is not None else None,
+                }
+        counters = {name: value for (name, src), value in list(self._counters.items()) if src == source}
+        gauges = {name: value for (name, src), value in list(self._gauges.items()) if src == source}
+        return {"fps": round(self.fps(source), 1), "counters": counters, "gauges": gauges, "stages": stages}
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP people_counter_stage_seconds Time spent in each stage of the detection loop.",
+            "# TYPE people_counter_stage_seconds histogram",
+        ]
+        for (stage, source), hist in sorted(list(self._histograms.items())):
+            labels = f'stage="{stage}",source="{source}"'
+            with hist.lock:
+                cumulative = 0
+                for bound, n in zip(BUCKETS, hist.counts):
+                    cumulative += n
+                    lines.append(f'people_counter_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'people_counter_stage_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f"people_counter_stage_seconds_sum{{{labels}}} {hist.total:.6f}")
+                lines.append(f"people_counter_stage_seconds_count{{{labels}}} {hist.count}")
+
+        counters = sorted(list(self._counters.items()))
+        for name in sorted({name for (name, _), _ in counters}):
+            lines.append(f"# TYPE people_counter_{name}_total counter")
+            for (counter, source), value in counters:
+                if counter == name:
+                    lines.append(f'people_counter_{name}_total{{source="{source}"}} {value}')
+
+        gauges = sorted(list(self._gauges.items()))
+        for name in sorted({name for (name, _), _ in gauges}):
+            lines.append(f"# TYPE people_counter_{name} gauge")
+            for (gauge, source), value in gauges:
+                if gauge == name:
+                    lines.append(f'people_counter_{name}{{source="{source}"}} {value:g}')
+
+        lines.append("# TYPE people_counter_fps gauge")
+        for source in self.sources():
+            lines.append(f'people_counter_fps{{source="{source}"}} {self.fps(source):.2f}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """Write the metrics to `path` (e.g. for node_exporter's textfile collector)."""
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp, path)
+
+
+metrics = Metrics(enabled=settings.METRICS_ENABLED)
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def _serve(port, host=None):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host or settings.METRICS_HOST, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def _write_periodically(path, interval):
+    last_error = None
+    while True:
+        try:
+            metrics.write_prometheus(path)
+            last_error = None
+        except Exception as e:
+            # Retried at the next interval; reported once per distinct error
+            if repr(e) != last_error:
+                print(f"⚠️ Écriture des métriques impossible ({path}) : {e}")
+            last_error = repr(e)
+        time.sleep(interval)
+
+
+def start_exporters():
+    """
+    Start the exporters configured in settings (METRICS_PORT on METRICS_HOST, METRICS_FILE).
+    Safe to call on every Streamlit rerun: they are only started once per process.
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started or not metrics.enabled:
+            return
+        _exporters_started = True
+    if settings.METRICS_PORT:
+        _serve(settings.METRICS_PORT)
+    if settings.METRICS_FILE:
+        threading.Thread(target=_write_periodically, args=(settings.METRICS_FILE, settings.METRICS_FILE_INTERVAL),
+                         name="metrics-file", daemon=True).start()
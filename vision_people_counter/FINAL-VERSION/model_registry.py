@@ -0,0 +1,213 @@
+"""
+Process-wide cache of loaded YOLO models.
+
+Streamlit re-executes the app script on every interaction but keeps imported
+modules, so models cached here survive reruns and are shared by sessions.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+import settings
+from inference_engine import release_engine
+
+
+def _rss_bytes():
+    """Current resident set size (Linux only), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _model_bytes(model):
+    """Size of the weights and buffers of an Ultralytics/PyTorch model."""
+    try:
+        module = model.model
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except AttributeError:
+        return 0
+
+
+class _Entry:
+    __slots__ = ("model", "load_s", "warmup_s", "bytes", "rss_delta", "last_used", "hits", "users")
+
+    def __init__(self, model, load_s, warmup_s, n_bytes, rss_delta):
+        self.model = model
+        self.load_s = load_s
+        self.warmup_s = warmup_s
+        self.bytes = n_bytes
+        self.rss_delta = rss_delta
+        self.last_used = time.time()
+        self.hits = 0
+        self.users = 0  # running streams holding the model (see `in_use`), never evicted
+
+
+class ModelRegistry:
+    """
+    LRU cache of models keyed by (path, task, device).
+
+    Args:
+    - memory_budget_mb (float): Least recently used models are evicted once the
+      cached weights exceed this budget (the most recent model, and the models
+      held by running streams, are always kept).
+    - warmup (bool): Run one dummy inference right after loading.
+    - warmup_size (int): Side of the square blank image used for warm-up.
+    """
+
+    def __init__(self, memory_budget_mb=1024, warmup=True, warmup_size=640):
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.warmup = warmup
+        self.warmup_size = warmup_size
+        self._entries = OrderedDict()
+        self._loading = {}  # key -> Event set once the model is loaded (or failed to)
+        self._lock = threading.Lock()
+        self._evict_callbacks = []
+
+    def on_evict(self, callback):
+        """Register `callback(model)` to be called when a model leaves the cache."""
+        self._evict_callbacks.append(callback)
+
+    def _load(self, path, task, device):
+        from ultralytics import YOLO
+
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        model = YOLO(path, task=task)
+        if device is not None:
+            model.to(device)
+        load_s = time.perf_counter() - start
+
+        warmup_s = 0.0
+        if self.warmup:
+            start = time.perf_counter()
+            blank = np.zeros((self.warmup_size, self.warmup_size, 3), dtype=np.uint8)
+            model.predict(blank, device=device, verbose=False)
+            warmup_s = time.perf_counter() - start
+
+        rss_after = _rss_bytes()
+        rss_delta = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        return _Entry(model, load_s, warmup_s, _model_bytes(model), rss_delta)
+
+    def get(self, path, task=None, device=None):
+        """
+        Returns the cached model for (path, task, device), loading and warming it up if needed.
+        Loading runs outside the registry lock: other models stay available meanwhile, and
+        concurrent callers of the same model wait for the one loading it.
+        """
+        key = (str(path), task, device)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    entry.last_used = time.time()
+                    entry.hits += 1
+                    return entry.model
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            loading.wait()
+
+        try:
+            entry = self._load(str(path), task, device)
+            with self._lock:
+                entry.hits += 1
+                self._entries[key] = entry
+                evicted = self._evict_over_budget()
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+        self._release(evicted)
+        return entry.model
+
+    @contextmanager
+    def in_use(self, model):
+        """
+        Keep `model` in the cache while the block runs (e.g. a stream loop): an
+        evicted model still used by a stream would free nothing and get a new engine.
+        """
+        with self._lock:
+            entry = next((e for e in self._entries.values() if e.model is model), None)
+            if entry is not None:
+                entry.users += 1
+        try:
+            yield model
+        finally:
+            if entry is not None:
+                with self._lock:
+                    entry.users -= 1
+                    evicted = self._evict_over_budget()
+                self._release(evicted)
+
+    def _evict_over_budget(self):
+        """Pop least recently used, unused models over the budget; returns them (lock held)."""
+        evicted = []
+        total = sum(e.bytes for e in self._entries.values())
+        for key in list(self._entries)[:-1]:
+            if total <= self.memory_budget:
+                break
+            entry = self._entries[key]
+            if entry.users:
+                continue
+            del self._entries[key]
+            total -= entry.bytes
+            evicted.append(entry)
+        return evicted
+
+    def _release(self, entries):
+        """Eviction callbacks (which may close engines), run without the lock."""
+        for entry in entries:
+            for callback in self._evict_callbacks:
+                callback(entry.model)
+
+    def evict(self, path, task=None, device=None):
+        with self._lock:
+            entry = self._entries.pop((str(path), task, device), None)
+        if entry is not None:
+            self._release([entry])
+
+    def stats(self):
+        """
+        Returns one dict per cached model (most recently used last) with load
+        time, warm-up time, weight size and resident memory growth at load.
+        """
+        with self._lock:
+            return [
+                {
+                    "path": path,
+                    "task": task,
+                    "device": device,
+                    "load_s": round(e.load_s, 3),
+                    "warmup_s": round(e.warmup_s, 3),
+                    "weights_mb": round(e.bytes / 1024 / 1024, 1),
+                    "rss_delta_mb": round(e.rss_delta / 1024 / 1024, 1) if e.rss_delta is not None else None,
+                    "hits": e.hits,
+                }
+                for (path, task, device), e in self._entries.items()
+            ]
+
+
+registry = ModelRegistry(
+    memory_budget_mb=settings.MODEL_MEMORY_BUDGET_MB,
+    warmup=settings.MODEL_WARMUP,
+)
+registry.on_evict(release_engine)
+
+
+def get_model(path, task=None, device=None):
+    """Shortcut for `registry.get` on the process-wide registry."""
+    return registry.get(path, task, device)
+
+
+def model_in_use(model):
+    """Shortcut for `registry.in_use` on the process-wide registry."""
+    return registry.in_use(model)
@@ -0,0 +1,106 @@
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Decide whether a frame is worth a YOLO inference.
+
+    The frame is downscaled to a small grayscale image and compared to a
+    running-average background. Inference runs when enough pixels changed,
+    but never faster than the (adaptive) target FPS, and at least every
+    `max_skip_seconds` so slow changes are eventually picked up.
+
+    Args:
+    - width (int): Width of the downscaled image used for differencing.
+    - pixel_threshold (int): Gray level difference for a pixel to count as changed.
+    - min_changed_ratio (float): Fraction of changed pixels that means "motion".
+    - target_fps (float): Upper bound on inferences per second (None = no cap).
+    - max_skip_seconds (float): Force an inference after this long without one.
+    - background_alpha (float): Background update rate (cv2.accumulateWeighted).
+    - headroom (float): The FPS cap is lowered so inference takes at most
+      1/headroom of the wall time when it gets slower than the target allows.
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, min_changed_ratio=0.002,
+                 target_fps=None, max_skip_seconds=2.0, background_alpha=0.05, headroom=1.5):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.target_fps = target_fps
+        self.max_skip_seconds = max_skip_seconds
+        self.background_alpha = background_alpha
+        self.headroom = headroom
+
+        self._background = None
+        self._last_inference = None
+        self._inference_cost = None  # EWMA of inference time (s)
+
+        self.frames = 0
+        self.inferred = 0
+        self.motion_ratio = 0.0
+
+    def _downscale(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.width, max(1, int(h * self.width / w)))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    @property
+    def effective_fps(self):
+        """Target FPS lowered to what the measured inference cost allows."""
+        fps = self.target_fps
+        if self._inference_cost:
+            affordable = 1.0 / (self._inference_cost * self.headroom)
+            fps = affordable if fps is None else min(fps, affordable)
+        return fps
+
+    def should_infer(self, frame, now=None):
+        """Returns True if `frame` should go through inference."""
+        now = time.monotonic() if now is None else now
+        self.frames += 1
+        small = self._downscale(frame)
+
+        if self._background is None:
+            self._background = small.astype(np.float32)
+            return self._accept(now)
+
+        diff = cv2.absdiff(small, cv2.convertScaleAbs(self._background))
+        self.motion_ratio = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+        cv2.accumulateWeighted(small, self._background, self.background_alpha)
+
+        elapsed = now - self._last_inference if self._last_inference is not None else float("inf")
+        if elapsed >= self.max_skip_seconds:
+            return self._accept(now)
+        if self.motion_ratio < self.min_changed_ratio:
+            return False
+        fps = self.effective_fps
+        if fps and elapsed < 1.0 / fps:
+            return False
+        return self._accept(now)
+
+    def _accept(self, now):
+        self._last_inference = now
+        self.inferred += 1
+        return True
+
+    def record_inference(self, seconds):
+        """Feed the measured inference time so the FPS cap adapts to load."""
+        if self._inference_cost is None:
+            self._inference_cost = seconds
+        else:
+            self._inference_cost = 0.9 * self._inference_cost + 0.1 * seconds
+
+    def stats(self):
+        skipped = self.frames - self.inferred
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": skipped,
+            "skip_ratio": round(skipped / self.frames, 3) if self.frames else 0.0,
+            "effective_fps": round(self.effective_fps, 1) if self.effective_fps else None,
+        }
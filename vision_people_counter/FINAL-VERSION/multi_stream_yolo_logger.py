@@ -0,0 +1,208 @@
+"""
+Headless multi-stream people counter.
+
+Runs every source in its own worker process (or a fixed-size pool pinned to
+CPU cores), loads the YOLO model once per worker and writes count changes to
+logs/<source>_log.csv, exactly like the Streamlit apps.
+
+Usage:
+    python multi_stream_yolo_logger.py                      # all settings.VIDEOS_DICT
+    python multi_stream_yolo_logger.py video_1 0 rtsp://...  # names, webcam ids or URLs
+    python multi_stream_yolo_logger.py --workers 8 --pin
+    python multi_stream_yolo_logger.py --capture pyav --decode-width 960 --keyframes
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import re
+import time
+
+import settings
+import count_logger
+from postprocess import count_persons
+
+# Globals set once per worker process by _init_worker
+_detector = None
+
+# Seconds a new worker waits for a free core group before running unpinned
+PIN_TIMEOUT = 1.0
+
+
+def _source_name(source):
+    """Build a log-friendly name for a source given on the command line."""
+    if source in settings.VIDEOS_DICT:
+        return source
+    if source.isdigit():
+        return f"webcam{source}"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", source).strip("_")[-64:]
+
+
+def _resolve_source(source):
+    """Map a command line source to something `capture.open_capture` accepts."""
+    if source in settings.VIDEOS_DICT:
+        return str(settings.VIDEOS_DICT[source])
+    if source.isdigit():
+        return int(source)
+    return source
+
+
+def _pin_worker(cores):
+    """
+    Pin the process to the next core group of the `cores` queue. A worker that
+    replaces a dead one finds the queue empty: it runs unpinned instead of waiting.
+    """
+    if cores is None:
+        return
+    try:
+        core = cores.get(timeout=PIN_TIMEOUT)
+    except queue.Empty:
+        print(f"⚠️ Worker {os.getpid()} : aucun cœur libre, exécution sans épinglage")
+        return
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(core))
+
+
+def _init_worker(backend, model_path, threads, cores):
+    """
+    Pool initializer: pin the process to one core, cap intra-op threads so the
+    workers don't oversubscribe the machine, then load the model once.
+    """
+    global _detector
+
+    _pin_worker(cores)
+
+    import cv2
+    from detectors import create_detector
+
+    cv2.setNumThreads(threads)
+    if backend == "pytorch":
+        import torch
+        torch.set_num_threads(threads)
+        _detector = create_detector(backend, model_path)
+    elif backend == "onnxruntime":
+        _detector = create_detector(backend, model_path, threads=threads)
+    else:
+        _detector = create_detector(backend, model_path)
+
+
+def _run_stream(job):
+    """
+    Pool task: `_count_stream` one source. Never raises, so a failing camera is
+    reported as an "error" summary and the other streams keep running.
+    """
+    try:
+        return _count_stream(*job)
+    except Exception as e:
+        return {"source": job[0], "error": f"{type(e).__name__}: {e}"}
+
+
+def _count_stream(name, source, conf, log_dir, stride, max_frames, capture):
+    """Count persons on one source until it ends (or `max_frames` is reached)."""
+    from capture import open_capture
+
+    cap = open_capture(source, backend=capture["backend"], name=name, width=capture["width"],
+                       stride=stride, keyframes_only=capture["keyframes"])
+    if not cap.isOpened():
+        return {"source": name, "error": "unable to open source"}
+
+    processed = 0
+    start = time.perf_counter()
+    try:
+        while max_frames is None or processed < max_frames:
+            success, frame = cap.read()
+            if not success:
+                break
+
+            person_count = count_persons(_detector.detect(frame, conf))
+            count_logger.log_people_count_if_changed(person_count, name, log_dir)
+            processed += 1
+    finally:
+        cap.release()
+        # Pool workers exit without running atexit hooks
+        count_logger.flush(log_dir)
+
+    elapsed = time.perf_counter() - start
+    decode = cap.stats()
+    return {
+        "source": name,
+        "frames": decode["decoded"] + decode["skipped"],
+        "processed": processed,
+        "decode": decode,
+        "seconds": round(elapsed, 2),
+        "fps": round(processed / elapsed, 2) if elapsed else 0.0,
+        "pid": os.getpid(),
+    }
+
+
+def _core_groups(n_workers, threads):
+    """Split the available cores into `n_workers` groups of `threads` cores."""
+    if hasattr(os, "sched_getaffinity"):
+        available = sorted(os.sched_getaffinity(0))
+    else:
+        available = list(range(os.cpu_count() or 1))
+    return [
+        [available[(w * threads + t) % len(available)] for t in range(threads)]
+        for w in range(n_workers)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-stream YOLO people logger")
+    parser.add_argument("sources", nargs="*",
+                        help="VIDEOS_DICT names, webcam indexes or RTSP/HTTP URLs (default: all VIDEOS_DICT)")
+    parser.add_argument("--backend", choices=["pytorch", "onnxruntime", "opencv"], default=settings.DETECTOR_BACKEND)
+    parser.add_argument("--model", default=None,
+                        help="Weights (default: DETECTION_MODEL for pytorch, ONNX_MODEL otherwise)")
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Pool size (default: one worker per stream)")
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--pin", action="store_true", help="Pin each worker to its own core(s)")
+    parser.add_argument("--stride", type=int, default=1, help="Process one frame out of N")
+    parser.add_argument("--capture", choices=["opencv", "pyav"], default=settings.CAPTURE_BACKEND,
+                        help="Decoder backend")
+    parser.add_argument("--decode-width", type=int, default=settings.CAPTURE_WIDTH,
+                        help="Decode/scale frames to this width (default: native)")
+    parser.add_argument("--keyframes", action="store_true", help="Decode keyframes only (files, pyav)")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--log-dir", default="logs")
+    args = parser.parse_args()
+
+    sources = args.sources or list(settings.VIDEOS_DICT.keys())
+    capture = {"backend": args.capture, "width": args.decode_width, "keyframes": args.keyframes}
+    jobs = [
+        (_source_name(s), _resolve_source(s), args.conf, args.log_dir, max(1, args.stride), args.max_frames, capture)
+        for s in sources
+    ]
+    n_workers = args.workers or len(jobs)
+
+    # spawn: torch and OpenCV thread pools don't survive fork() reliably
+    ctx = mp.get_context("spawn")
+    cores = None
+    if args.pin:
+        cores = ctx.Queue()
+        for group in _core_groups(n_workers, args.threads_per_worker):
+            cores.put(group)
+
+    print(f"▶️ {len(jobs)} flux, {n_workers} worker(s), backend {args.backend}")
+    start = time.perf_counter()
+    with ctx.Pool(n_workers, initializer=_init_worker,
+                  initargs=(args.backend, args.model, args.threads_per_worker, cores)) as pool:
+        total = 0
+        for summary in pool.imap_unordered(_run_stream, jobs):
+            if "error" in summary:
+                print(f"❌ {summary['source']}: {summary['error']}")
+                continue
+            total += summary["processed"]
+            decode = summary["decode"]
+            print(f"✅ {summary['source']}: {summary['processed']} images en {summary['seconds']} s "
+                  f"({summary['fps']} img/s, pid {summary['pid']}) | décodage {decode['decode_fps']} img/s, "
+                  f"CPU {decode['cpu_percent']} %")
+
+    elapsed = time.perf_counter() - start
+    print(f"📊 Total : {total} images en {elapsed:.1f} s ({total / elapsed:.1f} img/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Incremental occupancy and entry/exit counting on tracker IDs.
+
+Every stream keeps one `OccupancyCounter`. Each frame, it receives the IDs and
+reference points (box centres) of the tracked persons and updates a compact
+per-track state: last point, zone membership bits and first/last seen time,
+stored in preallocated arrays. Per frame, the work is proportional to the
+number of tracks in that frame (plus a check over the slot table to expire
+stale tracks). It does not depend on history.
+
+Outputs per stream:
+- occupancy: persons currently in each zone ("présents à l'instant T"),
+- entries / exits per zone (zone membership transitions),
+- in / out per counting line (segment crossings).
+
+Zones are any object with `names` and `membership(points, shape=None)`, which
+returns a uint64 bitmask per point (bit i = inside zone i), e.g. `RectZones`
+here or the polygon zones of zones.py. Without zones, the whole frame is one
+zone, "scene": entries are new tracks and exits are expired ones.
+
+Lines are either given in pixels, or taken from a zones.ZoneMap and scaled to
+the `shape` of each frame (cached per resolution, like the zone rasters), so
+they follow the stream if its resolution changes.
+
+    counter = get_counter("video_1", lines={"porte": ((100, 400), (500, 400))})
+    events = counter.update(persons.ids, persons.centroids)
+    counter.snapshot()
+"""
+import threading
+import time
+
+import numpy as np
+
+import settings
+from postprocess import in_rect
+
+
+class RectZones:
+    """Axis-aligned rectangular zones: {name: (x, y, w, h)}."""
+
+    def __init__(self, rects):
+        self.names = list(rects)
+        self.rects = [rects[name] for name in self.names]
+
+    def membership(self, points, shape=None):
+        bits = np.zeros(len(points), dtype=np.uint64)
+        for i, rect in enumerate(self.rects):
+            bits[in_rect(points, rect)] |= np.uint64(1 << i)
+        return bits
+
+
+class _WholeFrame:
+    names = ["scene"]
+
+    def membership(self, points, shape=None):
+        return np.ones(len(points), dtype=np.uint64)
+
+
+def _cross(d, p):
+    """z component of d x p, broadcast over the leading dimensions."""
+    return d[..., 0] * p[..., 1] - d[..., 1] * p[..., 0]
+
+
+class OccupancyCounter:
+    """
+    Per-stream track state and counters.
+
+    Args:
+    - zones: Zones object (see module docstring), or None for the whole frame.
+    - lines (dict): {name: ((x1, y1), (x2, y2))} counting lines in pixels. Moving
+      from the negative to the positive side of A->B counts as "in", the other
+      way as "out" (swap the points to flip the direction). Default: the lines
+      of `zones` if it is a zones.ZoneMap, scaled to the shape given to `update`.
+    - track_ttl (float): Seconds without being seen after which a track expires.
+    - exit_on_expire (bool): Count an exit for the zones an expired track was in.
+    - capacity (int): Initial number of track slots (doubled when full).
+    """
+
+    def __init__(self, zones=None, lines=None, track_ttl=2.0, exit_on_expire=True, capacity=256):
+        # A zone map with only counting lines counts occupancy on the whole frame
+        self.zones = zones if zones is not None and len(zones.names) else _WholeFrame()
+        self.zone_names = list(self.zones.names)
+        if len(self.zone_names) > 64:
+            raise ValueError("At most 64 zones per stream are supported")
+        self._line_map = zones if lines is None and hasattr(zones, "scaled_lines") else None
+        if self._line_map is not None:
+            lines = self._line_map.lines
+        self.line_names = list(lines or {})
+        self._segments = {}  # frame shape -> (line origins, directions); None for pixel lines
+        if self._line_map is None:
+            self._segments[None] = self._to_segments(lines)
+        self.track_ttl = track_ttl
+        self.exit_on_expire = exit_on_expire
+
+        self._zone_bits = np.uint64(1) << np.arange(len(self.zone_names), dtype=np.uint64)
+        self.entries = np.zeros(len(self.zone_names), dtype=np.int64)
+        self.exits = np.zeros(len(self.zone_names), dtype=np.int64)
+        self.line_in = np.zeros(len(self.line_names), dtype=np.int64)
+        self.line_out = np.zeros(len(self.line_names), dtype=np.int64)
+
+        self._slots = {}  # track id -> slot
+        self._free = []
+        self._size = 0
+        self._allocate_arrays(max(1, capacity))
+        self._lock = threading.Lock()
+
+    # -- Slot table ---------------------------------------------------------
+
+    def _allocate_arrays(self, capacity):
+        def grow(old, fill, dtype, shape=()):
+            new = np.full((capacity,) + shape, fill, dtype=dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        self._ids = grow(getattr(self, "_ids", None), -1, np.int64)
+        self._xy = grow(getattr(self, "_xy", None), np.nan, np.float32, (2,))
+        self._bits = grow(getattr(self, "_bits", None), 0, np.uint64)
+        self._first_seen = grow(getattr(self, "_first_seen", None), 0.0, np.float64)
+        self._last_seen = grow(getattr(self, "_last_seen", None), 0.0, np.float64)
+        self._active = grow(getattr(self, "_active", None), False, bool)
+
+    def _slot_for(self, track_id, now):
+        if self._free:
+            slot = self._free.pop()
+        else:
+            if self._size == len(self._ids):
+                self._allocate_arrays(2 * len(self._ids))
+            slot = self._size
+            self._size += 1
+        self._slots[track_id] = slot
+        self._ids[slot] = track_id
+        self._xy[slot] = np.nan
+        self._bits[slot] = 0
+        self._first_seen[slot] = now
+        self._active[slot] = True
+        return slot
+
+    # -- Counting lines -----------------------------------------------------
+
+    def _to_segments(self, lines):
+        segments = np.asarray([lines[name] for name in self.line_names], dtype=np.float32).reshape(-1, 2, 2)
+        return segments[:, 0], segments[:, 1] - segments[:, 0]
+
+    def _lines_for(self, shape):
+        """(origins, directions) of the lines in pixels of `shape`, computed once per resolution."""
+        if self._line_map is None:
+            return self._segments[None]
+        key = tuple(shape[:2]) if shape is not None else None
+        segments = self._segments.get(key)
+        if segments is None:
+            segments = self._to_segments(self._line_map.scaled_lines(key))
+            if key is not None:
+                self._segments[key] = segments
+        return segments
+
+    # -- Per-frame update ---------------------------------------------------
+
+    def update(self, ids, points, now=None, shape=None):
+        """
+        Update the state with the tracked persons of one frame.
+
+        Args:
+        - ids (array-like): (N,) tracker IDs. Detections without ID are ignored by the caller.
+        - points (array-like): (N, 2) reference point of each track (e.g. box centre).
+        - now (float): Time of the frame in seconds (default: time.monotonic()).
+        - shape (tuple): (h, w) of the frame, to place zones and ZoneMap lines at its resolution.
+
+        Returns:
+        The events of this frame, as (track_id, kind, name) tuples where kind is
+        "entry", "exit", "in" or "out".
+        """
+        now = time.monotonic() if now is None else now
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        events = []
+
+        with self._lock:
+            slots = np.fromiter(
+                (self._slots.get(tid, -1) for tid in ids.tolist()), dtype=np.int64, count=len(ids)
+            )
+            for i in np.flatnonzero(slots < 0):
+                slots[i] = self._slot_for(int(ids[i]), now)
+
+            # Zone transitions
+            old_bits = self._bits[slots]
+            new_bits = self.zones.membership(points, shape) if len(points) else old_bits
+            changed = np.flatnonzero(old_bits != new_bits)
+            if len(changed):
+                entered = (new_bits[changed] & ~old_bits[changed])[:, None] & self._zone_bits
+                left = (old_bits[changed] & ~new_bits[changed])[:, None] & self._zone_bits
+                self.entries += np.count_nonzero(entered, axis=0)
+                self.exits += np.count_nonzero(left, axis=0)
+                for row, col in zip(*np.nonzero(entered)):
+                    events.append((int(ids[changed[row]]), "entry", self.zone_names[col]))
+                for row, col in zip(*np.nonzero(left)):
+                    events.append((int(ids[changed[row]]), "exit", self.zone_names[col]))
+
+            # Line crossings: segment prev -> current against every line
+            if len(self.line_names) and len(points):
+                prev = self._xy[slots]
+                known = np.flatnonzero(~np.isnan(prev[:, 0]))
+                if len(known):
+                    line_a, line_d = self._lines_for(shape)
+                    p, q = prev[known, None, :], points[known, None, :]        # (K, 1, 2)
+                    s0 = _cross(line_d, p - line_a)                            # (K, L)
+                    s1 = _cross(line_d, q - line_a)
+                    motion = q - p
+                    t0 = _cross(motion, line_a - p)
+                    t1 = _cross(motion, line_a + line_d - p)
+                    crossed = (s0 * s1 < 0) & (t0 * t1 <= 0)
+                    inward = crossed & (s0 < 0)
+                    outward = crossed & (s0 > 0)
+                    self.line_in += np.count_nonzero(inward, axis=0)
+                    self.line_out += np.count_nonzero(outward, axis=0)
+                    for kind, mask in (("in", inward), ("out", outward)):
+                        for row, col in zip(*np.nonzero(mask)):
+                            events.append((int(ids[known[row]]), kind, self.line_names[col]))
+
+            self._xy[slots] = points
+            self._bits[slots] = new_bits
+            self._last_seen[slots] = now
+            events.extend(self._expire(now))
+        return events
+
+    def _expire(self, now):
+        events = []
+        stale = np.flatnonzero(self._active[:self._size] & (self._last_seen[:self._size] < now - self.track_ttl))
+        for slot in stale:
+            bits = self._bits[slot]
+            track_id = int(self._ids[slot])
+            if self.exit_on_expire and bits:
+                inside = (bits & self._zone_bits) != 0
+                self.exits += inside
+                events.extend((track_id, "exit", self.zone_names[i]) for i in np.flatnonzero(inside))
+            del self._slots[track_id]
+            self._active[slot] = False
+            self._ids[slot] = -1
+            self._free.append(int(slot))
+        return events
+
+    # -- Outputs ------------------------------------------------------------
+
+    def occupancy(self):
+        """{zone name: number of active tracks currently inside}."""
+        with self._lock:
+            bits = self._bits[:self._size][self._active[:self._size]]
+            counts = np.count_nonzero(bits[:, None] & self._zone_bits, axis=0)
+        return dict(zip(self.zone_names, counts.tolist()))
+
+    def snapshot(self):
+        """Current occupancy, cumulated entries/exits and line counts."""
+        occupancy = self.occupancy()
+        with self._lock:
+            return {
+                "present": len(self._slots),
+                "occupancy": occupancy,
+                "entries": dict(zip(self.zone_names, self.entries.tolist())),
+                "exits": dict(zip(self.zone_names, self.exits.tolist())),
+                "lines": {
+                    name: {"in": int(self.line_in[i]), "out": int(self.line_out[i])}
+                    for i, name in enumerate(self.line_names)
+                },
+            }
+
+    def track_info(self, track_id):
+        """(first_seen, last_seen, zone names) of an active track, or None."""
+        with self._lock:
+            slot = self._slots.get(track_id)
+            if slot is None:
+                return None
+            bits = self._bits[slot]
+            zones = [name for i, name in enumerate(self.zone_names) if bits & self._zone_bits[i]]
+            return float(self._first_seen[slot]), float(self._last_seen[slot]), zones
+
+    def reset(self):
+        """Forget every track and counter (e.g. when the stream restarts)."""
+        with self._lock:
+            self._slots.clear()
+            self._free.clear()
+            self._size = 0
+            self._active[:] = False
+            self.entries[:] = 0
+            self.exits[:] = 0
+            self.line_in[:] = 0
+            self.line_out[:] = 0
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def get_counter(stream, zones=None, lines=None):
+    """
+    Returns the process-wide OccupancyCounter of `stream`, creating it on
+    first use (later calls ignore `zones` and `lines`; use `drop_counter` to
+    reconfigure a stream).
+    """
+    with _counters_lock:
+        counter = _counters.get(stream)
+        if counter is None:
+            counter = OccupancyCounter(zones, lines, track_ttl=settings.OCCUPANCY_TRACK_TTL)
+            _counters[stream] = counter
+        return counter
+
+
+def drop_counter(stream):
+    with _counters_lock:
+        _counters.pop(stream, None)
@@ -0,0 +1,226 @@
+import queue
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+
+class _StageStats:
+    """Rolling latency/throughput counters for a single pipeline stage."""
+
+    def __init__(self, window=120):
+        self.latencies = deque(maxlen=window)
+        self.processed = 0
+        self.dropped = 0
+
+    def record(self, seconds):
+        self.latencies.append(seconds)
+        self.processed += 1
+
+    def snapshot(self):
+        samples = list(self.latencies)
+        avg = sum(samples) / len(samples) if samples else 0.0
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "avg_latency_ms": round(avg * 1000, 2),
+            "max_latency_ms": round(max(samples) * 1000, 2) if samples else 0.0,
+        }
+
+
+class FramePipeline:
+    """
+    Bounded capture -> inference -> render pipeline.
+
+    Frames are read on a capture thread, run through `infer_fn` on an
+    inference thread, and handed to `sink` on the calling thread (Streamlit
+    widgets may only be touched from the script thread).
+
+    Args:
+    - capture: Object with a cv2.VideoCapture-like `read()` method.
+    - infer_fn (callable): Called with a frame, returns the inference result.
+    - queue_depth (int): Maximum number of items waiting between two stages.
+    - live (bool): If True, full queues drop their oldest item ("latest frame
+      wins") so a slow consumer never lags behind a live camera. If False,
+      the producer blocks instead, so every frame of a file is processed.
+    - name (str): Used to name the worker threads.
+    """
+
+    def __init__(self, capture, infer_fn, queue_depth=2, live=True, name="default"):
+        self.capture = capture
+        self.infer_fn = infer_fn
+        self.live = live
+        self.name = name
+
+        self._frames = queue.Queue(maxsize=max(1, queue_depth))
+        self._results = queue.Queue(maxsize=max(1, queue_depth))
+        self._stop = threading.Event()
+        self._capture_done = threading.Event()
+        self._inference_done = threading.Event()
+        self._threads = []
+        self._error = None
+
+        self._stats = {
+            "capture": _StageStats(),
+            "inference": _StageStats(),
+            "render": _StageStats(),
+            "end_to_end": _StageStats(),
+        }
+
+    # -- Producers -------------------------------------------------------
+
+    def _put(self, q, item, stage):
+        """Put `item` on `q` following the live/blocking drop policy."""
+        if self.live:
+            while True:
+                try:
+                    q.put_nowait(item)
+                    return True
+                except queue.Full:
+                    try:
+                        q.get_nowait()
+                        self._stats[stage].dropped += 1
+                        metrics.inc("dropped_frames", self.name)
+                    except queue.Empty:
+                        pass
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _capture_loop(self):
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                success, frame = self.capture.read()
+                if not success:
+                    break
+                elapsed = time.perf_counter() - start
+                self._stats["capture"].record(elapsed)
+                metrics.observe("capture", self.name, elapsed)
+                if not self._put(self._frames, (start, frame), "capture"):
+                    break
+        except Exception as e:
+            self._error = e
+        finally:
+            self._capture_done.set()
+
+    def _inference_loop(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    captured_at, frame = self._frames.get(timeout=0.1)
+                except queue.Empty:
+                    if self._capture_done.is_set():
+                        break
+                    continue
+                start = time.perf_counter()
+                result = self.infer_fn(frame)
+                self._stats["inference"].record(time.perf_counter() - start)
+                if not self._put(self._results, (captured_at, frame, result), "inference"):
+                    break
+        except Exception as e:
+            self._error = e
+        finally:
+            self._inference_done.set()
+
+    # -- Consumer --------------------------------------------------------
+
+    def start(self):
+        """Start the capture and inference threads (done by `run`)."""
+        if self._threads:
+            return
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name=f"{self.name}-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name=f"{self.name}-inference", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def finished(self):
+        """True once every frame of the source went through inference and was consumed."""
+        return self._inference_done.is_set() and self._results.empty()
+
+    def poll(self, sink, timeout=0.1):
+        """
+        Hand the next result to `sink(frame, result)` on the calling thread.
+
+        Returns:
+        True if a result was handled, False if none arrived within `timeout`.
+        """
+        try:
+            captured_at, frame, result = self._results.get(timeout=timeout) if timeout else self._results.get_nowait()
+        except queue.Empty:
+            return False
+        start = time.perf_counter()
+        sink(frame, result)
+        end = time.perf_counter()
+        self._stats["render"].record(end - start)
+        self._stats["end_to_end"].record(end - captured_at)
+        metrics.observe("end_to_end", self.name, end - captured_at)
+        metrics.inc("frames", self.name)
+        return True
+
+    def run(self, sink, should_continue=None):
+        """
+        Start the worker threads and feed results to `sink` until the source
+        is exhausted or `should_continue()` returns False.
+
+        Args:
+        - sink (callable): Called as `sink(frame, result)` on the calling thread.
+        - should_continue (callable): Optional stop condition checked between frames.
+        """
+        run_pipelines([(self, sink)], should_continue)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+
+    def stats(self):
+        """
+        Returns a dict with per-stage latency/drop counters and current queue depths.
+        """
+        report = {stage: s.snapshot() for stage, s in self._stats.items()}
+        report["queue_depth"] = {
+            "frames": self._frames.qsize(),
+            "results": self._results.qsize(),
+        }
+        return report
+
+
+def run_pipelines(pipelines, should_continue=None):
+    """
+    Run several pipelines at once: their capture and inference threads work
+    concurrently (so a shared InferenceEngine batches their frames), and the
+    calling thread hands every result to the sink of its pipeline.
+
+    Args:
+    - pipelines (list): (FramePipeline, sink) pairs.
+    - should_continue (callable): Optional stop condition checked between frames.
+
+    Raises the first error of a worker thread once every pipeline is stopped.
+    """
+    for pipe, _ in pipelines:
+        pipe.start()
+    try:
+        while should_continue is None or should_continue():
+            active = [(pipe, sink) for pipe, sink in pipelines if not pipe.finished]
+            if not active:
+                break
+            if len(active) == 1:
+                active[0][0].poll(active[0][1])
+            elif not any([pipe.poll(sink, timeout=0) for pipe, sink in active]):
+                time.sleep(0.005)
+    finally:
+        for pipe, _ in pipelines:
+            pipe.stop()
+
+    for pipe, _ in pipelines:
+        if pipe._error is not None:
+            raise pipe._error
@@ -0,0 +1,153 @@
+"""
+Vectorised post-processing of YOLO detections.
+
+Everything here works on whole arrays (`boxes.cls`, `boxes.conf`,
+`boxes.xyxy`) copied to host memory once per frame, instead of slicing one
+tensor per box in a Python loop.
+"""
+import numpy as np
+
+PERSON_CLASS = 0  # class 0 = person (COCO)
+
+
+def _to_numpy(values):
+    """Convert a torch tensor (any device) or array-like to a numpy array."""
+    if values is None:
+        return None
+    if hasattr(values, "cpu"):
+        values = values.cpu()
+    if hasattr(values, "numpy"):
+        return values.numpy()
+    return np.asarray(values)
+
+
+class Detections:
+    """
+    Host-side copy of a frame's detections.
+
+    Attributes:
+    - xyxy (np.ndarray): (N, 4) float32 boxes.
+    - conf (np.ndarray): (N,) float32 confidences.
+    - cls (np.ndarray): (N,) int class ids.
+    - ids (np.ndarray or None): (N,) int tracker IDs when tracking is enabled.
+    """
+
+    __slots__ = ("xyxy", "conf", "cls", "ids")
+
+    def __init__(self, xyxy, conf, cls, ids=None):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.asarray(cls).reshape(-1).astype(np.int64, copy=False)
+        self.ids = None if ids is None else np.asarray(ids).reshape(-1).astype(np.int64, copy=False)
+
+    @classmethod
+    def from_boxes(cls, boxes):
+        """Build from an Ultralytics `Boxes` object (or anything with xyxy/conf/cls)."""
+        ids = getattr(boxes, "id", None)
+        return cls(_to_numpy(boxes.xyxy), _to_numpy(boxes.conf), _to_numpy(boxes.cls), _to_numpy(ids))
+
+    @classmethod
+    def empty(cls):
+        return cls(np.empty((0, 4)), np.empty(0), np.empty(0))
+
+    def __len__(self):
+        return len(self.cls)
+
+    def __getitem__(self, index):
+        return Detections(
+            self.xyxy[index], self.conf[index], self.cls[index],
+            None if self.ids is None else self.ids[index],
+        )
+
+    @property
+    def centroids(self):
+        """(N, 2) box centres."""
+        return (self.xyxy[:, :2] + self.xyxy[:, 2:]) * 0.5
+
+
+def as_detections(boxes):
+    return boxes if isinstance(boxes, Detections) else Detections.from_boxes(boxes)
+
+
+def filter_detections(boxes, classes=(PERSON_CLASS,), min_conf=None):
+    """
+    Keep detections of the given classes above `min_conf` using boolean masks.
+
+    Args:
+    - boxes: Ultralytics `Boxes` or `Detections`.
+    - classes (iterable of int): Class ids to keep, or None for all classes.
+    - min_conf (float): Optional extra confidence threshold.
+
+    Returns:
+    A filtered `Detections`.
+    """
+    det = as_detections(boxes)
+    mask = np.ones(len(det), dtype=bool)
+    if classes is not None:
+        classes = tuple(classes)
+        if len(classes) == 1:
+            mask &= det.cls == classes[0]
+        else:
+            mask &= np.isin(det.cls, classes)
+    if min_conf is not None:
+        mask &= det.conf > min_conf
+    return det[mask]
+
+
+def in_rect(points, rect):
+    """
+    Boolean mask of `points` (N, 2) inside the rectangle `rect` = (x, y, w, h),
+    borders included.
+    """
+    x, y, w, h = rect
+    points = np.asarray(points).reshape(-1, 2)
+    return (
+        (points[:, 0] >= x) & (points[:, 0] <= x + w)
+        & (points[:, 1] >= y) & (points[:, 1] <= y + h)
+    )
+
+
+def count_persons(boxes, min_conf=None):
+    """Number of person detections in `boxes`, optionally above `min_conf`."""
+    det = as_detections(boxes)
+    mask = det.cls == PERSON_CLASS
+    if min_conf is not None:
+        mask &= det.conf > min_conf
+    return int(np.count_nonzero(mask))
+
+
+class FrameSummary:
+    """Result of `summarize_persons`: filtered detections plus ROI membership."""
+
+    __slots__ = ("detections", "centroids", "in_roi")
+
+    def __init__(self, detections, centroids, in_roi=None):
+        self.detections = detections
+        self.centroids = centroids
+        self.in_roi = in_roi
+
+    @property
+    def count(self):
+        return len(self.detections)
+
+    @property
+    def roi_count(self):
+        return int(np.count_nonzero(self.in_roi)) if self.in_roi is not None else self.count
+
+
+def summarize_persons(boxes, min_conf=None, roi=None):
+    """
+    Filter persons, compute their centroids and (optionally) ROI membership in one pass.
+
+    Args:
+    - boxes: Ultralytics `Boxes` or `Detections`.
+    - min_conf (float): Optional confidence threshold.
+    - roi (tuple): Optional (x, y, w, h) rectangle tested against the centroids.
+
+    Returns:
+    A `FrameSummary`.
+    """
+    persons = filter_detections(boxes, min_conf=min_conf)
+    centroids = persons.centroids
+    in_roi = in_rect(centroids, roi) if roi is not None else None
+    return FrameSummary(persons, centroids, in_roi)
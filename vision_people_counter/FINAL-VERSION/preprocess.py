@@ -0,0 +1,121 @@
+"""
+Single-resample preprocessing for the detectors.
+
+Frames are resized once, straight from their native resolution to the model
+input size, keeping their aspect ratio (letterbox). The padded output images
+are preallocated per source shape and reused across frames, so steady-state
+preprocessing allocates nothing. Detected boxes are mapped back to source
+pixels with `boxes_to_source`.
+
+    letterbox = Letterbox(640)
+    lb = letterbox(frame)               # lb.image is (384, 640, 3) for a 16:9 frame
+    ...
+    boxes_to_source(xyxy, lb.ratio, lb.pad)
+"""
+import cv2
+import numpy as np
+
+
+class LetterboxedFrame:
+    __slots__ = ("image", "ratio", "pad", "source_shape")
+
+    def __init__(self, image, ratio, pad, source_shape):
+        self.image = image
+        self.ratio = ratio
+        self.pad = pad
+        self.source_shape = source_shape
+
+
+class _Layout:
+    """Geometry and output buffers for one source shape."""
+
+    __slots__ = ("new_size", "ratio", "pad", "buffers", "next")
+
+    def __init__(self, new_size, ratio, pad, buffers):
+        self.new_size = new_size
+        self.ratio = ratio
+        self.pad = pad
+        self.buffers = buffers
+        self.next = 0
+
+
+class Letterbox:
+    """
+    Aspect-preserving resize into preallocated, gray-padded buffers.
+
+    Args:
+    - size (int): Model input size (longest side of the output).
+    - stride (int): With `auto`, the short side is only padded up to a multiple
+      of `stride` (rectangular inference, e.g. 640x384 for 16:9), as Ultralytics
+      does, so it adds no work of its own. Without `auto` the output is square.
+    - auto (bool): See `stride`.
+    - n_buffers (int): Output buffers per source shape, used round-robin. A
+      returned image stays valid for the next `n_buffers - 1` calls with the
+      same shape, so use at least the batch size when frames are batched.
+    - pad_value (int): Gray level of the padding.
+    """
+
+    def __init__(self, size=640, stride=32, auto=True, n_buffers=1, pad_value=114):
+        self.size = size
+        self.stride = stride
+        self.auto = auto
+        self.n_buffers = max(1, n_buffers)
+        self.pad_value = pad_value
+        self._layouts = {}
+
+    def _layout(self, shape):
+        h, w = shape[:2]
+        ratio = min(self.size / h, self.size / w)
+        new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+        if self.auto:
+            out_w = -(-new_w // self.stride) * self.stride
+            out_h = -(-new_h // self.stride) * self.stride
+        else:
+            out_w = out_h = self.size
+        pad = ((out_w - new_w) // 2, (out_h - new_h) // 2)
+        buffers = [
+            np.full((out_h, out_w) + tuple(shape[2:]), self.pad_value, dtype=np.uint8)
+            for _ in range(self.n_buffers)
+        ]
+        return _Layout((new_w, new_h), ratio, pad, buffers)
+
+    def __call__(self, frame):
+        layout = self._layouts.get(frame.shape)
+        if layout is None:
+            layout = self._layout(frame.shape)
+            self._layouts[frame.shape] = layout
+
+        out = layout.buffers[layout.next]
+        layout.next = (layout.next + 1) % len(layout.buffers)
+
+        (new_w, new_h), (pad_x, pad_y) = layout.new_size, layout.pad
+        if (new_w, new_h) == frame.shape[1::-1]:
+            out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = frame
+        elif pad_x == 0 and new_w == out.shape[1]:
+            # Full-width rows are contiguous: resize directly into the buffer
+            cv2.resize(frame, (new_w, new_h), dst=out[pad_y:pad_y + new_h], interpolation=cv2.INTER_LINEAR)
+        else:
+            out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(
+                frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR
+            )
+        return LetterboxedFrame(out, layout.ratio, layout.pad, frame.shape[:2])
+
+    def clear(self):
+        """Drop the cached buffers (e.g. after a stream changes resolution for good)."""
+        self._layouts.clear()
+
+
+def boxes_to_source(xyxy, ratio, pad, source_shape=None):
+    """
+    Map `xyxy` boxes (numpy array or torch tensor, modified in place) from
+    letterboxed coordinates back to source-frame pixels, optionally clipped to
+    `source_shape` (h, w).
+    """
+    xyxy[..., [0, 2]] -= pad[0]
+    xyxy[..., [1, 3]] -= pad[1]
+    xyxy /= ratio
+    if source_shape is not None:
+        h, w = source_shape[:2]
+        xyxy[..., [0, 2]] = xyxy[..., [0, 2]].clip(0, w)
+        xyxy[..., [1, 3]] = xyxy[..., [1, 3]].clip(0, h)
+    return xyxy
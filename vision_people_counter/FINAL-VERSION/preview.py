@@ -0,0 +1,174 @@
+"""
+Built-in MJPEG preview server: the annotated output of every stream, viewable
+in a browser or embedded in a page with a plain <img> tag.
+
+    GET /streams            -> JSON list of the stream names
+    GET /stream/<name>.mjpg -> multipart MJPEG feed, at most settings.PREVIEW_FPS
+    GET /stream/<name>.jpg  -> the next frame, as one JPEG
+
+Producers (the stream workers of service.py) ask `hub.wants_frame(name)`
+before rendering: it is True only when someone watches that stream and the
+preview FPS cap allows a new frame. Each frame is therefore rendered and
+encoded once, and only when it will be shown. All viewers of a stream then
+receive the same JPEG bytes.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+import settings
+
+_BOUNDARY = "frame"
+
+
+class _Channel:
+    __slots__ = ("cond", "data", "seq", "viewers", "published_at")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.data = None
+        self.seq = 0
+        self.viewers = 0
+        self.published_at = 0.0
+
+
+class PreviewHub:
+    """
+    Latest encoded frame of every stream, shared by all its viewers.
+
+    Args:
+    - fps (float): Maximum preview frame rate per stream (default settings.PREVIEW_FPS).
+    """
+
+    def __init__(self, fps=None):
+        self.fps = fps or settings.PREVIEW_FPS
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def _channel(self, name):
+        with self._lock:
+            channel = self._channels.get(name)
+            if channel is None:
+                channel = _Channel()
+                self._channels[name] = channel
+            return channel
+
+    def streams(self):
+        with self._lock:
+            return sorted(self._channels)
+
+    def register(self, name):
+        """Declare a stream, so it is listed before anyone watches it."""
+        self._channel(name)
+
+    def wants_frame(self, name):
+        """True if `name` has viewers and its last preview frame is older than 1 / fps."""
+        channel = self._channels.get(name)
+        return (channel is not None and channel.viewers > 0
+                and time.monotonic() - channel.published_at >= 1.0 / self.fps)
+
+    def publish(self, name, data):
+        """Hand an encoded JPEG of `name` to its viewers."""
+        channel = self._channel(name)
+        with channel.cond:
+            channel.data = data
+            channel.seq += 1
+            channel.published_at = time.monotonic()
+            channel.cond.notify_all()
+
+    def frames(self, name, timeout=5.0):
+        """
+        Generator of the JPEG frames of `name` for one viewer, each frame once.
+        Counts as a viewer until closed; stops after `timeout` seconds without a frame.
+        """
+        channel = self._channel(name)
+        with channel.cond:
+            channel.viewers += 1
+        try:
+            seq = 0
+            while True:
+                with channel.cond:
+                    if not channel.cond.wait_for(lambda: channel.seq != seq, timeout):
+                        return
+                    seq, data = channel.seq, channel.data
+                yield data
+        finally:
+            with channel.cond:
+                channel.viewers -= 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hub = None  # set by PreviewServer
+
+    def do_GET(self):
+        path = unquote(self.path.split("?", 1)[0]).rstrip("/")
+        if path == "/streams":
+            self._send(200, "application/json", json.dumps(self.hub.streams()).encode())
+        elif path.startswith("/stream/") and path.endswith(".mjpg"):
+            self._stream(path[len("/stream/"):-len(".mjpg")])
+        elif path.startswith("/stream/") and path.endswith(".jpg"):
+            frames = self.hub.frames(path[len("/stream/"):-len(".jpg")])
+            data = next(frames, None)
+            frames.close()
+            if data is None:
+                self.send_error(503, "No frame available")
+            else:
+                self._send(200, "image/jpeg", data)
+        else:
+            self.send_error(404)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, name):
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={_BOUNDARY}")
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        frames = self.hub.frames(name, timeout=30.0)
+        try:
+            for data in frames:
+                self.wfile.write(
+                    f"--{_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                )
+                self.wfile.write(data)
+                self.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # viewer closed the page
+        finally:
+            frames.close()
+
+    def log_message(self, *args):
+        pass
+
+
+class PreviewServer:
+    """HTTP server of a `PreviewHub`, on its own daemon threads."""
+
+    def __init__(self, hub=None, host=None, port=None):
+        self.hub = hub or PreviewHub()
+        handler = type("PreviewHandler", (_Handler,), {"hub": self.hub})
+        self.httpd = ThreadingHTTPServer((host or settings.PREVIEW_HOST, port or settings.PREVIEW_PORT), handler)
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="preview-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread.is_alive():
+            self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def feed_url(name, base_url=None):
+    """Browser URL of the MJPEG feed of `name` (base: settings.PREVIEW_URL)."""
+    return f"{(base_url or settings.PREVIEW_URL).rstrip('/')}/stream/{name}.mjpg"
@@ -0,0 +1,239 @@
+"""
+Remote video sources: cached page -> stream URL resolution and a read-ahead
+frame buffer for HTTP(S) playback.
+
+    cap = open_remote("https://www.youtube.com/watch?v=...", name="youtube")
+    cap.wait_open()
+    success, frame = cap.read()
+
+Resolution: pages (YouTube, ...) are turned into a direct media URL by
+yt-dlp, which takes seconds, so results are cached per page URL until the
+signed URL expires (its `expire=` parameter, minus a safety margin, or
+settings.RESOLVER_DEFAULT_TTL without one). A cached URL that no longer
+opens is resolved again once. Direct http(s):// video URLs skip this step,
+so tests can point any source at a local HTTP file server
+(`python -m http.server`), or swap the extractor: `get_resolver().extract = fn`.
+
+Read-ahead: a thread opens and decodes the stream ahead of the consumer
+into a FIFO bounded by a frame count and a byte budget (decoded frames), so
+network jitter is absorbed by the buffer instead of stalling inference.
+"""
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlparse
+
+import settings
+from capture import open_capture
+from metrics import metrics
+
+# Page hosts that need an extractor to get the media URL
+RESOLVED_HOSTS = ("youtube.com", "youtu.be")
+
+
+def needs_resolve(url):
+    host = urlparse(str(url)).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in RESOLVED_HOSTS)
+
+
+def _yt_dlp_extract(url):
+    import yt_dlp
+
+    ydl_opts = {
+        'format': settings.YOUTUBE_FORMAT,
+        'no_warnings': True,
+        'quiet': True
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return ydl.extract_info(url, download=False)['url']
+
+
+def _expires_at(stream_url, now):
+    """Expiry (epoch seconds) of a signed media URL, margin included."""
+    expire = parse_qs(urlparse(stream_url).query).get("expire")
+    if expire and expire[0].isdigit():
+        return int(expire[0]) - settings.RESOLVER_EXPIRY_MARGIN
+    return now + settings.RESOLVER_DEFAULT_TTL
+
+
+class StreamResolver:
+    """
+    Page URL -> media URL cache.
+
+    Args:
+    - extract (callable): url -> media URL (default: yt-dlp).
+    """
+
+    def __init__(self, extract=None):
+        self.extract = extract or _yt_dlp_extract
+        self.hits = 0
+        self.misses = 0
+        self._cache = {}  # page url -> (media url, expires at)
+        self._lock = threading.Lock()
+
+    def resolve(self, url):
+        """Media URL of `url` (cached); direct URLs are returned unchanged."""
+        if not needs_resolve(url):
+            return url
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(url)
+            if entry is not None and entry[1] > now:
+                self.hits += 1
+                return entry[0]
+        start = time.perf_counter()
+        stream_url = self.extract(url)
+        metrics.observe("resolve", "youtube", time.perf_counter() - start)
+        with self._lock:
+            self.misses += 1
+            self._cache[url] = (stream_url, _expires_at(stream_url, now))
+        return stream_url
+
+    def is_cached(self, url):
+        with self._lock:
+            entry = self._cache.get(url)
+            return entry is not None and entry[1] > time.time()
+
+    def invalidate(self, url):
+        with self._lock:
+            self._cache.pop(url, None)
+
+
+_resolver = StreamResolver()
+
+
+def get_resolver():
+    """Process-wide resolver, shared by Streamlit reruns and sessions."""
+    return _resolver
+
+
+class ReadAheadCapture:
+    """
+    Decodes `open_fn()` on a background thread into a bounded FIFO.
+
+    Args:
+    - open_fn (callable): Returns an opened capture (see capture.open_capture).
+    - name (str): Stream name for metrics.
+    - max_frames (int): Maximum number of buffered frames.
+    - max_mb (float): Maximum size of the buffered frames, in MB.
+    """
+
+    def __init__(self, open_fn, name="default", max_frames=None, max_mb=None):
+        self.name = name
+        self.max_frames = max_frames or settings.READAHEAD_MAX_FRAMES
+        self.max_bytes = int((max_mb or settings.READAHEAD_MAX_MB) * 1024 * 1024)
+        self.error = None
+        self.underruns = 0  # reads that found the buffer empty after playback started
+        self._delivered = False
+        self._open_fn = open_fn
+        self._capture = None
+        self._buffer = deque()
+        self._bytes = 0
+        self._opened = threading.Event()
+        self._done = False
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name=f"readahead-{name}", daemon=True)
+        self._thread.start()
+
+    def _full(self, nbytes):
+        return self._buffer and (len(self._buffer) >= self.max_frames or self._bytes + nbytes > self.max_bytes)
+
+    def _run(self):
+        try:
+            capture = self._open_fn()
+            if not capture.isOpened():
+                self.error = "ouverture impossible"
+                capture.release()
+                return
+            self._capture = capture
+            self._opened.set()
+            while not self._stop.is_set():
+                success, frame = capture.read()
+                if not success:
+                    break
+                with self._cond:
+                    self._cond.wait_for(lambda: not self._full(frame.nbytes) or self._stop.is_set())
+                    self._buffer.append(frame)
+                    self._bytes += frame.nbytes
+                    self._cond.notify_all()
+            capture.release()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+            self._opened.set()
+
+    def wait_open(self, timeout=None):
+        """Wait until the stream is opened (True) or failed to open (False)."""
+        self._opened.wait(timeout)
+        return self._capture is not None
+
+    def read(self, timeout=None):
+        """Next frame in order; (False, None) at the end of the stream, or after `timeout` seconds."""
+        with self._cond:
+            if not self._buffer and not self._done:
+                if self._delivered:
+                    self.underruns += 1
+                    metrics.inc("readahead_underruns", self.name)
+                self._cond.wait_for(lambda: self._buffer or self._done, timeout)
+            if not self._buffer:
+                return False, None
+            frame = self._buffer.popleft()
+            self._bytes -= frame.nbytes
+            self._delivered = True
+            metrics.set_gauge("readahead_frames", self.name, len(self._buffer))
+            self._cond.notify_all()
+            return True, frame
+
+    def isOpened(self):
+        """True while opening, playing, or frames remain in the buffer."""
+        with self._cond:
+            return not self._stop.is_set() and (not self._done or bool(self._buffer))
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._buffer.clear()
+            self._bytes = 0
+            self._cond.notify_all()
+        self._thread.join(timeout=1.0)
+
+    @property
+    def fps(self):
+        return self._capture.fps if self._capture is not None else 0.0
+
+    def stats(self):
+        """Decode statistics (see Capture.stats) plus buffer fill and underruns."""
+        stats = self._capture.stats() if self._capture is not None else {}
+        with self._cond:
+            stats.update(
+                buffered_frames=len(self._buffer),
+                buffered_mb=round(self._bytes / 1024 / 1024, 1),
+                underruns=self.underruns,
+            )
+        return stats
+
+
+def open_remote(url, name="default", resolver=None, max_frames=None, max_mb=None, **capture_options):
+    """
+    Resolve `url` if needed and play it through a `ReadAheadCapture`. Returns at
+    once: resolution and opening happen on the read-ahead thread.
+    """
+    resolver = resolver or get_resolver()
+
+    def open_fn():
+        cached = resolver.is_cached(url)
+        options = dict(capture_options, name=name, open_timeout=settings.INGEST_OPEN_TIMEOUT,
+                       read_timeout=settings.INGEST_READ_TIMEOUT)
+        capture = open_capture(resolver.resolve(url), **options)
+        if not capture.isOpened() and cached:
+            # The signed URL was revoked before its expiry: resolve it again
+            capture.release()
+            resolver.invalidate(url)
+            capture = open_capture(resolver.resolve(url), **options)
+        return capture
+
+    return ReadAheadCapture(open_fn, name, max_frames, max_mb)
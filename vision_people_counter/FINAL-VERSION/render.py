@@ -0,0 +1,165 @@
+"""
+Lightweight frame annotation and compressed delivery.
+
+`FrameRenderer` replaces `res[0].plot()`: the source frame is downscaled
+once into a reused display-size buffer, and boxes, labels, track IDs and
+zones are drawn there in place, at display resolution. Box coordinates are
+scaled for the whole frame in one numpy operation.
+
+`encode_frame` turns the result into JPEG/WebP bytes, so Streamlit (or the
+preview server) ships a few tens of KB per frame instead of a PNG of the
+raw pixels.
+
+    renderer = get_renderer("video_1")
+    data = renderer.render_encoded(frame, as_detections(res[0].boxes), res[0].names, zones, zone_counts)
+
+`get_renderer` is shared by every session and thread showing a stream:
+`render_encoded` holds the renderer until the image is encoded, so another
+render can't overwrite its buffer first.
+"""
+import threading
+
+import cv2
+import numpy as np
+
+import settings
+
+# Ultralytics-like colour palette (BGR), indexed by class or track ID
+_PALETTE = np.array([
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207), (10, 249, 72),
+    (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0), (168, 153, 44), (255, 194, 0),
+    (147, 69, 52), (255, 115, 100), (236, 24, 0), (255, 56, 132), (133, 0, 82), (255, 56, 203),
+    (200, 149, 255), (199, 55, 255),
+], dtype=np.uint8)
+
+_FORMATS = {
+    "jpeg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+class FrameRenderer:
+    """
+    Draws detections into reused display buffers.
+
+    Args:
+    - max_width (int): Display width; wider frames are downscaled before drawing.
+    - n_buffers (int): Buffers used in turn, so the previous image stays valid
+      while the next one is drawn (e.g. while it is being encoded or sent).
+    """
+
+    def __init__(self, max_width=None, n_buffers=2):
+        self.max_width = max_width or settings.DISPLAY_MAX_WIDTH
+        self.n_buffers = max(1, n_buffers)
+        self._buffers = {}  # display shape -> list of buffers
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _buffer(self, shape):
+        buffers = self._buffers.get(shape)
+        if buffers is None:
+            self._buffers.clear()  # the source resolution changed
+            buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.n_buffers)]
+            self._buffers[shape] = buffers
+        self._next = (self._next + 1) % self.n_buffers
+        return buffers[self._next]
+
+    def prepare(self, frame):
+        """Copy of `frame` at display size in a reused buffer, and its scale factor."""
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.max_width / w)
+        shape = (int(round(h * scale)), int(round(w * scale))) + frame.shape[2:]
+        out = self._buffer(shape)
+        if scale < 1.0:
+            cv2.resize(frame, (shape[1], shape[0]), dst=out, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(out, frame)
+        return out, scale
+
+    def render(self, frame, detections, names=None, zones=None, zone_counts=None, line_width=2):
+        """
+        Annotated display-size copy of `frame` (the frame itself is not modified).
+
+        Args:
+        - detections (postprocess.Detections): Boxes in `frame` pixels.
+        - names (dict): Class id -> label (e.g. `res[0].names`); labels show only the confidence without it.
+        - zones (zones.ZoneMap): Zones to outline, with `zone_counts` next to their names.
+
+        Returns:
+        The annotated image. It is only valid until `n_buffers` more renders.
+        """
+        out, scale = self.prepare(frame)
+        n = len(detections)
+        if n:
+            boxes = np.round(detections.xyxy * scale).astype(np.int32)
+            keys = detections.ids if detections.ids is not None else detections.cls
+            colors = _PALETTE[np.abs(keys) % len(_PALETTE)].tolist()
+            font_scale = max(0.4, out.shape[1] / 2500)
+            for i, (x1, y1, x2, y2) in enumerate(boxes.tolist()):
+                color = colors[i]
+                cv2.rectangle(out, (x1, y1), (x2, y2), color, line_width, cv2.LINE_AA)
+                label = f"{detections.conf[i]:.2f}"
+                if names:
+                    label = f"{names.get(int(detections.cls[i]), detections.cls[i])} {label}"
+                if detections.ids is not None:
+                    label = f"#{detections.ids[i]} {label}"
+                (tw, th), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 1)
+                top = y1 - th - baseline if y1 - th - baseline >= 0 else y1
+                cv2.rectangle(out, (x1, top), (x1 + tw, top + th + baseline), color, -1)
+                cv2.putText(out, label, (x1, top + th), cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), 1,
+                            cv2.LINE_AA)
+        if zones is not None:
+            zones.draw(out, zone_counts)
+        return out
+
+    def render_encoded(self, frame, detections, names=None, zones=None, zone_counts=None, fmt=None, quality=None):
+        """`render` then `encode_frame`, as one step (safe on a shared renderer); "raw" returns a copy."""
+        with self._lock:
+            return _detached(encode_frame(self.render(frame, detections, names, zones, zone_counts), fmt, quality))
+
+    def prepare_encoded(self, frame, fmt=None, quality=None):
+        """`prepare` then `encode_frame`, as one step (safe on a shared renderer); "raw" returns a copy."""
+        with self._lock:
+            return _detached(encode_frame(self.prepare(frame)[0], fmt, quality))
+
+
+def _detached(data):
+    """Encoded bytes as they are, a raw image copied out of the renderer buffer."""
+    return data.copy() if isinstance(data, np.ndarray) else data
+
+
+def encode_frame(image, fmt=None, quality=None):
+    """
+    Compress `image` (BGR) for delivery.
+
+    Args:
+    - fmt (str): "jpeg", "webp" or "raw" (default settings.DISPLAY_FORMAT).
+    - quality (int): 0-100 (default settings.DISPLAY_QUALITY).
+
+    Returns:
+    The encoded bytes, or `image` unchanged for "raw".
+    """
+    fmt = fmt or settings.DISPLAY_FORMAT
+    if fmt == "raw":
+        return image
+    if fmt not in _FORMATS:
+        raise ValueError(f"Unknown display format '{fmt}', expected 'raw' or one of {sorted(_FORMATS)}")
+    ext, flag = _FORMATS[fmt]
+    ok, data = cv2.imencode(ext, image, [flag, int(quality or settings.DISPLAY_QUALITY)])
+    if not ok:
+        raise ValueError(f"Unable to encode frame as {fmt}")
+    return data.tobytes()
+
+
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(stream):
+    """Renderer of `stream`, kept across Streamlit reruns (its buffers are reused)."""
+    with _renderers_lock:
+        renderer = _renderers.get(stream)
+        if renderer is None:
+            renderer = FrameRenderer()
+            _renderers[stream] = renderer
+        return renderer
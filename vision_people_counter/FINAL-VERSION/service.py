@@ -0,0 +1,479 @@
+"""
+Headless counting daemon.
+
+Owns the video sources and the model, runs detection continuously (one
+thread per stream, frames batched by the shared inference engine) and
+publishes one JSON message per processed frame to every subscriber:
+
+    {"stream": "video_1", "ts": 1721300000.1, "frame": 42, "count": 3,
+     "boxes": [[x1, y1, x2, y2, conf, track_id], ...], "width": 1280, "height": 720}
+
+Messages also carry "max_people" and "over_limit", "zones" (count per zone) when
+the stream has zones, and "occupancy" (see occupancy.OccupancyCounter.snapshot)
+when a tracker is set.
+
+Transports:
+- TCP, newline-delimited JSON (always). A client may send one line
+  `{"subscribe": ["video_1", ...]}` to filter streams; otherwise it gets all.
+- ZeroMQ PUB socket (--zmq tcp://*:5556, topic = stream name) if pyzmq is installed.
+
+The Streamlit apps subscribe through `ServiceClient`, so closing a browser
+tab or rerunning a script never restarts a stream.
+
+Usage:
+    python service.py                          # all settings.VIDEOS_DICT
+    python service.py video_1 0 rtsp://... --port 8765 --loop
+    python service.py --config                 # rooms of settings.ROOMS_CONFIG, reloaded on change
+    python service.py --config --preview       # + MJPEG feeds on settings.PREVIEW_PORT (preview.py)
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import settings
+import count_logger
+from capture import open_capture
+from config import ConfigWatcher, RoomConfig, apply_zones
+from inference_engine import get_engine
+from ingest import is_live_source, open_live
+from metrics import metrics, start_exporters
+from model_registry import get_model, model_in_use
+from occupancy import drop_counter, get_counter
+from postprocess import as_detections, filter_detections
+from preview import PreviewServer
+from remote import needs_resolve, open_remote
+from render import get_renderer
+from tiling import get_tiler
+from zones import get_zones
+
+
+def _encode(message):
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class Publisher:
+    """Fan-out of messages to TCP subscribers (and optionally a ZeroMQ PUB socket)."""
+
+    def __init__(self, queue_size=100, zmq_endpoint=None):
+        self.queue_size = queue_size
+        self.latest = {}  # stream -> last message, sent to new subscribers
+        self._subscribers = {}  # asyncio.Queue -> set of streams (None = all)
+        self._zmq = None
+        if zmq_endpoint:
+            import zmq
+
+            self._zmq = zmq.Context.instance().socket(zmq.PUB)
+            self._zmq.bind(zmq_endpoint)
+
+    @property
+    def n_subscribers(self):
+        return len(self._subscribers)
+
+    def publish(self, message):
+        """Must be called from the event loop thread."""
+        stream = message["stream"]
+        self.latest[stream] = message
+        data = _encode(message)
+        for queue, streams in self._subscribers.items():
+            if streams is not None and stream not in streams:
+                continue
+            if queue.full():  # slow subscriber: drop its oldest message
+                queue.get_nowait()
+                metrics.inc("dropped_messages", stream)
+            queue.put_nowait(data)
+        if self._zmq is not None:
+            self._zmq.send_multipart([stream.encode(), data])
+
+    async def handle_client(self, reader, writer):
+        streams = None
+        try:
+            line = await asyncio.wait_for(reader.readline(), timeout=0.5)
+            if line:
+                streams = set(json.loads(line).get("subscribe") or []) or None
+        except (asyncio.TimeoutError, ValueError):
+            pass
+
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        for stream, message in self.latest.items():
+            if streams is None or stream in streams:
+                queue.put_nowait(_encode(message))
+        self._subscribers[queue] = streams
+        try:
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._subscribers.pop(queue, None)
+            writer.close()
+
+
+class CountingService:
+    """
+    Runs detection on every room and publishes the results.
+
+    Args:
+    - rooms (dict): {stream name: config.RoomConfig}, or {stream name: path, URL or
+      webcam index}, in which case `model_path`, `conf`, `tracker` and `tiling` apply to every stream.
+    - conf (float): Confidence threshold.
+    - tracker (str): Tracker yaml to publish track IDs, or None.
+    - tiling (bool or "zones"): Tiled inference (see tiling.py).
+    - loop_files (bool): Restart file sources when they end.
+    - config_path (str): Room config file to watch (see config.py). Rooms are then
+      started, restarted or updated in place as the file changes, and the
+      service runs until stopped.
+    - preview_port (int): Also serve the annotated streams as MJPEG on this port (see preview.py).
+    - preview_host (str): Preview bind address (default settings.PREVIEW_HOST, local only).
+    """
+
+    def __init__(self, rooms=None, model_path=None, conf=0.4, tracker=None, host="127.0.0.1", port=8765,
+                 zmq_endpoint=None, loop_files=False, log_dir="logs", config_path=None, preview_port=None,
+                 tiling=False, preview_host=None):
+        self.rooms = {
+            name: room if isinstance(room, RoomConfig)
+            else RoomConfig(name, room, model_path, conf, tracker=tracker, tiling=tiling)
+            for name, room in (rooms or {}).items()
+        }
+        self.host = host
+        self.port = port
+        self.loop_files = loop_files
+        self.log_dir = log_dir
+        self.config_path = config_path
+        self.publisher = Publisher(zmq_endpoint=zmq_endpoint)
+        self.preview = PreviewServer(host=preview_host, port=preview_port) if preview_port else None
+        self._streams = {}  # stream name -> (thread, stop event)
+        self._retired = {}  # stream name -> stopped worker still running (see _stop_stream)
+        self.stream_errors = {}  # stream name -> last error, until a frame goes through again
+        self._streams_lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._loop = None
+
+    def _publish(self, message):
+        self._loop.call_soon_threadsafe(self.publisher.publish, message)
+
+    def _start_stream(self, name):
+        stop = threading.Event()
+        previous = self._retired.pop(name, None)
+        thread = threading.Thread(target=self._stream_worker, args=(name, stop, previous), name=f"stream-{name}",
+                                  daemon=True)
+        self._streams[name] = (thread, stop)
+        thread.start()
+
+    def _stop_stream(self, name):
+        """
+        Stop the worker of `name`. A worker still busy after the timeout (e.g. a
+        blocked read) is kept in `_retired`: the next worker of the stream only
+        starts once it has exited, so two workers never publish the same stream.
+        """
+        thread, stop = self._streams.pop(name)
+        stop.set()
+        thread.join(timeout=5)
+        if thread.is_alive():
+            self._retired[name] = thread
+            print(f"⚠️ Flux {name} : l'ancien worker ne s'est pas encore arrêté, redémarrage différé")
+
+    def apply(self, config, changes):
+        """
+        ConfigWatcher callback: stop removed rooms, restart the ones whose source,
+        model, target_fps or tracker changed, start new ones. Thresholds and zones
+        of the other rooms change in place (workers read `self.rooms` every frame).
+        """
+        rooms = config.enabled_rooms()
+        with self._streams_lock:
+            for name in changes.removed + changes.restarted:
+                if name in self._streams:
+                    self._stop_stream(name)
+            apply_zones(self.rooms, rooms)
+            self.rooms = rooms
+            for name in changes.added + changes.restarted:
+                self._start_stream(name)
+        print(f"🔄 Configuration appliquée : {len(changes.added)} ajouté(s), {len(changes.removed)} retiré(s), "
+              f"{len(changes.restarted)} redémarré(s), {len(changes.updated)} mis à jour")
+
+    def _stream_worker(self, name, stop, previous=None):
+        """
+        Capture -> inference -> publication loop of one stream. An exception
+        (bad tracker config, model or decode failure) is logged and the stream
+        reopened after an exponential backoff; the capture is always released.
+        The worker starts once `previous` (the former worker of the stream) has
+        exited, and resets the stream's tracker and counter when it stops.
+        """
+        while previous is not None and previous.is_alive():
+            if stop.wait(0.2):
+                return
+        room = self.rooms[name]
+        if self.preview is not None:
+            self.preview.hub.register(name)
+        frame_index = 0
+        delay = settings.INGEST_BACKOFF_INITIAL
+        engine = None
+        while not stop.is_set():
+            room = self.rooms.get(name, room)
+            engine = cap = None
+            failed = False
+            try:
+                live = is_live_source(room.source)
+                if needs_resolve(room.source):
+                    # YouTube pages: cached URL resolution, decoded ahead of inference
+                    cap = open_remote(room.source, name=name, target_fps=room.target_fps)
+                elif live:
+                    # Reconnects by itself; read() times out so `stop` is checked during outages
+                    cap = open_live(room.source, name=name, target_fps=room.target_fps)
+                else:
+                    cap = open_capture(room.source, name=name, target_fps=room.target_fps)
+                model = get_model(room.model)  # shared: restarting a stream never reloads the model
+                engine = get_engine(model)
+                with model_in_use(model):  # not evicted while the stream runs
+                    while cap.isOpened() and not stop.is_set():
+                        room = self.rooms.get(name, room)
+                        with metrics.timer("capture", name):
+                            success, frame = cap.read(timeout=1.0) if live else cap.read()
+                        if not success:
+                            if live and cap.isOpened():
+                                continue
+                            break
+                        self._process_frame(name, room, engine, frame, frame_index)
+                        metrics.inc("frames", name)
+                        frame_index += 1
+                        if self.stream_errors.pop(name, None) is not None:
+                            delay = settings.INGEST_BACKOFF_INITIAL
+                            metrics.set_gauge("stream_up", name, 1)
+            except Exception as e:
+                failed = True
+                self.stream_errors[name] = f"{type(e).__name__}: {e}"
+                metrics.inc("stream_errors", name)
+                metrics.set_gauge("stream_up", name, 0)
+                print(f"❌ Flux {name} en erreur ({self.stream_errors[name]}), relance dans {delay:.1f} s")
+            finally:
+                if cap is not None:
+                    cap.release()
+            if stop.is_set() or not failed and not self.loop_files:
+                break
+            if failed:
+                stop.wait(delay)
+                delay = min(delay * 2, settings.INGEST_BACKOFF_MAX)
+            if engine is not None:
+                engine.reset_tracker(name)
+            drop_counter(name)
+        if engine is not None:
+            engine.reset_tracker(name)  # the engine this worker used, never reloaded for it
+        drop_counter(name)
+
+    def _process_frame(self, name, room, engine, frame, frame_index):
+        """Detect, count, log and publish one frame (and its preview when watched)."""
+        zones = get_zones(name)
+        with metrics.timer("inference", name):
+            res = engine.infer(name, frame, room.confidence, room.tracker, get_tiler(room.tiling), zones)
+        persons = filter_detections(res[0].boxes)
+        count = len(persons)
+        count_logger.log_people_count_if_changed(count, name, self.log_dir)
+
+        ids = persons.ids if persons.ids is not None else [None] * count
+        boxes = [
+            [round(float(v), 1) for v in box] + [round(float(c), 3), None if i is None else int(i)]
+            for box, c, i in zip(persons.xyxy, persons.conf, ids)
+        ]
+        message = {
+            "stream": name,
+            "ts": time.time(),
+            "frame": frame_index,
+            "count": count,
+            "boxes": boxes,
+            "width": frame.shape[1],
+            "height": frame.shape[0],
+            "max_people": room.max_people,
+            "over_limit": room.max_people is not None and count > room.max_people,
+        }
+        if zones is not None:
+            zone_counts = zones.counts(zones.membership(persons.centroids, frame.shape))
+            for zone, zone_count in zone_counts.items():
+                count_logger.log_people_count_if_changed(zone_count, f"{name}_{zone}", self.log_dir)
+            message["zones"] = zone_counts
+        if room.tracker or persons.ids is not None:
+            # Updated on frames without tracked persons too, so an emptied room expires its tracks
+            counter = get_counter(name, zones)
+            if persons.ids is not None:
+                counter.update(persons.ids, persons.centroids, shape=frame.shape)
+            else:
+                counter.update((), persons.centroids[:0], shape=frame.shape)
+            message["occupancy"] = counter.snapshot()
+        self._publish(message)
+        if self.preview is not None and self.preview.hub.wants_frame(name):
+            # Rendered and encoded only when watched, once for every viewer
+            with metrics.timer("plot", name):
+                data = get_renderer(name).render_encoded(frame, as_detections(res[0].boxes), res[0].names, zones,
+                                                         message.get("zones"), "jpeg", settings.PREVIEW_QUALITY)
+                self.preview.hub.publish(name, data)
+
+    def _running(self):
+        with self._streams_lock:
+            return any(thread.is_alive() for thread, _ in self._streams.values())
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.publisher.handle_client, self.host, self.port)
+        if self.preview is not None:
+            self.preview.start()
+            print(f"🖼️ Aperçu MJPEG sur le port {self.preview.port}")
+        if self.config_path:
+            self._watcher = ConfigWatcher(self.config_path, self.apply, settings.CONFIG_RELOAD_INTERVAL).start()
+        else:
+            apply_zones({}, self.rooms)
+            with self._streams_lock:
+                for name in self.rooms:
+                    self._start_stream(name)
+        print(f"📡 Service à l'écoute sur {self.host}:{self.port} — {len(self.rooms)} flux")
+        try:
+            async with server:
+                # With a config file, run until stopped (rooms may be added later)
+                while not self._stop.is_set() and (self._watcher is not None or self._running()):
+                    await asyncio.sleep(0.5)
+        finally:
+            self.stop()
+            count_logger.flush(self.log_dir)
+
+    def stop(self):
+        self._stop.set()
+        if self.preview is not None:
+            self.preview.stop()
+        if self._watcher is not None:
+            self._watcher.stop()
+        with self._streams_lock:
+            for _, stop in self._streams.values():
+                stop.set()
+
+
+class ServiceClient:
+    """
+    Blocking TCP subscriber keeping the latest message of each stream.
+    Reconnects automatically; meant to be shared by Streamlit reruns (see `get_client`).
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, streams=None, retry_seconds=2.0):
+        self.host = host
+        self.port = port
+        self.streams = list(streams) if streams else None
+        self.retry_seconds = retry_seconds
+        self.latest = {}
+        self.connected = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"service-client-{port}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with socket.create_connection((self.host, self.port), timeout=5) as sock:
+                    sock.settimeout(None)
+                    sock.sendall(_encode({"subscribe": self.streams}))
+                    self.connected = True
+                    for line in sock.makefile("rb"):
+                        if self._stop.is_set():
+                            break
+                        message = json.loads(line)
+                        self.latest[message["stream"]] = message
+            except (OSError, ValueError):
+                pass
+            self.connected = False
+            self._stop.wait(self.retry_seconds)
+
+    def close(self):
+        self._stop.set()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(host="127.0.0.1", port=8765):
+    """Process-wide ServiceClient for (host, port), reused across Streamlit reruns."""
+    with _clients_lock:
+        client = _clients.get((host, port))
+        if client is None:
+            client = ServiceClient(host, port)
+            _clients[(host, port)] = client
+        return client
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def start_background_service(config_path=None, host=None, port=None, preview_port=None):
+    """
+    Run the counting service of settings.ROOMS_CONFIG, with its MJPEG preview, on a
+    daemon thread of this process (e.g. for a Streamlit page), unless one already
+    answers on (host, port). Started once per process; returns it, or None when
+    an external service is used.
+    """
+    global _background
+    host, port = host or settings.SERVICE_HOST, port or settings.SERVICE_PORT
+    with _background_lock:
+        if _background is not None:
+            return _background
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return None  # `python service.py --config --preview` is already running
+        except OSError:
+            pass
+        service = CountingService(host=host, port=port, config_path=str(config_path or settings.ROOMS_CONFIG),
+                                  preview_port=preview_port or settings.PREVIEW_PORT)
+        threading.Thread(target=asyncio.run, args=(service.run(),), name="counting-service", daemon=True).start()
+        _background = service
+        return service
+
+
+def _parse_sources(names):
+    if not names:
+        return {name: str(path) for name, path in settings.VIDEOS_DICT.items()}
+    sources = {}
+    for name in names:
+        if name in settings.VIDEOS_DICT:
+            sources[name] = str(settings.VIDEOS_DICT[name])
+        elif name.isdigit():
+            sources[f"webcam{name}"] = int(name)
+        else:
+            sources[name.rsplit("/", 1)[-1] or name] = name
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless people counting service")
+    parser.add_argument("sources", nargs="*", help="VIDEOS_DICT names, webcam indexes or URLs")
+    parser.add_argument("--host", default=settings.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVICE_PORT)
+    parser.add_argument("--zmq", default=None, help="Also publish on a ZeroMQ PUB endpoint, e.g. tcp://*:5556")
+    parser.add_argument("--conf", type=float, default=0.4)
+    parser.add_argument("--tracker", default=None, help="bytetrack.yaml / botsort.yaml / bytetrack-numpy to publish track IDs")
+    parser.add_argument("--loop", action="store_true", help="Restart video files when they end")
+    parser.add_argument("--tiling", nargs="?", choices=["zones"], const=True, default=False,
+                        help="Tiled inference for small/distant people; 'zones' tiles only the zones")
+    parser.add_argument("--config", nargs="?", const=str(settings.ROOMS_CONFIG), default=None,
+                        help="Room config file (default settings.ROOMS_CONFIG), watched for changes")
+    parser.add_argument("--preview", nargs="?", type=int, const=settings.PREVIEW_PORT, default=None,
+                        help="Serve the annotated streams as MJPEG on this port (default settings.PREVIEW_PORT)")
+    parser.add_argument("--preview-host", default=None,
+                        help="Preview bind address (default settings.PREVIEW_HOST, local only); "
+                             "0.0.0.0 exposes the unauthenticated streams to the network")
+    args = parser.parse_args()
+    if args.config and args.sources:
+        parser.error("sources and --config are exclusive")
+
+    start_exporters()
+    sources = None if args.config else _parse_sources(args.sources)
+    service = CountingService(sources, conf=args.conf, tracker=args.tracker, host=args.host, port=args.port,
+                              zmq_endpoint=args.zmq, loop_files=args.loop, config_path=args.config,
+                              preview_port=args.preview, tiling=args.tiling, preview_host=args.preview_host)
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -17,8 +17,9 @@ VIDEO = 'Video'
 WEBCAM = 'Webcam'
 RTSP = 'RTSP'
 YOUTUBE = 'YouTube'
+SERVICE = 'Service'
 
-SOURCES_LIST = ['Image', 'Video', 'Webcam', 'RTSP', 'YouTube', 'Double Video']
+SOURCES_LIST = ['Image', 'Video', 'Webcam', 'RTSP', 'YouTube', 'Double Video', 'Service']
 
 # Images config
 IMAGES_DIR = ROOT / 'images'
@@ -43,5 +44,112 @@ DETECTION_MODEL = MODEL_DIR / 'yolov8n.pt'
 
 SEGMENTATION_MODEL = MODEL_DIR / 'yolov8n-seg.pt'
 
+# Inference backend for headless tools: 'pytorch', 'onnxruntime' or 'opencv'
+# (see detectors.py; run benchmarks/bench_backends.py to pick the fastest one)
+DETECTOR_BACKEND = 'pytorch'
+# Created by `python export_model.py --format onnx`
+ONNX_MODEL = MODEL_DIR / 'yolov8n.onnx'
+# OpenCV DNN backend: 'auto' (CUDA, Vulkan, OpenCL, then CPU), 'cuda', 'cuda_fp16',
+# 'vulkan', 'opencl', 'opencl_fp16' or 'cpu' (see detectors.configure_dnn)
+DNN_BACKEND = 'auto'
+
 # Webcam
 WEBCAM_PATH = 0
+
+# Zones par salle/flux : rooms/<nom du flux>.json (voir zones.py)
+ROOMS_DIR = ROOT / 'rooms'
+# Configuration des salles (sources, modèle, seuils, zones), rechargée à chaud (voir config.py)
+ROOMS_CONFIG = ROOT / 'rooms.json'
+CONFIG_RELOAD_INTERVAL = 1.0  # secondes entre deux vérifications du fichier
+
+# Capture / décodage (voir capture.py)
+CAPTURE_BACKEND = "opencv"   # "opencv" ou "pyav" (pip install av)
+CAPTURE_WIDTH = None         # largeur de décodage, None = résolution native
+CAPTURE_TARGET_FPS = None    # images récupérées par seconde, None = toutes
+
+# Flux en direct : RTSP, HTTP, webcams (voir ingest.py)
+INGEST_OPEN_TIMEOUT = 10.0     # secondes max pour ouvrir un flux
+INGEST_READ_TIMEOUT = 5.0      # secondes sans image avant de considérer le flux coupé
+INGEST_BACKOFF_INITIAL = 0.5   # délai avant la première reconnexion, doublé à chaque échec
+INGEST_BACKOFF_MAX = 30.0
+
+# Vidéos distantes : YouTube et HTTP(S) (voir remote.py)
+YOUTUBE_FORMAT = 'best[ext=mp4]'
+RESOLVER_DEFAULT_TTL = 3600     # secondes de cache d'une URL résolue sans paramètre "expire"
+RESOLVER_EXPIRY_MARGIN = 120    # l'URL est résolue à nouveau N secondes avant son expiration
+READAHEAD_MAX_FRAMES = 120      # images décodées d'avance au plus
+READAHEAD_MAX_MB = 256          # et mémoire max de ces images
+
+# Pipeline (capture -> inference -> affichage)
+PIPELINE_QUEUE_DEPTH = 2
+PIPELINE_STATS_EVERY = 30  # refresh the latency caption every N frames
+
+# Batched inference engine (shared by every stream using the same model)
+INFERENCE_MAX_BATCH_SIZE = 8
+INFERENCE_MAX_WAIT_MS = 10
+INFERENCE_IMGSZ = 640  # taille d'entrée du modèle, les images y sont redimensionnées une seule fois
+INFERENCE_TIMEOUT = 30  # secondes max d'attente d'un résultat (modèle bloqué ou moteur fermé)
+
+# Inférence par tuiles (personnes petites/lointaines en 4K, voir tiling.py) :
+# champ "tiling" d'une salle (true, ou "zones" pour ne découper que les zones), case à cocher dans app.py
+TILE_SIZE = 640              # côté d'une tuile en pixels source (= INFERENCE_IMGSZ : aucun redimensionnement)
+TILE_OVERLAP = 0.2           # recouvrement minimal entre tuiles voisines
+TILE_FULL_FRAME = True       # passe aussi l'image entière (personnes proches, plus grandes qu'une tuile)
+TILE_MERGE_THRESHOLD = 0.5   # fusion entre tuiles : intersection / aire de la plus petite boîte
+
+# Largeur max des images envoyées au navigateur (l'inférence et les boîtes restent en résolution native)
+DISPLAY_MAX_WIDTH = 1280
+# Images envoyées compressées : "jpeg", "webp" ou "raw" (PNG encodé par Streamlit, bien plus lourd)
+DISPLAY_FORMAT = "jpeg"
+DISPLAY_QUALITY = 80
+
+# Logs (écriture bufferisée par un thread)
+LOG_FLUSH_INTERVAL = 1.0   # secondes max avant écriture sur disque
+LOG_FLUSH_SIZE = 256       # nombre de lignes qui déclenche une écriture immédiate
+LOG_BUFFER_CAPACITY = 10000
+
+# Stockage des comptages : "sqlite" (logs/detections.db, indexé par source/temps) ou "csv"
+LOG_BACKEND = "sqlite"
+DETECTION_DB_NAME = "detections.db"
+
+# Cache des modèles (partagé entre reruns et sessions Streamlit)
+MODEL_MEMORY_BUDGET_MB = 1024  # au-delà, les modèles les moins utilisés sont déchargés
+MODEL_WARMUP = True            # inférence à vide au chargement
+
+# Détection de mouvement avant inférence (caméras peu actives)
+MOTION_GATE_ENABLED = False
+MOTION_GATE_WIDTH = 160              # largeur de l'image réduite comparée
+MOTION_GATE_PIXEL_THRESHOLD = 25     # écart de niveau de gris d'un pixel "changé"
+MOTION_GATE_MIN_CHANGED_RATIO = 0.002
+MOTION_GATE_TARGET_FPS = 10          # inférences/s max, abaissé si le modèle est plus lent
+MOTION_GATE_MAX_SKIP_SECONDS = 2.0   # inférence forcée au moins toutes les N secondes
+
+# Métriques (temps par étape, FPS, images perdues)
+METRICS_ENABLED = True
+METRICS_PORT = None            # ex. 9108 pour exposer http://<hôte>:9108/metrics (Prometheus)
+METRICS_HOST = "127.0.0.1"     # local seulement ; "0.0.0.0" pour un Prometheus sur une autre machine
+METRICS_FILE = None            # ex. "logs/metrics.prom" (textfile collector)
+METRICS_FILE_INTERVAL = 10     # secondes entre deux écritures du fichier
+
+# Service headless (python service.py) auquel les apps Streamlit s'abonnent
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8765
+SERVICE_REFRESH_SECONDS = 0.5
+
+# Aperçu MJPEG des flux annotés (python service.py --preview, voir preview.py)
+PREVIEW_HOST = "127.0.0.1"  # local seulement ; "0.0.0.0" (ou --preview-host) expose les caméras au réseau, sans authentification
+PREVIEW_PORT = 8766
+PREVIEW_URL = "http://localhost:8766"  # adresse vue par le navigateur
+PREVIEW_FPS = 10                        # images/s max par flux, encodées une fois pour tous les spectateurs
+PREVIEW_QUALITY = 75
+
+# Suivi multi-objets : une instance de tracker par flux (voir inference_engine.py, bytetrack.py)
+TRACKER_MAX_AGE = 30            # images (à 30 FPS) pendant lesquelles une piste perdue peut être retrouvée
+TRACKER_MAX_TRACKS = 256        # pistes gardées par flux au plus (les plus anciennes perdues partent d'abord)
+TRACKER_IDLE_SECONDS = 60       # tracker d'un flux oublié après ce délai sans image
+TRACKER_TRACK_THRESH = 0.5      # ByteTrack NumPy : score des détections associées en premier
+TRACKER_NEW_TRACK_THRESH = 0.6  # score minimal pour créer une piste
+TRACKER_MATCH_THRESH = 0.8      # coût (1 - IoU) maximal de la première association
+
+# Occupation / entrées-sorties (suivi des IDs du tracker, voir occupancy.py)
+OCCUPANCY_TRACK_TTL = 2.0  # secondes sans détection avant qu'une piste soit considérée sortie
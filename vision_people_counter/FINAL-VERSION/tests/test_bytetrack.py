@@ -0,0 +1,59 @@
+import numpy as np
+
+from bytetrack import ByteTracker
+from postprocess import Detections
+
+
+def _person(x, score=0.9):
+    return [x, 10, x + 20, 60], score
+
+
+def _frame(*people):
+    boxes = [box for box, _ in people]
+    return Detections(boxes, [score for _, score in people], [0] * len(people))
+
+
+def test_ids_are_stable_across_frames():
+    tracker = ByteTracker(frame_rate=30)
+    first = tracker.update(_frame(_person(0), _person(100)))
+    assert first[:, 4].tolist() == [1, 2]
+    for step in range(1, 10):
+        rows = tracker.update(_frame(_person(100 + step), _person(step)))
+        assert dict(zip(rows[:, 7].astype(int).tolist(), rows[:, 4].astype(int).tolist())) == {0: 2, 1: 1}
+    assert len(tracker) == 2
+
+
+def test_low_score_detections_extend_tracks():
+    tracker = ByteTracker(track_thresh=0.5, low_thresh=0.1)
+    tracker.update(_frame(_person(0)))
+    rows = tracker.update(_frame(_person(1, score=0.3)))
+    assert rows[:, 4].tolist() == [1]
+    # A low-score detection alone never starts a track
+    assert len(ByteTracker(track_thresh=0.5).update(_frame(_person(0, score=0.3)))) == 0
+
+
+def test_new_tracks_need_a_second_hit():
+    tracker = ByteTracker()
+    tracker.update(_frame(_person(0)))
+    assert tracker.update(_frame(_person(1), _person(200))).shape[0] == 1
+    rows = tracker.update(_frame(_person(2), _person(201)))
+    assert sorted(rows[:, 4].tolist()) == [1, 2]
+
+
+def test_lost_tracks_expire_after_max_age():
+    tracker = ByteTracker(max_age=3, frame_rate=30)
+    tracker.update(_frame(_person(0)))
+    empty = Detections(np.empty((0, 4)), [], [])
+    for _ in range(3):
+        tracker.update(empty)
+    assert len(tracker) == 1
+    tracker.update(empty)
+    assert len(tracker) == 0
+
+
+def test_memory_is_bounded():
+    tracker = ByteTracker(max_tracks=4)
+    tracker.update(_frame(*(_person(50 * i) for i in range(10))))
+    assert len(tracker) == 4
+    tracker.reset()
+    assert len(tracker) == 0 and tracker.frame_id == 0
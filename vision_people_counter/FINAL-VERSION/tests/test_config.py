@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from config import ConfigError, parse_config
+
+
+def test_valid_config_with_defaults(tmp_path):
+    config = parse_config({
+        "defaults": {"model": "weights/yolov8n.pt", "max_people": 10},
+        "rooms": {
+            "salle_1": {"source": "videos/video_1.mp4", "max_people": 5, "tiling": "zones",
+                        "zones": [{"name": "entree", "polygon": [[0.1, 0.1], [0.5, 0.1], [0.5, 0.9]]}]},
+            "bureau": {"source": 0, "enabled": False},
+        },
+    }, base_dir=str(tmp_path))
+    salle = config.rooms["salle_1"]
+    assert salle.max_people == 5 and salle.tiling == "zones"
+    # Relative paths are relative to the config file, returned relative to the cwd like settings
+    assert os.path.abspath(salle.source) == str(tmp_path / "videos" / "video_1.mp4")
+    assert os.path.abspath(salle.model) == str(tmp_path / "weights" / "yolov8n.pt")
+    assert config.rooms["bureau"].max_people == 10
+    assert config.rooms["bureau"].source == 0
+    assert config.rooms["bureau"].enabled is False
+
+
+def test_every_error_is_reported():
+    with pytest.raises(ConfigError) as info:
+        parse_config({"rooms": {
+            "a": {"source": "", "confidence": 2, "couleur": "bleu"},
+            "b": {"source": "rtsp://cam", "tiling": "oui", "enabled": "yes",
+                  "zones": [{"name": "z", "polygon": [[0, 0], [1, 1]]},
+                            {"name": "z", "polygon": [[0, 0], [1, 0], [1, 1]]}]},
+        }})
+    errors = info.value.errors
+    fields = ["rooms.a.source", "rooms.a.confidence", "rooms.a: unknown field", "rooms.b.tiling",
+              "rooms.b.enabled", "rooms.b.zones[0].polygon", "rooms.b.zones[1]: duplicate zone name"]
+    for field in fields:
+        assert any(error.startswith(field) for error in errors), field
+    assert len(errors) == len(fields)
+
+
+@pytest.mark.parametrize("raw", [None, [], {"rooms": []}, {"defaults": {}}])
+def test_top_level_must_have_rooms(raw):
+    with pytest.raises(ConfigError):
+        parse_config(raw)
+
+
+def test_config_error_is_a_value_error():
+    with pytest.raises(ValueError):
+        parse_config({"rooms": {"a": "pas un objet"}})
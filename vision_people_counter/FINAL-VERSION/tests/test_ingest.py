@@ -0,0 +1,81 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from ingest import CONNECTING, RECONNECTING, STREAMING, LiveStream
+
+
+@pytest.fixture
+def video(tmp_path):
+    """Short 64x48 MJPG clip played by the fake:// source."""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    for i in range(10):
+        writer.write(np.full((48, 64, 3), i * 20, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_reconnects_after_outage(video):
+    stream = LiveStream(f"fake://{video}?fps=50&fail_after=0.2&outage=0.1", "test_reconnect",
+                        backoff_initial=0.05, backoff_max=0.1)
+    try:
+        assert _wait(lambda: stream.connects >= 2)
+        success, frame = stream.read(timeout=2.0)
+        assert success and frame.shape == (48, 64, 3)
+        health = stream.health()
+        assert health["reconnects"] >= 1
+        assert health["frames"] > 0
+        assert health["state"] in (CONNECTING, RECONNECTING, STREAMING)
+        assert stream.isOpened()
+    finally:
+        stream.release()
+    assert not stream.isOpened()
+
+
+def test_gives_up_after_max_retries(tmp_path):
+    stream = LiveStream(f"fake://{tmp_path / 'missing.avi'}", "test_failed",
+                        backoff_initial=0.01, backoff_max=0.02, max_retries=2)
+    try:
+        assert _wait(lambda: not stream.isOpened())
+        assert stream.read(timeout=0.1) == (False, None)
+        health = stream.health()
+        assert health["connects"] == 0
+        assert health["reconnects"] == 2
+    finally:
+        stream.release()
+
+
+def test_backoff_doubles_up_to_max(tmp_path, monkeypatch):
+    delays = []
+
+    class RecordingEvent(threading.Event):
+        """Stop event whose timed waits (the backoff) are recorded and skipped."""
+
+        def wait(self, timeout=None):
+            if timeout is None:
+                return super().wait()
+            delays.append(timeout)
+            return super().wait(0)
+
+    monkeypatch.setattr("ingest.random.uniform", lambda a, b: 1.0)
+    monkeypatch.setattr("ingest.threading.Event", RecordingEvent)
+    stream = LiveStream(f"fake://{tmp_path / 'missing.avi'}", "test_backoff",
+                        backoff_initial=1.0, backoff_max=4.0, max_retries=5)
+    try:
+        assert _wait(lambda: not stream.isOpened())
+    finally:
+        stream.release()
+    assert delays == [1.0, 2.0, 4.0, 4.0, 4.0]
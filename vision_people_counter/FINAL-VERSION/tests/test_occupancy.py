@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from occupancy import OccupancyCounter, RectZones
+from zones import ZoneMap
+
+DOOR = {"porte": ((0, 50), (100, 50))}
+
+
+def _crossings(events):
+    return sorted(e for e in events if e[1] in ("in", "out"))
+
+
+def test_line_crossings_in_and_out():
+    # Image y axis points down: with A -> B left to right, going down is "in"
+    counter = OccupancyCounter(lines=DOOR)
+    counter.update([1, 2], [(50, 40), (20, 60)], now=0.0)
+    events = counter.update([1, 2], [(50, 60), (20, 40)], now=0.1)
+    assert _crossings(events) == [(1, "in", "porte"), (2, "out", "porte")]
+    assert counter.snapshot()["lines"] == {"porte": {"in": 1, "out": 1}}
+
+
+def test_first_sighting_and_segment_ends_dont_count():
+    counter = OccupancyCounter(lines=DOOR)
+    assert _crossings(counter.update([1], [(50, 60)], now=0.0)) == []  # no previous point
+    # Crosses the line's extension, outside of the segment
+    counter.update([2], [(150, 40)], now=0.0)
+    assert _crossings(counter.update([2], [(150, 60)], now=0.1)) == []
+    assert counter.line_in.tolist() == [0] and counter.line_out.tolist() == [0]
+
+
+def test_zone_entries_exits_and_expiry():
+    counter = OccupancyCounter(RectZones({"gauche": (0, 0, 50, 100)}), track_ttl=1.0)
+    assert counter.update([7], [(10, 10)], now=0.0) == [(7, "entry", "gauche")]
+    assert counter.occupancy() == {"gauche": 1}
+    assert counter.update([7], [(80, 10)], now=0.5) == [(7, "exit", "gauche")]
+    counter.update([7], [(10, 10)], now=0.6)
+    # Track 7 is not seen for more than track_ttl: counted as an exit
+    assert counter.update([8], [(90, 90)], now=2.0) == [(7, "exit", "gauche")]
+    snapshot = counter.snapshot()
+    assert snapshot["entries"] == {"gauche": 2}
+    assert snapshot["exits"] == {"gauche": 2}
+    assert snapshot["present"] == 1
+
+
+def test_whole_frame_without_zones():
+    counter = OccupancyCounter()
+    assert counter.update([1, 2], [(0, 0), (5, 5)], now=0.0) == [(1, "entry", "scene"), (2, "entry", "scene")]
+    assert counter.occupancy() == {"scene": 2}
+
+
+def test_slot_table_grows_and_reuses_slots():
+    counter = OccupancyCounter(capacity=2, track_ttl=1.0)
+    counter.update(np.arange(5), np.zeros((5, 2)), now=0.0)
+    assert counter.snapshot()["present"] == 5
+    counter.update([10], [(0, 0)], now=5.0)
+    assert counter.snapshot()["present"] == 1
+    assert len(counter._free) == 5
+    counter.update([11, 12], [(0, 0), (1, 1)], now=5.1)
+    assert len(counter._free) == 3 and len(counter._ids) == 8
+
+
+def test_zone_map_lines_follow_the_frame_shape():
+    zone_map = ZoneMap([], lines={"porte": ((0.0, 0.5), (1.0, 0.5))})
+    counter = OccupancyCounter(zone_map)
+    assert counter.zone_names == ["scene"]
+    counter.update([1], [(50, 40)], now=0.0, shape=(100, 100))
+    assert _crossings(counter.update([1], [(50, 60)], now=0.1, shape=(100, 100))) == [(1, "in", "porte")]
+    # Same points at twice the resolution stay above the line (y = 100)
+    counter.update([2], [(50, 40)], now=0.2, shape=(200, 200))
+    assert _crossings(counter.update([2], [(50, 60)], now=0.3, shape=(200, 200))) == []
+
+
+def test_too_many_zones():
+    with pytest.raises(ValueError):
+        OccupancyCounter(RectZones({f"z{i}": (0, 0, 1, 1) for i in range(65)}))
@@ -0,0 +1,100 @@
+import pytest
+
+import remote
+import settings
+from remote import StreamResolver, needs_resolve
+
+PAGE = "https://www.youtube.com/watch?v=abc"
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(remote.time, "time", clock)
+    return clock
+
+
+def _extractor(media_url):
+    calls = []
+
+    def extract(url):
+        calls.append(url)
+        return media_url
+    return extract, calls
+
+
+def test_needs_resolve():
+    assert needs_resolve(PAGE)
+    assert needs_resolve("https://youtu.be/abc")
+    assert needs_resolve("https://m.youtube.com/watch?v=abc")
+    assert not needs_resolve("https://notyoutube.com/watch?v=abc")
+    assert not needs_resolve("rtsp://10.0.0.12/stream1")
+    assert not needs_resolve(0)
+
+
+def test_direct_urls_are_not_extracted(clock):
+    extract, calls = _extractor("unused")
+    resolver = StreamResolver(extract)
+    assert resolver.resolve("rtsp://10.0.0.12/stream1") == "rtsp://10.0.0.12/stream1"
+    assert calls == []
+    assert resolver.hits == resolver.misses == 0
+
+
+def test_cached_until_expire_minus_margin(clock):
+    expire = int(clock.now) + 600
+    extract, calls = _extractor(f"https://cdn.example/video?expire={expire}&sig=x")
+    resolver = StreamResolver(extract)
+
+    first = resolver.resolve(PAGE)
+    assert resolver.resolve(PAGE) == first
+    assert len(calls) == 1
+    assert (resolver.hits, resolver.misses) == (1, 1)
+
+    clock.now = expire - settings.RESOLVER_EXPIRY_MARGIN - 1
+    assert resolver.is_cached(PAGE)
+    clock.now = expire - settings.RESOLVER_EXPIRY_MARGIN
+    assert not resolver.is_cached(PAGE)
+    resolver.resolve(PAGE)
+    assert len(calls) == 2
+    assert resolver.misses == 2
+
+
+def test_default_ttl_without_expire(clock):
+    extract, calls = _extractor("https://cdn.example/video")
+    resolver = StreamResolver(extract)
+    resolver.resolve(PAGE)
+
+    clock.now += settings.RESOLVER_DEFAULT_TTL - 1
+    resolver.resolve(PAGE)
+    assert len(calls) == 1
+    clock.now += 1
+    resolver.resolve(PAGE)
+    assert len(calls) == 2
+
+
+def test_invalidate(clock):
+    extract, calls = _extractor("https://cdn.example/video")
+    resolver = StreamResolver(extract)
+    resolver.resolve(PAGE)
+    resolver.invalidate(PAGE)
+    assert not resolver.is_cached(PAGE)
+    resolver.resolve(PAGE)
+    assert len(calls) == 2
+
+
+def test_extract_errors_are_not_cached(clock):
+    def extract(url):
+        raise RuntimeError("vidéo indisponible")
+
+    resolver = StreamResolver(extract)
+    with pytest.raises(RuntimeError):
+        resolver.resolve(PAGE)
+    assert not resolver.is_cached(PAGE)
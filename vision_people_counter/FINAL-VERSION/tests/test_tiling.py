@@ -0,0 +1,33 @@
+import numpy as np
+
+from tiling import merge_boxes
+
+
+def test_boxes_split_across_tiles_are_merged():
+    xyxy = np.array([[0, 0, 60, 100], [50, 0, 100, 100], [200, 200, 220, 240]], dtype=np.float32)
+    conf = np.array([0.6, 0.9, 0.5])
+    cls = np.array([0, 0, 0])
+    keep, merged = merge_boxes(xyxy, conf, cls, threshold=0.1)
+    assert keep.tolist() == [1, 2]
+    assert merged.tolist() == [[0, 0, 100, 100], [200, 200, 220, 240]]
+
+
+def test_classes_and_threshold_are_respected():
+    xyxy = np.array([[0, 0, 10, 10], [0, 0, 10, 10], [5, 0, 15, 10]], dtype=np.float32)
+    keep, _ = merge_boxes(xyxy, np.array([0.9, 0.8, 0.7]), np.array([0, 1, 0]), threshold=0.6)
+    assert keep.tolist() == [0, 1, 2]
+    keep, merged = merge_boxes(xyxy, np.array([0.9, 0.8, 0.7]), np.array([0, 1, 0]), threshold=0.5)
+    assert keep.tolist() == [0, 1]
+    assert merged[0].tolist() == [0, 0, 15, 10]
+
+
+def test_boxes_of_one_window_are_kept_apart():
+    xyxy = np.array([[0, 0, 10, 10], [2, 0, 12, 10]], dtype=np.float32)
+    conf, cls = np.array([0.9, 0.8]), np.array([0, 0])
+    assert merge_boxes(xyxy, conf, cls, window=np.array([0, 0]))[0].tolist() == [0, 1]
+    assert merge_boxes(xyxy, conf, cls, window=np.array([0, 1]))[0].tolist() == [0]
+
+
+def test_no_boxes():
+    keep, merged = merge_boxes(np.empty((0, 4)), np.empty(0), np.empty(0))
+    assert keep.shape == (0,) and merged.shape == (0, 4)
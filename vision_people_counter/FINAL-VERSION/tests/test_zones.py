@@ -0,0 +1,68 @@
+import json
+
+import numpy as np
+import pytest
+
+import zones
+from zones import Zone, ZoneMap
+
+SQUARES = {
+    "frame_size": [100, 100],
+    "max_people": 3,
+    "zones": [
+        {"name": "gauche", "polygon": [[0, 0], [49, 0], [49, 99], [0, 99]], "max_people": 1},
+        {"name": "haut", "polygon": [[0, 0], [99, 0], [99, 49], [0, 49]]},
+    ],
+    "lines": [{"name": "porte", "points": [[0, 50], [100, 50]]}],
+}
+
+
+def test_membership_and_counts():
+    zone_map = ZoneMap.from_dict(SQUARES)
+    bits = zone_map.membership([(10, 10), (10, 80), (80, 10), (80, 80)], shape=(100, 100))
+    assert bits.tolist() == [3, 1, 2, 0]
+    assert zone_map.counts(bits) == {"gauche": 2, "haut": 2}
+    assert zone_map.over_limit(zone_map.counts(bits)) == [("gauche", 2, 1)]
+    assert zone_map.over_limit({"haut": 2}, default_max=1) == [("haut", 2, 1)]
+
+
+def test_scaled_to_the_frame_shape():
+    zone_map = ZoneMap.from_dict(SQUARES)
+    assert zone_map.membership([(160, 40)], shape=(200, 200)).tolist() == [2]
+    assert zone_map.scaled_lines((200, 200)) == {"porte": [[0.0, 100.0], [200.0, 100.0]]}
+    assert sorted(zone_map._rasters) == [(200, 200)]
+
+
+def test_normalised_zones_need_a_shape():
+    zone_map = ZoneMap([Zone("tout", [(0, 0), (1, 0), (1, 1), (0, 1)])])
+    with pytest.raises(ValueError):
+        zone_map.membership([(0, 0)])
+    assert zone_map.membership([(10, 10), (639, 479)], shape=(480, 640)).tolist() == [1, 1]
+    # The last shape is reused
+    assert zone_map.membership(np.array([[5.0, 5.0]])).tolist() == [1]
+
+
+def test_zone_needs_three_points():
+    with pytest.raises(ValueError):
+        Zone("ligne", [(0, 0), (1, 1)])
+
+
+def test_get_zones_and_overrides(tmp_path):
+    (tmp_path / "salle.json").write_text(json.dumps(SQUARES))
+    (tmp_path / "vide.json").write_text(json.dumps({"zones": []}))
+    try:
+        from_file = zones.get_zones("salle", tmp_path)
+        assert from_file.names == ["gauche", "haut"]
+        assert zones.get_zones("salle", tmp_path) is from_file
+        assert zones.get_zones("vide", tmp_path) is None
+        assert zones.get_zones("absente", tmp_path) is None
+
+        zones.set_zones("salle", None)
+        assert zones.get_zones("salle", tmp_path) is None
+        override = ZoneMap.from_dict({"lines": SQUARES["lines"]})
+        zones.set_zones("salle", override)
+        assert zones.get_zones("salle", tmp_path) is override
+        zones.drop_zones("salle")
+        assert zones.get_zones("salle", tmp_path) is from_file
+    finally:
+        zones.drop_zones("salle")
@@ -0,0 +1,221 @@
+"""
+Sliced (tiled) inference for small, distant people on high-resolution cameras.
+
+Letterboxing a 4K frame to the 640 px model input shrinks a person 60 px tall
+to 10 px, below what the detector finds. Instead, the frame is cut into
+overlapping `tile_size` windows at native resolution (no downscaling), all the
+tiles of the frame go through the model in one batch, optionally along with
+the whole frame (for people too large for a tile), and the detections are
+shifted back and merged across tiles.
+
+Overlapping tiles see the same person twice, and a person cut by a tile edge
+gives a partial box: boxes of the same class are merged greedily by score
+when their intersection covers `merge_threshold` of the smaller box, the kept
+box growing to the union of the boxes it absorbs (non-maximum merging, as
+in SAHI).
+
+With `zones_only`, only the tiles overlapping the room zones
+(zones.ZoneMap) are run, so only the regions of interest pay for the extra
+passes; the rest of the frame is covered by the full-frame pass.
+
+    tiler = get_tiler("zones")
+    windows = tiler.windows(frame.shape, zones)          # (N, 4) x0, y0, x1, y1
+    detections = merge_detections([detect(frame[y0:y1, x0:x1]) for x0, y0, x1, y1 in windows], windows)
+"""
+import threading
+
+import numpy as np
+
+import settings
+from detectors import Detector
+from postprocess import Detections
+
+TILING_MODES = (False, True, "zones")
+
+
+def _starts(length, tile, step):
+    """Tile origins along one axis: evenly spread, first at 0, last ending at `length`."""
+    if length <= tile:
+        return np.zeros(1, dtype=np.int64)
+    n = int(np.ceil((length - tile) / step)) + 1
+    return np.round(np.linspace(0, length - tile, n)).astype(np.int64)
+
+
+def tile_grid(shape, tile_size, overlap=0.2):
+    """
+    Overlapping windows covering a frame of `shape` (h, w).
+
+    Returns:
+    (N, 4) int array of x0, y0, x1, y1; neighbouring windows overlap by at least
+    `overlap` of `tile_size`.
+    """
+    h, w = shape[:2]
+    step = max(1, int(tile_size * (1 - overlap)))
+    xs, ys = _starts(w, tile_size, step), _starts(h, tile_size, step)
+    x0, y0 = np.meshgrid(xs, ys)
+    x0, y0 = x0.ravel(), y0.ravel()
+    return np.stack([x0, y0, np.minimum(x0 + tile_size, w), np.minimum(y0 + tile_size, h)], axis=1)
+
+
+def merge_boxes(xyxy, conf, cls, threshold=0.5, window=None):
+    """
+    Greedy non-maximum merging of boxes coming from overlapping tiles.
+
+    Boxes are visited by decreasing score; every remaining box of the same class
+    whose intersection covers `threshold` of the smaller of the two boxes is
+    absorbed, and the kept box becomes the union of the boxes it absorbed.
+    With `window` (window index of each box), a box never absorbs a box of its
+    own window: the model NMS already separated them (e.g. occluded people).
+    This only holds relative to the kept box: two boxes of one window can still
+    end up in the same group through a box of another window that overlaps both.
+
+    Returns:
+    (keep, merged_xyxy): indices of the kept boxes and their merged coordinates.
+    """
+    n = len(conf)
+    if n == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 4), dtype=np.float32)
+    xyxy = np.asarray(xyxy, dtype=np.float32)
+    lt = np.maximum(xyxy[:, None, :2], xyxy[None, :, :2])
+    rb = np.minimum(xyxy[:, None, 2:], xyxy[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area = np.prod(xyxy[:, 2:] - xyxy[:, :2], axis=1)
+    overlap = inter / np.maximum(np.minimum(area[:, None], area[None, :]), 1e-6)
+    match = (overlap >= threshold) & (cls[:, None] == cls[None, :])
+    if window is not None:
+        match &= window[:, None] != window[None, :]
+        np.fill_diagonal(match, True)
+
+    order = np.argsort(-np.asarray(conf), kind="stable")
+    free = np.ones(n, dtype=bool)
+    keep, merged = [], []
+    for i in order.tolist():
+        if not free[i]:
+            continue
+        group = match[i] & free
+        free[group] = False
+        keep.append(i)
+        boxes = xyxy[group]
+        merged.append(np.concatenate([boxes[:, :2].min(axis=0), boxes[:, 2:].max(axis=0)]))
+    return np.array(keep, dtype=np.int64), np.array(merged, dtype=np.float32)
+
+
+def merge_detections(detections, windows, threshold=None):
+    """
+    Shift the detections of each window (in window pixels) to frame pixels and
+    merge them across windows.
+
+    Args:
+    - detections (list of postprocess.Detections): One per window.
+    - windows ((N, 4) array): x0, y0, x1, y1 of each window.
+    - threshold (float): Merge threshold (default settings.TILE_MERGE_THRESHOLD).
+    """
+    threshold = settings.TILE_MERGE_THRESHOLD if threshold is None else threshold
+    sizes = [len(d) for d in detections]
+    if not sum(sizes):
+        return Detections.empty()
+    window = np.repeat(np.arange(len(sizes)), sizes)
+    xyxy = np.concatenate([d.xyxy for d in detections]) + np.tile(np.asarray(windows)[window, :2], 2)
+    conf = np.concatenate([d.conf for d in detections])
+    cls = np.concatenate([d.cls for d in detections])
+    keep, merged = merge_boxes(xyxy, conf, cls, threshold, window)
+    return Detections(merged, conf[keep], cls[keep])
+
+
+class Tiler:
+    """
+    Windows to run for a frame: the whole frame (optional) and its tiles.
+
+    Args:
+    - tile_size (int): Tile side in source pixels (default settings.TILE_SIZE,
+      the model input size so tiles are never resampled).
+    - overlap (float): Minimum overlap of neighbouring tiles (default settings.TILE_OVERLAP).
+    - full_frame (bool): Also run the whole frame (default settings.TILE_FULL_FRAME).
+    - zones_only (bool): Only tiles overlapping the zones given to `windows`.
+    """
+
+    def __init__(self, tile_size=None, overlap=None, full_frame=None, zones_only=False):
+        self.tile_size = tile_size or settings.TILE_SIZE
+        self.overlap = settings.TILE_OVERLAP if overlap is None else overlap
+        self.full_frame = settings.TILE_FULL_FRAME if full_frame is None else full_frame
+        self.zones_only = zones_only
+        self._cache = {}  # (shape, zones) -> windows
+
+    def windows(self, shape, zones=None):
+        """
+        (N, 4) int windows x0, y0, x1, y1 for a frame of `shape`, the full frame
+        first when `full_frame` is set. Without zones, `zones_only` tiles the whole frame.
+        Never empty: without any tile (zones outside the frame), the full frame is run.
+        """
+        key = (tuple(shape[:2]), zones if self.zones_only else None)
+        windows = self._cache.get(key)
+        if windows is not None:
+            return windows
+        h, w = shape[:2]
+        tiles = tile_grid(shape, self.tile_size, self.overlap)
+        if self.zones_only and zones is not None and zones.zones:
+            boxes = np.array([np.concatenate([p.min(axis=0), p.max(axis=0)]) for p in zones.polygons(shape)])
+            hits = ((tiles[:, None, 0] < boxes[None, :, 2]) & (tiles[:, None, 2] > boxes[None, :, 0])
+                    & (tiles[:, None, 1] < boxes[None, :, 3]) & (tiles[:, None, 3] > boxes[None, :, 1]))
+            tiles = tiles[hits.any(axis=1)]
+        if len(tiles) == 1 and (tiles[0] == (0, 0, w, h)).all():
+            windows = tiles  # the frame fits in one tile
+        elif self.full_frame or not len(tiles):
+            windows = np.concatenate([np.array([[0, 0, w, h]]), tiles])
+        else:
+            windows = tiles
+        if len(self._cache) > 16:
+            self._cache.clear()
+        self._cache[key] = windows
+        return windows
+
+    def crops(self, frame, zones=None):
+        """Views of `frame` for each window, and the windows."""
+        windows = self.windows(frame.shape, zones)
+        return [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in windows.tolist()], windows
+
+
+class TiledDetector(Detector):
+    """
+    Runs a `detectors.Detector` on the tiles of each frame, in one
+    `detect_batch` call per frame, and merges the detections.
+
+    Args:
+    - detector (Detector): Wrapped detector.
+    - tiler (Tiler): Tiling of the frames.
+    - zones (zones.ZoneMap): Zones for a `zones_only` tiler.
+    """
+
+    def __init__(self, detector, tiler=None, zones=None):
+        self.detector = detector
+        self.tiler = tiler or Tiler()
+        self.zones = zones
+        self.name = f"{detector.name}+tiles"
+
+    def detect_batch(self, frames, conf=0.25):
+        results = []
+        for frame in frames:
+            crops, windows = self.tiler.crops(frame, self.zones)
+            results.append(merge_detections(self.detector.detect_batch(crops, conf), windows))
+        return results
+
+
+_tilers = {}
+_tilers_lock = threading.Lock()
+
+
+def get_tiler(mode=True):
+    """
+    Shared tiler of a room `tiling` mode: True (whole frame) or "zones"
+    (zone regions only); None for False.
+    """
+    if mode not in TILING_MODES:
+        raise ValueError(f"Unknown tiling mode {mode!r}, expected one of {TILING_MODES}")
+    if not mode:
+        return None
+    with _tilers_lock:
+        tiler = _tilers.get(mode)
+        if tiler is None:
+            tiler = Tiler(zones_only=mode == "zones")
+            _tilers[mode] = tiler
+        return tiler
@@ -0,0 +1,187 @@
+"""
+Named polygon zones per stream, loaded from the room JSON files.
+
+Each zone is rasterised once per source resolution into a bit raster (bit i
+of a pixel = inside zone i), so locating N centroids is one array lookup,
+whatever the number or shape of the zones. Zones may overlap.
+
+Room file (rooms/<stream>.json):
+
+    {
+      "room": "webcam",
+      "frame_size": [1280, 720],          # coordinates below are in these pixels;
+                                          # omit it to give them normalised (0-1)
+      "max_people": 10,
+      "zones": [
+        {"name": "entree", "polygon": [[100, 50], [700, 50], [700, 550], [100, 550]], "max_people": 4}
+      ],
+      "lines": [{"name": "porte", "points": [[100, 600], [700, 600]]}]
+    }
+"""
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+import settings
+
+
+def _bits_dtype(n_zones):
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if n_zones <= np.iinfo(dtype).bits:
+            return dtype
+    raise ValueError("At most 64 zones per stream are supported")
+
+
+class Zone:
+    __slots__ = ("name", "polygon", "max_people")
+
+    def __init__(self, name, polygon, max_people=None):
+        self.name = name
+        self.polygon = np.asarray(polygon, dtype=np.float32).reshape(-1, 2)
+        if len(self.polygon) < 3:
+            raise ValueError(f"Zone '{name}' needs at least 3 points")
+        self.max_people = max_people
+
+
+class ZoneMap:
+    """
+    Polygon zones (and counting lines) of one stream.
+
+    Args:
+    - zones (list of Zone).
+    - lines (dict): {name: ((x1, y1), (x2, y2))}, same coordinates as the zones.
+    - frame_size (tuple): (w, h) the coordinates refer to, or None if they are normalised.
+    - max_people (int): Room-wide alert threshold.
+
+    Pass the frame `shape` to `membership` and `scaled_lines` (OccupancyCounter
+    does, per frame): without it they fall back to the resolution of the last
+    frame given to `membership`, which is shared by every user of the map.
+    """
+
+    def __init__(self, zones, lines=None, frame_size=None, max_people=None, room=None):
+        self.zones = list(zones)
+        self.names = [z.name for z in self.zones]
+        self.lines = dict(lines or {})
+        self.frame_size = tuple(frame_size) if frame_size else None
+        self.max_people = max_people
+        self.room = room
+        self._dtype = _bits_dtype(len(self.zones))
+        self._zone_bits = np.uint64(1) << np.arange(len(self.zones), dtype=np.uint64)
+        self._rasters = {}  # (h, w) -> bit raster
+        self._shape = (frame_size[1], frame_size[0]) if frame_size else None
+
+    @classmethod
+    def from_dict(cls, config):
+        zones = [Zone(z["name"], z["polygon"], z.get("max_people")) for z in config.get("zones", [])]
+        lines = {line["name"]: line["points"] for line in config.get("lines", [])}
+        return cls(zones, lines, config.get("frame_size"), config.get("max_people"), config.get("room"))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def _scale(self, shape):
+        h, w = shape[:2]
+        if self.frame_size is None:
+            return np.float32(w), np.float32(h)
+        return np.float32(w / self.frame_size[0]), np.float32(h / self.frame_size[1])
+
+    def polygons(self, shape):
+        """Zone polygons as int32 pixel arrays at resolution `shape` (h, w), e.g. for cv2.polylines."""
+        sx, sy = self._scale(shape)
+        return [np.round(z.polygon * (sx, sy)).astype(np.int32) for z in self.zones]
+
+    def scaled_lines(self, shape=None):
+        shape = shape or self._shape
+        sx, sy = self._scale(shape)
+        return {name: (np.asarray(points, dtype=np.float32) * (sx, sy)).tolist() for name, points in self.lines.items()}
+
+    def raster(self, shape):
+        """The bit raster at resolution `shape`, built on first use."""
+        key = tuple(shape[:2])
+        raster = self._rasters.get(key)
+        if raster is None:
+            raster = np.zeros(key, dtype=self._dtype)
+            mask = np.empty(key, dtype=np.uint8)
+            for i, polygon in enumerate(self.polygons(key)):
+                mask[:] = 0
+                cv2.fillPoly(mask, [polygon], 1)
+                raster |= mask.astype(self._dtype) << self._dtype(i)
+            self._rasters[key] = raster
+        return raster
+
+    def membership(self, points, shape=None):
+        """
+        uint64 bitmask of the zones containing each point (N, 2), in pixels of
+        `shape` (h, w) (default: the last resolution used).
+        """
+        if shape is not None:
+            self._shape = tuple(shape[:2])
+        if self._shape is None:
+            raise ValueError("Frame shape unknown: pass `shape` (normalised zones have no frame_size)")
+        raster = self.raster(self._shape)
+        points = np.asarray(points).reshape(-1, 2)
+        h, w = raster.shape
+        xs = np.clip(points[:, 0].astype(np.int64), 0, w - 1)
+        ys = np.clip(points[:, 1].astype(np.int64), 0, h - 1)
+        return raster[ys, xs].astype(np.uint64)
+
+    def counts(self, bits):
+        """{zone name: number of points} from `membership` bits."""
+        counts = np.count_nonzero(np.asarray(bits, dtype=np.uint64)[:, None] & self._zone_bits, axis=0)
+        return dict(zip(self.names, counts.tolist()))
+
+    def over_limit(self, counts, default_max=None):
+        """[(zone name, count, limit)] for every zone above its max_people (or `default_max`)."""
+        alerts = []
+        for zone in self.zones:
+            limit = zone.max_people if zone.max_people is not None else default_max
+            if limit is not None and counts.get(zone.name, 0) > limit:
+                alerts.append((zone.name, counts[zone.name], limit))
+        return alerts
+
+    def draw(self, image, counts=None, color=(255, 255, 0)):
+        """Draw the zone outlines (and counts) on `image` in place."""
+        for zone, polygon in zip(self.zones, self.polygons(image.shape)):
+            cv2.polylines(image, [polygon], True, color, 2)
+            label = zone.name if counts is None else f"{zone.name}: {counts.get(zone.name, 0)}"
+            x, y = polygon[:, 0].min(), polygon[:, 1].min()
+            cv2.putText(image, label, (int(x), max(int(y) - 10, 15)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        return image
+
+
+_zone_maps = {}
+_overrides = {}  # stream -> ZoneMap from the room config (config.py)
+_zone_maps_lock = threading.Lock()
+
+
+def get_zones(stream, rooms_dir=None):
+    """
+    ZoneMap of `stream` from <rooms_dir>/<stream>.json (default settings.ROOMS_DIR),
+    loaded once per process; None if the stream has no room file, or neither zones nor lines.
+    Zones set with `set_zones` take precedence over the room file.
+    """
+    path = os.path.join(str(rooms_dir or settings.ROOMS_DIR), f"{stream}.json")
+    with _zone_maps_lock:
+        if stream in _overrides:
+            return _overrides[stream]
+        if path not in _zone_maps:
+            zone_map = ZoneMap.from_file(path) if os.path.exists(path) else None
+            _zone_maps[path] = zone_map if zone_map is not None and (zone_map.zones or zone_map.lines) else None
+        return _zone_maps[path]
+
+
+def set_zones(stream, zone_map):
+    """Use `zone_map` for `stream` instead of its room file (None: the stream has no zones)."""
+    with _zone_maps_lock:
+        _overrides[stream] = zone_map if zone_map is not None and (zone_map.zones or zone_map.lines) else None
+
+
+def drop_zones(stream):
+    """Forget the `set_zones` override of `stream`: its room file applies again."""
+    with _zone_maps_lock:
+        _overrides.pop(stream, None)
@@ -1,4 +1,6 @@
-from src.detection import start_detection
+from src.detection import parse_args, start_detection
 
 if __name__ == "__main__":
-    start_detection()
+    args = parse_args()
+    start_detection(args.source, headless=args.headless, max_frames=args.max_frames, dnn_backend=args.dnn_backend,
+                    tiles=args.tiles)
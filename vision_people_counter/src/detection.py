@@ -1,82 +1,166 @@
+import argparse
 import cv2
 import os
+import sys
+import time
 import numpy as np
 import csv
 from datetime import datetime
+from pathlib import Path
+
+# Métriques partagées avec l'application Streamlit
+sys.path.append(str(Path(__file__).resolve().parents[1] / "FINAL-VERSION"))
+import settings
+from detectors import Detector, configure_dnn, nms
+from metrics import metrics, start_exporters
+from postprocess import Detections
+from preprocess import Letterbox, boxes_to_source
+from tiling import Tiler, TiledDetector
+
+SOURCE_NAME = "opencv_webcam"
 
 # Chargement des fichiers du modèle
 MODEL_PATH = os.path.join("models", "yolov3.weights")
 CFG_PATH = os.path.join("models", "yolov3.cfg")
 LABELS_PATH = os.path.join("models", "yolov3.txt")
-
-with open(LABELS_PATH, "r") as f:
-    CLASSES = [line.strip() for line in f.readlines()]
-
-COLORS = np.random.uniform(0, 255, size=(len(CLASSES), 3))
-
-def start_detection():
-    net = cv2.dnn.readNetFromDarknet(CFG_PATH, MODEL_PATH)
-    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-
-    cap = cv2.VideoCapture(0)
+INPUT_SIZE = 416
+
+
+def decode_yolov3(outputs, conf, wanted, input_size, ratio, pad, nms_threshold=0.4, source_shape=None):
+    """
+    Decode the YOLOv3 output layers in one pass: rows of all scales are
+    concatenated, then the objectness filter, the best class, the score/class
+    filter, the box scaling and the NMS are array operations.
+
+    Args:
+    - outputs (list): Arrays of (N, 5 + nc) rows [cx, cy, w, h, objectness, class scores...], relative to the input.
+    - conf (float): Minimum class score.
+    - wanted (numpy bool array): Per class id, whether the class is kept.
+    - input_size (int): Network input size.
+    - ratio, pad: Letterbox transform of the frame.
+
+    Returns:
+    postprocess.Detections in source pixels.
+    """
+    rows = np.concatenate(outputs) if len(outputs) > 1 else outputs[0]
+    # OpenCV's region layer already multiplies class scores by the objectness:
+    # rows whose objectness is under `conf` cannot pass, skip them before the argmax
+    rows = rows[rows[:, 4] > conf]
+    scores = rows[:, 5:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(cls)), cls]
+    mask = (best > conf) & wanted[cls]
+    rows, cls, best = rows[mask], cls[mask], best[mask]
+
+    centers = rows[:, :2] * input_size
+    half = rows[:, 2:4] * (input_size / 2)
+    xyxy = np.concatenate([centers - half, centers + half], axis=1)
+    keep = nms(xyxy, best, cls, nms_threshold)
+    xyxy, best, cls = xyxy[keep], best[keep], cls[keep]
+    return Detections(boxes_to_source(xyxy, ratio, pad, source_shape), best, cls)
+
+
+class YoloV3Detector(Detector):
+    """
+    Darknet YOLOv3 on OpenCV DNN.
+
+    The output layer names and the letterbox buffer are built once and reused
+    for every frame; outputs are decoded by `decode_yolov3`.
+
+    Args:
+    - cfg_path, weights_path, labels_path (str): Darknet model files.
+    - input_size (int): Network input size (multiple of 32).
+    - classes (tuple): Class names to keep (None keeps all).
+    - nms_threshold (float): IoU threshold of the NMS.
+    - dnn_backend (str): OpenCV DNN backend (see detectors.configure_dnn).
+    """
+
+    name = "yolov3"
+
+    def __init__(self, cfg_path=CFG_PATH, weights_path=MODEL_PATH, labels_path=LABELS_PATH, input_size=INPUT_SIZE,
+                 classes=("person",), nms_threshold=0.4, dnn_backend=None):
+        with open(labels_path, "r") as f:
+            self.names = [line.strip() for line in f.readlines()]
+        self.wanted = np.array([classes is None or name in classes for name in self.names])
+        # Une couleur fixe par classe, en tuples prêts pour cv2
+        self.colors = [tuple(c) for c in np.random.default_rng(0).uniform(0, 255, size=(len(self.names), 3)).tolist()]
+
+        self.net = cv2.dnn.readNetFromDarknet(cfg_path, weights_path)
+        self.dnn_backend = configure_dnn(self.net, dnn_backend)
+        self.output_names = self.net.getUnconnectedOutLayersNames()
+
+        self.input_size = input_size
+        self.nms_threshold = nms_threshold
+        self.letterbox = Letterbox(input_size, auto=False)
+
+    def detect_batch(self, frames, conf=0.5):
+        detections = []
+        for frame in frames:
+            with metrics.timer("preprocess", SOURCE_NAME):
+                # Redimensionnement unique, sans déformation, dans un buffer réutilisé
+                lb = self.letterbox(frame)
+                self.net.setInput(cv2.dnn.blobFromImage(lb.image, 1 / 255.0, swapRB=True, crop=False))
+            with metrics.timer("inference", SOURCE_NAME):
+                outputs = self.net.forward(self.output_names)
+            with metrics.timer("decode", SOURCE_NAME):
+                detections.append(decode_yolov3(outputs, conf, self.wanted, self.input_size, lb.ratio, lb.pad,
+                                                self.nms_threshold, lb.source_shape))
+        return detections
+
+    def draw(self, frame, detections):
+        """Boxes and labels of `detections` drawn on `frame` in place."""
+        for (x1, y1, x2, y2), score, cls in zip(detections.xyxy.astype(int).tolist(), detections.conf.tolist(),
+                                                detections.cls.tolist()):
+            color = self.colors[cls]
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            cv2.putText(frame, f"{self.names[cls]}: {score:.2f}", (x1, y1 - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+        return frame
+
+
+def start_detection(source=0, headless=False, max_frames=None, dnn_backend=None, log_path="people_log.csv",
+                    tiles=False):
+    """
+    Count people on `source` (webcam index or video file) and log every change.
+
+    Args:
+    - headless (bool): No window (servers, benchmarks): frames are not drawn.
+    - max_frames (int): Stop after this many frames.
+    - dnn_backend (str): OpenCV DNN backend (default settings.DNN_BACKEND).
+    - tiles (bool): Also detect on native-resolution INPUT_SIZE tiles (small, distant people).
+
+    Returns:
+    The number of frames processed.
+    """
+    start_exporters()
+    yolo = YoloV3Detector(dnn_backend=dnn_backend)
+    print(f"🧠 Backend DNN : {yolo.dnn_backend}")
+    detector = TiledDetector(yolo, Tiler(tile_size=INPUT_SIZE)) if tiles else yolo
+
+    cap = cv2.VideoCapture(source)
     if not cap.isOpened():
         print("❌ Impossible d'accéder à la webcam.")
-        return
+        return 0
 
-    print("✅ Webcam activée. Appuie sur 'q' pour quitter.")
+    print("✅ Webcam activée." + ("" if headless else " Appuie sur 'q' pour quitter."))
 
     last_count = -1  # Pour détecter les changements
-    log_path = "people_log.csv"
+    frames = 0
+    start = time.perf_counter()
 
     with open(log_path, mode='w', newline='') as file:
         csv_writer = csv.writer(file)
         csv_writer.writerow(["timestamp", "nb_personnes"])
 
-        while True:
-            ret, frame = cap.read()
+        while max_frames is None or frames < max_frames:
+            with metrics.timer("capture", SOURCE_NAME):
+                ret, frame = cap.read()
             if not ret:
                 break
 
-            height, width = frame.shape[:2]
-
-            # Préparation de l'image
-            blob = cv2.dnn.blobFromImage(frame, 1/255.0, (416, 416), swapRB=True, crop=False)
-            net.setInput(blob)
-
-            ln = net.getUnconnectedOutLayersNames()
-            layer_outputs = net.forward(ln)
-
-            boxes, confidences, class_ids = [], [], []
-
-            for output in layer_outputs:
-                for detection in output:
-                    scores = detection[5:]
-                    class_id = np.argmax(scores)
-                    confidence = scores[class_id]
-
-                    if confidence > 0.5 and CLASSES[class_id] == "person":
-                        box = detection[0:4] * np.array([width, height, width, height])
-                        (centerX, centerY, w, h) = box.astype("int")
-
-                        x = int(centerX - w / 2)
-                        y = int(centerY - h / 2)
-
-                        boxes.append([x, y, int(w), int(h)])
-                        confidences.append(float(confidence))
-                        class_ids.append(class_id)
-
-            indexes = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
-
-            if len(indexes) > 0:
-                for i in indexes.flatten():
-                    (x, y, w, h) = boxes[i]
-                    color = COLORS[class_ids[i]]
-                    label = f"{CLASSES[class_ids[i]]}: {confidences[i]:.2f}"
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-                    cv2.putText(frame, label, (x, y - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+            detections = detector.detect(frame, conf=0.5)
 
             # ✅ Nombre de personnes détectées
-            nb_personnes = len(indexes)
+            nb_personnes = len(detections)
 
             # ➕ Log seulement si le nombre a changé
             if nb_personnes != last_count:
@@ -85,10 +169,37 @@ def start_detection():
                 print(f"🔄 Changement détecté → {nb_personnes} personne(s)")
                 last_count = nb_personnes
 
-            cv2.imshow("Détection de personnes (OpenCV)", frame)
+            metrics.inc("frames", SOURCE_NAME)
+            frames += 1
+            if headless:
+                continue
 
+            with metrics.timer("annotation", SOURCE_NAME):
+                yolo.draw(frame, detections)
+            with metrics.timer("display", SOURCE_NAME):
+                cv2.imshow("Détection de personnes (OpenCV)", frame)
             if cv2.waitKey(1) & 0xFF == ord("q"):
                 break
 
+    elapsed = time.perf_counter() - start
+    if frames:
+        print(f"⏱️ {frames} images en {elapsed:.1f} s ({frames / elapsed:.1f} FPS)")
     cap.release()
-    cv2.destroyAllWindows()
+    if not headless:
+        cv2.destroyAllWindows()
+    if settings.METRICS_FILE:
+        metrics.write_prometheus(settings.METRICS_FILE)
+    return frames
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Comptage de personnes YOLOv3 (OpenCV DNN)")
+    parser.add_argument("source", nargs="?", default="0", help="Index de webcam ou fichier vidéo")
+    parser.add_argument("--headless", action="store_true", help="Sans fenêtre ni annotation (serveur, benchmark)")
+    parser.add_argument("--max-frames", type=int, default=None, help="Arrêter après N images")
+    parser.add_argument("--tiles", action="store_true", help="Inférence par tuiles (personnes petites ou lointaines)")
+    parser.add_argument("--dnn-backend", default=None,
+                        help="auto, cpu, opencl, opencl_fp16, vulkan, cuda, cuda_fp16 (défaut : settings.DNN_BACKEND)")
+    args = parser.parse_args(argv)
+    args.source = int(args.source) if args.source.isdigit() else args.source
+    return args
@@ -1,18 +1,38 @@
+import sys
+from pathlib import Path
+
 import cv2
 from ultralytics import YOLO
 
+# Post-processing et zones partagés avec l'application Streamlit
+sys.path.append(str(Path(__file__).resolve().parents[1] / "FINAL-VERSION"))
+import settings
+import count_logger
+from postprocess import summarize_persons
+from config import get_config, sync_zones
+from zones import ZoneMap, get_zones
+
+SOURCE_NAME = "webcam"
+
 # Charger le modèle YOLOv5s (personnes uniquement)
 model = YOLO("yolov5s.pt")
 
-# Zone d'intérêt (ROI) fixe — à adapter selon ta vidéo
-roi_x, roi_y, roi_w, roi_h = 200, 100, 300, 300
-
-def is_in_roi(cx, cy):
-    return roi_x <= cx <= roi_x + roi_w and roi_y <= cy <= roi_y + roi_h
+# Zones d'intérêt (polygones) de la salle : celles de "webcam" dans settings.ROOMS_CONFIG
+# (ou rooms/webcam.json), ou le fichier de salle passé en argument
+if len(sys.argv) > 1:
+    zones = ZoneMap.from_file(sys.argv[1])
+else:
+    sync_zones(get_config())
+    zones = get_zones(SOURCE_NAME)
+    if zones is None:
+        sys.exit(f"❌ Aucune zone pour « {SOURCE_NAME} » dans {settings.ROOMS_CONFIG} ni {settings.ROOMS_DIR}")
 
 # Webcam ou fichier vidéo
 cap = cv2.VideoCapture(0)
 
+cv2.namedWindow("YOLOv5 + ROI", cv2.WINDOW_NORMAL)
+cv2.setWindowProperty("YOLOv5 + ROI", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+
 while True:
     ret, frame = cap.read()
     if not ret:
@@ -21,34 +41,26 @@ while True:
     # Appliquer la détection
     results = model(frame, verbose=False)[0]
 
-    count_in_roi = 0
-
-    for box in results.boxes:
-        cls_id = int(box.cls[0])
-        conf = float(box.conf[0])
-
-        # Vérifie que la classe détectée est "person"
-        if model.names[cls_id] == 'person' and conf > 0.5:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cx = int((x1 + x2) / 2)
-            cy = int((y1 + y2) / 2)
+    # Personnes (conf > 0.5) et zones de chaque centre, calculées en une passe
+    summary = summarize_persons(results.boxes, min_conf=0.5)
+    bits = zones.membership(summary.centroids, frame.shape)
+    zone_counts = zones.counts(bits)
 
-            if is_in_roi(cx, cy):
-                count_in_roi += 1
-                color = (0, 255, 0)
-            else:
-                color = (0, 0, 255)
+    for (x1, y1, x2, y2), (cx, cy), inside in zip(summary.detections.xyxy.astype(int),
+                                                  summary.centroids.astype(int),
+                                                  bits != 0):
+        color = (0, 255, 0) if inside else (0, 0, 255)
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+        cv2.circle(frame, (cx, cy), 5, color, -1)
 
-            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
-            cv2.circle(frame, (cx, cy), 5, color, -1)
+    # Logs et alertes par zone
+    for zone, count in zone_counts.items():
+        count_logger.log_people_count_if_changed(count, f"{SOURCE_NAME}_{zone}")
+    for zone, count, limit in zones.over_limit(zone_counts):
+        print(f"⚠️ Zone « {zone} » : {count} personnes pour une limite de {limit}")
 
-    # Rectangle ROI
-    roi_x, roi_y, roi_w, roi_h = 100, 50, 600, 500
-    cv2.rectangle(frame, (roi_x, roi_y), (roi_x + roi_w, roi_y + roi_h), (255, 255, 0), 2)
-    cv2.putText(frame, f"In ROI: {count_in_roi}", (roi_x, roi_y - 10),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-    cv2.namedWindow("YOLOv5 + ROI", cv2.WINDOW_NORMAL)
-    cv2.setWindowProperty("YOLOv5 + ROI", cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+    # Les zones dessinées sont exactement celles testées
+    zones.draw(frame, zone_counts)
 
     cv2.imshow("YOLOv5 + ROI", frame)
 
@@ -57,3 +69,4 @@ while True:
 
 cap.release()
 cv2.destroyAllWindows()
+count_logger.flush()